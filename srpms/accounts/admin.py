@@ -3,5 +3,10 @@ from django.contrib.auth.admin import UserAdmin
 
 from .models import SrpmsUser
 
+
+class SrpmsUserAdmin(UserAdmin):
+    fieldsets = UserAdmin.fieldsets + (('Notifications', {'fields': ('digest_frequency',)}),)
+
+
 # Register your models here.
-admin.site.register(SrpmsUser, UserAdmin)
+admin.site.register(SrpmsUser, SrpmsUserAdmin)
@@ -1,5 +1,9 @@
 """
 A wrapper for the LDAPBackend, in case we need to override it in the future.
+
+django-auth-ldap always caches with the default cache, it's pointed to the 'ldap' cache here
+instead, so that LDAP entries don't compete with other data for space, and could be configured
+on their own (see CACHES in settings.py).
 """
 
 __author__ = 'Dajie (Cooper) Yang'
@@ -8,8 +12,13 @@ __credits__ = ['Dajie Yang']
 __maintainer__ = 'Dajie (Cooper) Yang'
 __email__ = 'dajie.yang@anu.edu.au'
 
+from django_auth_ldap import backend
 from django_auth_ldap.backend import LDAPBackend
 
+from srpms.caches import CacheProxy
+
+backend.cache = CacheProxy('ldap')
+
 
 class ANULDAPBackend(LDAPBackend):
     """
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2019-11-02 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_srpmsuser_display_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srpmsuser',
+            name='is_approved_supervisor',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='srpmsuser',
+            name='is_course_convener',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
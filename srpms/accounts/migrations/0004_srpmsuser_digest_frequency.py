@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2019-11-10 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_srpmsuser_role_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='srpmsuser',
+            name='digest_frequency',
+            field=models.CharField(choices=[('immediate', 'Immediate'), ('hourly', 'Hourly digest'), ('daily', 'Daily digest')], default='immediate', max_length=10),
+        ),
+    ]
@@ -34,6 +34,15 @@ class SrpmsUser(AbstractUser):
     TODO: If the user is authenticated through ANU LDAP, forbid anyone to update but only LDAP
     TODO: Validate expire date on user login
     """
+    DIGEST_IMMEDIATE = 'immediate'
+    DIGEST_HOURLY = 'hourly'
+    DIGEST_DAILY = 'daily'
+    DIGEST_FREQUENCIES = [
+        (DIGEST_IMMEDIATE, 'Immediate'),
+        (DIGEST_HOURLY, 'Hourly digest'),
+        (DIGEST_DAILY, 'Daily digest'),
+    ]
+
     # External user related field
     nominator = models.ForeignKey('self', on_delete=models.SET_NULL, default=None, blank=True,
                                   null=True)
@@ -44,6 +53,16 @@ class SrpmsUser(AbstractUser):
 
     display_name = models.CharField(default='', max_length=150, blank=True, null=False)
 
+    # Role flags derived from permissions, maintained by the research_mgt app, see
+    # research_mgt/role_flags.py
+    is_approved_supervisor = models.BooleanField(default=False, db_index=True, editable=False)
+    is_course_convener = models.BooleanField(default=False, db_index=True, editable=False)
+
+    # How notification emails are sent to the user, either one email per notification, or
+    # collected into digests, see research_mgt/digests.py
+    digest_frequency = models.CharField(max_length=10, choices=DIGEST_FREQUENCIES,
+                                        default=DIGEST_IMMEDIATE)
+
     def get_display_name(self) -> str:
         """Get display name for the user"""
         display_name = ' '.join([self.first_name, self.last_name])
@@ -34,6 +34,17 @@ class SrpmsUserSerializer(serializers.HyperlinkedModelSerializer):
                   'nominator', 'expire_date', 'uni_id']
 
 
+class NotificationPreferenceSerializer(serializers.ModelSerializer):
+    """
+    For the current user's notification preference, i.e. whether notifications are sent right
+    away or collected into digests.
+    """
+
+    class Meta:
+        model = SrpmsUser
+        fields = ['digest_frequency']
+
+
 class LoginSerializer(serializers.ModelSerializer):
     class Meta:
         model: SrpmsUser = get_user_model()
@@ -116,6 +116,28 @@ class AccountsTest(TestCase):
                                format='json', secure=True)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_token_check(self):
+        """Test the token check for nginx auth_request"""
+
+        client = APIClient()
+        response = client.get('/api/accounts/token/check/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = client.post('/api/accounts/token/',
+                               {'username': self.user_01_name,
+                                'password': self.user_01_passwd},
+                               format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access = response.data['access']
+
+        client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(access))
+        response = client.get('/api/accounts/token/check/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        client.credentials(HTTP_AUTHORIZATION='Bearer {}x'.format(access))
+        response = client.get('/api/accounts/token/check/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_login_ldap(self):
         """
         Test SRPMS can communicate to ANU LDAP, make sure you set up environment properly
@@ -170,3 +192,26 @@ class AccountsTest(TestCase):
                               secure=True, follow=True)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED,
                          "Should failed if not authorized.")
+
+    def test_notification_preference(self):
+        """Test updating notification preference of the current user"""
+
+        client = APIClient()
+        response = client.get('/api/accounts/notification-preference/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        client.login(username=self.user_01_name, password=self.user_01_passwd)
+        response = client.get('/api/accounts/notification-preference/', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'digest_frequency': SrpmsUser.DIGEST_IMMEDIATE})
+
+        response = client.put('/api/accounts/notification-preference/',
+                              {'digest_frequency': SrpmsUser.DIGEST_DAILY},
+                              format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user_01.refresh_from_db()
+        self.assertEqual(self.user_01.digest_frequency, SrpmsUser.DIGEST_DAILY)
+
+        response = client.put('/api/accounts/notification-preference/',
+                              {'digest_frequency': 'weekly'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -21,8 +21,11 @@ urlpatterns = [
     path('', views.APIRootView.as_view(), name='api-root'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/check/', views.TokenCheckView.as_view(), name='token_check'),
     path('user/<int:pk>/', views.UserDetailView.as_view(), name='user-detail'),
     path('users/', views.UserListView.as_view(), name='user-list'),
+    path('notification-preference/', views.NotificationPreferenceView.as_view(),
+         name='notification-preference'),
     path('login/', views.LoginView.as_view(), name='login'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
 ]
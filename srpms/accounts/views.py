@@ -21,7 +21,7 @@ from django.urls import reverse as djan_reverse
 from django.shortcuts import redirect
 from django.contrib.auth import authenticate, login, logout, get_user_model
 
-from .serializers import LoginSerializer, SrpmsUserSerializer
+from .serializers import LoginSerializer, SrpmsUserSerializer, NotificationPreferenceSerializer
 
 
 class APIRootView(APIView):
@@ -32,9 +32,13 @@ class APIRootView(APIView):
             'token': rest_reverse('accounts:token_obtain_pair', request=request, *args, **kwargs),
             'token/refresh': rest_reverse('accounts:token_refresh', request=request, *args,
                                           **kwargs),
+            'token/check': rest_reverse('accounts:token_check', request=request, *args,
+                                        **kwargs),
             'users': rest_reverse('accounts:user-list', request=request, *args, **kwargs),
             'login': rest_reverse('accounts:login', request=request, *args, **kwargs),
             'logout': rest_reverse('accounts:logout', request=request, *args, **kwargs),
+            'notification-preference': rest_reverse('accounts:notification-preference',
+                                                    request=request, *args, **kwargs),
         }
         return Response(pathes)
 
@@ -112,3 +116,26 @@ class UserListView(generics.ListAPIView):
 
     filter_backends = [filters.SearchFilter]
     search_fields = ['username', 'first_name', 'last_name', 'uni_id']
+
+
+class TokenCheckView(APIView):
+    """
+    Respond 204 if the request is authenticated, 401 otherwise. nginx authenticates requests it
+    answers from its cache through this view (auth_request, see nginx/conf.d/local.conf).
+    """
+    permission_classes = [permissions.IsAuthenticated, ]
+
+    def get(self, request: Request):
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
+    """
+    Get or update the notification preference of the current user, notifications are either
+    sent right away, or collected into hourly or daily digests.
+    """
+    serializer_class = NotificationPreferenceSerializer
+    permission_classes = [permissions.IsAuthenticated, ]
+
+    def get_object(self):
+        return self.request.user
@@ -0,0 +1,177 @@
+"""
+Maintain the materialized contract access table (ContractAccess), which records which user can
+see which contract.
+
+The contract list used to OR four querysets together (finalized, own, supervise and examine)
+and apply DISTINCT on the result, which get planned badly as the tables grow. With the access
+table the visibility check becomes a single indexed lookup.
+
+The table is kept in sync by signals defined in signals.py, use the `rebuild_contract_access`
+management command to rebuild it from scratch, or to check it against the relations.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Set, Tuple, Dict, Iterable
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+from accounts.models import SrpmsUser
+from .models import Contract, Supervise, AssessmentExamine, ContractAccess
+from .list_cache import invalidate_users
+
+# (user_id, contract_id, role)
+AccessRow = Tuple[int, int, str]
+
+
+def get_expected_contract_access(contract_ids: Iterable[int] = None) -> Set[AccessRow]:
+    """
+    Compute the access rows from the current relations.
+
+    Owner always has access to its contract, supervisors and examiners only have access after
+    the contract has been submitted at least once.
+
+    Args:
+        contract_ids: only compute rows for these contracts, all contracts if None
+    """
+    contracts = Contract.objects.all()
+    supervises = Supervise.objects.filter(contract__was_submitted=True)
+    assessment_examines = AssessmentExamine.objects.filter(contract__was_submitted=True)
+    if contract_ids is not None:
+        contract_ids = list(contract_ids)
+        contracts = contracts.filter(pk__in=contract_ids)
+        supervises = supervises.filter(contract_id__in=contract_ids)
+        assessment_examines = assessment_examines.filter(contract_id__in=contract_ids)
+
+    rows = set()
+    for contract_id, owner_id in contracts.values_list('pk', 'owner_id'):
+        rows.add((owner_id, contract_id, ContractAccess.ROLE_OWNER))
+    for contract_id, supervisor_id in supervises.values_list('contract_id', 'supervisor_id'):
+        rows.add((supervisor_id, contract_id, ContractAccess.ROLE_SUPERVISOR))
+    for contract_id, examiner_id in assessment_examines.values_list('contract_id',
+                                                                    'examine__examiner_id'):
+        rows.add((examiner_id, contract_id, ContractAccess.ROLE_EXAMINER))
+    return rows
+
+
+def get_existing_contract_access(contract_ids: Iterable[int] = None) -> Dict[AccessRow, int]:
+    """
+    Get rows currently in the access table, mapped to their primary key.
+
+    Args:
+        contract_ids: only get rows of these contracts, all rows if None
+    """
+    queryset = ContractAccess.objects.all()
+    if contract_ids is not None:
+        queryset = queryset.filter(contract_id__in=list(contract_ids))
+    return {(user_id, contract_id, role): pk for pk, user_id, contract_id, role in
+            queryset.values_list('pk', 'user_id', 'contract_id', 'role')}
+
+
+def sync_contract_access(contract_id: int, insert: bool = True) -> None:
+    """
+    Bring the access rows of one contract in line with its relations.
+
+    Args:
+        contract_id: primary key of the contract
+        insert: whether missing rows should be inserted. This should be False when syncing
+                from a delete event, since the contract itself may be in the middle of a
+                cascade delete, and rows inserted at that point would refer to a contract
+                that's about to disappear.
+    """
+    with transaction.atomic():
+        # Concurrent syncs of the contract (e.g. two supervise saves) wait for each other, and
+        # read the rows committed by the other, otherwise both would insert the same rows
+        list(Contract.objects.select_for_update().filter(pk=contract_id).values_list('pk'))
+
+        expected = get_expected_contract_access([contract_id])
+        existing = get_existing_contract_access([contract_id])
+
+        stale = {row: pk for row, pk in existing.items() if row not in expected}
+        if stale:
+            ContractAccess.objects.filter(pk__in=list(stale.values())).delete()
+
+        missing = expected.difference(existing) if insert else set()
+        if missing:
+            ContractAccess.objects.bulk_create([
+                ContractAccess(user_id=user_id, contract_id=contract_id, role=role)
+                for user_id, contract_id, role in missing
+            ])
+
+        # Users who gained or lost access, see list_cache.py
+        invalidate_users({user_id for user_id, _, _ in missing.union(stale)})
+
+
+def rebuild_contract_access() -> Tuple[int, int]:
+    """
+    Rebuild the whole access table from relations, only the difference would be written.
+
+    Returns:
+        number of rows inserted and number of rows deleted
+    """
+    with transaction.atomic():
+        expected = get_expected_contract_access()
+        existing = get_existing_contract_access()
+
+        stale = [pk for row, pk in existing.items() if row not in expected]
+        missing = expected.difference(existing)
+
+        ContractAccess.objects.filter(pk__in=stale).delete()
+        ContractAccess.objects.bulk_create([
+            ContractAccess(user_id=user_id, contract_id=contract_id, role=role)
+            for user_id, contract_id, role in missing
+        ], batch_size=1000)
+
+        if stale or missing:
+            invalidate_users()
+
+    return len(missing), len(stale)
+
+
+def get_visible_contracts(user: SrpmsUser) -> QuerySet:
+    """
+    Contracts that an ordinary user can see, i.e. contracts they own, supervise or examine, and
+    other user's contracts that have passed convener approval.
+    """
+    return Contract.objects.filter(
+            Q(convener_approval_date__isnull=False) |
+            Q(pk__in=ContractAccess.objects.filter(user=user).values('contract_id')))
+
+
+def get_visible_contracts_by_relation(user: SrpmsUser) -> QuerySet:
+    """
+    Same as get_visible_contracts(), but computed by joining the relations directly. This is
+    how visibility was computed before the access table, and is kept as a reference for the
+    consistency check.
+    """
+    contract_finalized = Contract.objects.filter(convener_approval_date__isnull=False)
+    contract_own = user.own.all()
+    contract_supervise = Contract.objects.filter(
+            supervise__in=user.supervise.all(), was_submitted=True)
+    contract_examine = Contract.objects.filter(
+            assessment_examine__examine__examiner=user, was_submitted=True)
+
+    queryset = contract_finalized | contract_own | contract_supervise | contract_examine
+    return queryset.distinct()
+
+
+def check_contract_access() -> Dict[int, Tuple[Set[int], Set[int]]]:
+    """
+    Compare the access table against the relation based visibility, for every user.
+
+    Returns:
+        mapping of user id to (contracts only visible through the table, contracts only
+        visible through relations), users without mismatch are not included
+    """
+    mismatches = {}
+    for user in SrpmsUser.objects.all():
+        by_table = set(get_visible_contracts(user).values_list('pk', flat=True))
+        by_relation = set(get_visible_contracts_by_relation(user).values_list('pk', flat=True))
+        if by_table != by_relation:
+            mismatches[user.pk] = (by_table - by_relation, by_relation - by_table)
+    return mismatches
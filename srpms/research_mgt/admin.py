@@ -11,7 +11,8 @@ __email__ = 'dajie.yang@anu.edu.au'
 from django.contrib import admin
 
 from .models import (Course, AssessmentTemplate, IndividualProject, SpecialTopic, Supervise,
-                     Assessment, Examine, AssessmentExamine)
+                     Assessment, Examine, AssessmentExamine, ContractAccess, OutboxMessage,
+                     DigestItem)
 
 admin.site.register(Course)
 admin.site.register(AssessmentTemplate)
@@ -21,3 +22,6 @@ admin.site.register(Supervise)
 admin.site.register(Assessment)
 admin.site.register(Examine)
 admin.site.register(AssessmentExamine)
+admin.site.register(ContractAccess)
+admin.site.register(OutboxMessage)
+admin.site.register(DigestItem)
@@ -21,5 +21,4 @@ class ResearchMgtConfig(AppConfig):
         # in signals.py that decorated with @receiver would all be registered automatically.
 
         # noinspection PyUnresolvedReferences
-        from . import signals
-        signals.init_actions()  # need this otherwise signal would not load after start
+        from . import signals  # noqa: F401
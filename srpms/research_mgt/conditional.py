@@ -0,0 +1,149 @@
+"""
+Conditional request support for contracts, based on entity tags derived from the contract
+version (see workflow.py).
+
+Contract details are polled by clients, but rarely change once submitted. With `If-None-Match`
+the server responds 304 before anything is serialized (or printed), and with `If-Match` an
+update based on an outdated copy is rejected with 412 before anything is written. The contract
+row is locked while `If-Match` is checked, until the write is committed, otherwise two requests
+with the same tag would both pass the check and the last one would win. Successful writes
+respond with the new tag, so that clients can write again without reloading.
+
+Tags are strong, as the version changes on every change of the contract and its related
+objects. Each representation (e.g. detail, nested lists, PDF) has a tag of its own, though they
+all change together.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import List
+
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import Contract
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Contract has been modified since last retrieved, please reload.'
+    default_code = 'precondition_failed'
+
+
+def get_contract_etag(contract: Contract, representation: str = 'contract') -> str:
+    """
+    Entity tag of a contract representation.
+
+    Args:
+        contract: the contract, its version should be up to date
+        representation: name of the representation, e.g. 'contract', 'print', 'supervise'
+    """
+    return '"{}-{}-{}"'.format(representation, contract.pk, contract.version)
+
+
+def get_request_etags(request: Request, header: str) -> List[str]:
+    """
+    Parse entity tags from a request header.
+
+    Args:
+        request: the current request
+        header: META key of the header, e.g. 'HTTP_IF_NONE_MATCH'
+    """
+    return parse_etags(request.META.get(header, ''))
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Check `If-None-Match` of a safe request against the current tag, weak comparison is used as
+    specified by RFC 7232.
+    """
+    etags = get_request_etags(request, 'HTTP_IF_NONE_MATCH')
+    return '*' in etags or etag in [tag[2:] if tag.startswith('W/') else tag for tag in etags]
+
+
+def get_not_modified_response(etag: str) -> Response:
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """
+    Check `If-Match` of an unsafe request against the current tag, strong comparison is used as
+    specified by RFC 7232. Requests without the header are always allowed.
+
+    Raises:
+        PreconditionFailed: the tag does not match
+    """
+    etags = get_request_etags(request, 'HTTP_IF_MATCH')
+    if etags and '*' not in etags and etag not in etags:
+        raise PreconditionFailed()
+
+
+def check_contract_if_match(request: Request, contract_id: int,
+                            representation: str = 'contract') -> None:
+    """
+    Lock the contract row until the end of the current transaction, and check `If-Match` against
+    its current version. Should be called in the same transaction as the write, before anything
+    is loaded for the write. Nothing is locked if the request has no `If-Match`.
+
+    Raises:
+        PreconditionFailed: the tag does not match
+    """
+    if not get_request_etags(request, 'HTTP_IF_MATCH'):
+        return
+    try:
+        current = Contract.objects.select_for_update().only('pk', 'version') \
+            .filter(pk=contract_id).first()
+    except ValueError:  # Not a valid primary key
+        current = None
+    if current is not None:  # Let the view respond not found as usual
+        check_if_match(request, get_contract_etag(current, representation))
+
+
+def set_contract_etag(response: Response, contract_id: int,
+                      representation: str = 'contract') -> Response:
+    """Tag the response of a committed write with the new version of the contract"""
+    current = Contract.objects.only('pk', 'version').filter(pk=contract_id).first()
+    if current is not None:
+        response['ETag'] = get_contract_etag(current, representation)
+    return response
+
+
+class ContractConditionalListMixin(object):
+    """
+    For views nested under contracts, support `If-None-Match` on list, with the tag derived from
+    the parent contract (see mixins.NestedGenericViewSet) and named after the view's basename.
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag = get_contract_etag(self.resolved_parents['contract'], self.basename)
+        if is_not_modified(request, etag):
+            return get_not_modified_response(etag)
+
+        response = super(ContractConditionalListMixin, self).list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+
+class ContractConditionalUpdateMixin(object):
+    """
+    For views nested under contracts, support `If-Match` on update, with the same tag as list
+    (see ContractConditionalListMixin), and respond with the new tag.
+    """
+
+    def update(self, request, *args, **kwargs):
+        contract_id = self.resolved_parents['contract'].pk
+        with transaction.atomic():
+            check_contract_if_match(request, contract_id, self.basename)
+            response = super(ContractConditionalUpdateMixin, self).update(request, *args,
+                                                                          **kwargs)
+        return set_contract_etag(response, contract_id, self.basename)
@@ -45,7 +45,7 @@ def contract_csv_export(contract_list: Union[QuerySet, List[Contract]],
     """
     for contract in contract_list:
         # Only support individual project at the moment
-        if hasattr(contract, 'individual_project') and contract.convener_approval_date:
+        if contract.is_individual_project() and contract.convener_approval_date:
             course: str = contract.course.course_number
 
             # Generate conducting time information
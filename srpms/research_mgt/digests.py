@@ -0,0 +1,101 @@
+"""
+Notification digests.
+
+Course conveners and busy supervisors get an email for every submission and approval, which
+floods their inbox during approval week. Users may instead choose an hourly or daily digest
+(`SrpmsUser.digest_frequency`). Notifications to them are held as DigestItem rows instead of
+being queued in the outbox (see notifications.py), and the `send_digests` command collects them
+into one email per user per window.
+
+A user's digest is due once their oldest held notification is older than their window, i.e.
+the user gets at most one digest per window, and a notification waits for no longer than one
+window (plus the command's polling interval). Notifications held for users who have switched
+back to immediate notifications are sent on the next run. Due users are found with one
+aggregate query per frequency, and their digests are queued in the outbox with one insert.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from accounts.models import SrpmsUser
+from .models import DigestItem, OutboxMessage
+from srpms.settings import EMAIL_SENDER
+
+WINDOWS = {
+    SrpmsUser.DIGEST_HOURLY: timedelta(hours=1),
+    SrpmsUser.DIGEST_DAILY: timedelta(days=1),
+}
+
+
+def get_digest_users(addresses: Iterable[str]) -> Dict[str, int]:
+    """Map the given addresses, of users who prefer digests, to their user ids"""
+    return dict(SrpmsUser.objects.filter(email__in=list(addresses))
+                .exclude(digest_frequency=SrpmsUser.DIGEST_IMMEDIATE)
+                .values_list('email', 'pk'))
+
+
+def get_due_users(now: datetime = None) -> List[int]:
+    """
+    Ids of users whose oldest held notification is older than their digest window, as well as
+    users who no longer prefer digests but still have notifications held
+    """
+    now = now or timezone.now()
+    user_ids = list(DigestItem.objects.filter(user__digest_frequency=SrpmsUser.DIGEST_IMMEDIATE)
+                    .order_by().values_list('user', flat=True).distinct())
+    for frequency, window in WINDOWS.items():
+        user_ids += DigestItem.objects.filter(user__digest_frequency=frequency) \
+            .values('user').annotate(oldest=Min('create_date')) \
+            .filter(oldest__lte=now - window).values_list('user', flat=True)
+    return user_ids
+
+
+def format_digest(items: List[DigestItem]) -> Tuple[str, str]:
+    """Subject and body of the digest of the given items, oldest first"""
+    subject = 'You have {} new notification(s)'.format(len(items))
+    body = 'Notifications from Student Research Project Management System since {}:\n\n' \
+        .format(timezone.localtime(items[0].create_date).strftime('%d %b %Y %H:%M'))
+    body += '\n\n'.join('- {}\n  {}'.format(item.subject, item.body) for item in items)
+    return subject, body
+
+
+def send_digests(now: datetime = None) -> Tuple[int, int]:
+    """
+    Queue the digests that are due in the outbox, and remove the notifications they include.
+    Held notifications are locked until the end of the transaction, notifications locked by
+    another run are left for the next one.
+
+    Returns:
+        number of digests queued, and number of notifications they include
+    """
+    with transaction.atomic():
+        user_ids = get_due_users(now)
+        if not user_ids:
+            return 0, 0
+
+        items = list(DigestItem.objects.select_for_update(skip_locked=True, of=('self',))
+                     .filter(user__in=user_ids).select_related('user')
+                     .order_by('user', 'create_date', 'pk'))
+
+        messages = []
+        for user, user_items in groupby(items, key=lambda item: item.user):
+            user_items = list(user_items)
+            if user.email:
+                subject, body = format_digest(user_items)
+                messages.append(OutboxMessage(subject=subject, body=body, from_email=EMAIL_SENDER,
+                                              recipients=[user.email]))
+
+        OutboxMessage.objects.bulk_create(messages)
+        DigestItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+
+    return len(messages), len(items)
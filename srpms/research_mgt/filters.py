@@ -9,8 +9,6 @@ __maintainer__ = "Dajie (Cooper) Yang"
 __email__ = "dajie.yang@anu.edu.au"
 
 from django_filters import FilterSet, BooleanFilter
-from django.contrib.auth.models import Permission
-from django.db.models import Q
 from django.db.models.query import QuerySet
 
 from accounts.models import SrpmsUser
@@ -32,24 +30,16 @@ class UserFilter(FilterSet):
         Filter function.
 
         Note that user being inside a group (with certain permission assigned to the group)
-        would not automatically assign user to a Permission object. Thus we refer the method
-        [here](https://stackoverflow.com/questions/378303/how-to-get-a-list-of-all-users-with-a-specific-permission-group-in-django)
-        to query user given a permission.
+        would not automatically assign user to a Permission object. Whether the user has the
+        permission, either directly or through groups, is persisted as a role flag on the user,
+        see research_mgt/role_flags.py
 
         Args:
             queryset: the queryset of the view
             name: field name to apply the filter
             value: value that would be used to filter the query set
         """
-
-        perm = Permission.objects.get(codename='can_supervise')
-
-        if value:
-            q = Q(groups__permissions=perm) | Q(user_permissions=perm) | Q(is_superuser=True)
-            return queryset.filter(q).distinct()
-        else:
-            q = ~Q(groups__permissions=perm) & ~Q(user_permissions=perm) & Q(is_superuser=False)
-            return queryset.filter(q).distinct()
+        return queryset.filter(is_approved_supervisor=value)
 
     # noinspection PyMethodMayBeStatic
     def filter_course_convener(self, queryset: QuerySet, name, value: bool):
@@ -61,12 +51,4 @@ class UserFilter(FilterSet):
             name: field name to apply the filter
             value: value that would be used to filter the query set
         """
-
-        perm = Permission.objects.get(codename='can_convene')
-
-        if value:
-            q = Q(groups__permissions=perm) | Q(user_permissions=perm) | Q(is_superuser=True)
-            return queryset.filter(q).distinct()
-        else:
-            q = ~Q(groups__permissions=perm) & ~Q(user_permissions=perm) & Q(is_superuser=False)
-            return queryset.filter(q).distinct()
+        return queryset.filter(is_course_convener=value)
@@ -0,0 +1,193 @@
+"""
+Per-user response cache of the contract list (`contracts/`), the most requested endpoint.
+
+Responses are cached by user, visibility scope and query parameters, together with the
+generation numbers they were built under, which are kept in the Django cache. Instead of
+deleting cached responses on change, the generations are bumped, so that responses built under
+the old generations are never read again and simply expire:
+
+- `user:<id>`: bumped when a contract the user has access to (see access.py) changes, when the
+  user gains or loses access to a contract, or when the user's roles change
+- `public`: bumped when a convener approved contract changes, as these are visible to everyone
+- `staff`: bumped on every contract change, as conveners and superusers see (nearly) all
+- `epoch`: bumped when a change can't be narrowed down to users, e.g. access table rebuild
+
+Contract changes are picked up where contract versions are drawn (see workflow.py), which every
+change goes through, including transitions that bypass signals. Everything is kept in the
+'responses' cache, which has to be shared by all workers (see CACHES in settings.py) for
+invalidation to reach every one of them, responses also expire after `RESPONSE_TIMEOUT` to bound
+the staleness otherwise.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+import hashlib
+import time
+from typing import Callable, Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK
+
+from srpms.caches import CacheProxy
+from .models import Contract, ContractAccess
+
+KEY_PREFIX = 'contract_list'
+RESPONSE_TIMEOUT = 300
+
+cache = CacheProxy('responses')
+
+# Visibility scopes, see ContractViewSet.get_visible_queryset()
+SCOPE_ALL = 'all'
+SCOPE_SUBMITTED = 'submitted'
+SCOPE_USER = 'user'
+
+# Shared generations
+EPOCH = 'epoch'
+PUBLIC = 'public'
+STAFF = 'staff'
+
+STATS = ('hits', 'misses')
+
+
+def make_key(*parts) -> str:
+    return ':'.join([KEY_PREFIX] + [str(part) for part in parts])
+
+
+def get_user_generation(user_id: int) -> str:
+    return 'user:{}'.format(user_id)
+
+
+def new_generation() -> int:
+    """
+    Initial generation on cache miss (e.g. evicted), based on current time so that it won't
+    collide with generations seen before
+    """
+    return int(time.time() * 1000)
+
+
+def get_generations(names: List[str]) -> List[int]:
+    keys = [make_key('generation', name) for name in names]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, new_generation(), timeout=None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def bump_generations(names: Iterable[str]) -> None:
+    for name in names:
+        key = make_key('generation', name)
+        try:
+            cache.incr(key)
+        except ValueError:  # Missing key
+            cache.set(key, new_generation(), timeout=None)
+
+
+def invalidate(names: Iterable[str]) -> None:
+    """
+    Bump the generations once now and once more after the transaction commits, as another
+    request may build a response from the old data before the change become visible.
+    """
+    names = set(names)
+    if names:
+        bump_generations(names)
+        transaction.on_commit(lambda: bump_generations(names))
+
+
+def invalidate_users(user_ids: Iterable[int] = None) -> None:
+    """
+    Invalidate lists of the given users, e.g. on role change.
+
+    Args:
+        user_ids: primary keys of the users, all users if None
+    """
+    if user_ids is None:
+        invalidate([EPOCH])
+    else:
+        invalidate(get_user_generation(user_id) for user_id in user_ids)
+
+
+def invalidate_contracts(contract_ids: Iterable[int] = None) -> None:
+    """
+    Invalidate lists that contain the given contracts. Should be called before the change of
+    workflow state is persisted, as the persisted state tells whether the contract was visible
+    to everyone before the change, e.g. on convener disapproval.
+
+    Args:
+        contract_ids: primary keys of the contracts, all contracts if None
+    """
+    if contract_ids is None:
+        invalidate([EPOCH])
+        return
+
+    contract_ids = list(contract_ids)
+    names = {STAFF}
+    names.update(get_user_generation(user_id) for user_id in ContractAccess.objects.filter(
+            contract_id__in=contract_ids).values_list('user_id', flat=True).distinct())
+    if Contract.objects.filter(Q(convener_approval_date__isnull=False) |
+                               Q(state=Contract.STATE_FINALIZED), pk__in=contract_ids).exists():
+        names.add(PUBLIC)
+    invalidate(names)
+
+
+def get_params_digest(request: Request) -> str:
+    """Digest of query parameters, host is included since pagination links are absolute"""
+    params = sorted((key, value) for key, values in request.query_params.lists()
+                    for value in values)
+    return hashlib.md5(repr((request.get_host(), params)).encode()).hexdigest()
+
+
+def count(name: str) -> None:
+    key = make_key('stats', name)
+    try:
+        cache.incr(key)
+    except ValueError:  # Missing key
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats() -> Dict[str, int]:
+    """Hit and miss counts since last reset"""
+    return {name: cache.get(make_key('stats', name), 0) for name in STATS}
+
+
+def reset_stats() -> None:
+    cache.delete_many([make_key('stats', name) for name in STATS])
+
+
+def get_cached_list(request: Request, scope: str, get_response: Callable[[], Response]) \
+        -> Response:
+    """
+    Get the contract list response of the requester from cache, or build and cache it. Only
+    response data is cached, so that it can still be rendered in any accepted format.
+
+    Args:
+        request: the list request
+        scope: visibility scope of the requester, one of the `SCOPE_*`
+        get_response: build the response on cache miss
+    """
+    user_id = request.user.pk
+    generations = get_generations([EPOCH, PUBLIC if scope == SCOPE_USER else STAFF,
+                                   get_user_generation(user_id)])
+    key = make_key('response', user_id, scope, '.'.join(str(g) for g in generations),
+                   get_params_digest(request))
+
+    data = cache.get(key)
+    if data is not None:
+        count('hits')
+        return Response(data)
+
+    count('misses')
+    response = get_response()
+    if response.status_code == HTTP_200_OK:
+        cache.set(key, response.data, RESPONSE_TIMEOUT)
+    return response
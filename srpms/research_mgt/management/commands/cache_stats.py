@@ -0,0 +1,51 @@
+"""
+Report hit rate of every named cache (see CACHES in settings.py), optionally reset the counts
+with `--reset`. Memcached servers also report their own counts, which cover every client and
+are counted since the server started.
+
+Usage: python manage.py cache_stats [--reset]
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+
+def format_stats(stats: Dict[str, int]) -> str:
+    total = stats['hits'] + stats['misses']
+    return 'hits: {hits}, misses: {misses}, hit rate: {rate}'.format(
+            rate='{:.1%}'.format(stats['hits'] / total) if total else 'n/a', **stats)
+
+
+class Command(BaseCommand):
+    help = 'Report hit rate of every cache, optionally reset the counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset hit and miss counts after reporting')
+
+    def handle(self, *args, **options):
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            if not hasattr(cache, 'get_stats'):
+                self.stdout.write('{}: not counted by {}'.format(alias, type(cache).__name__))
+                continue
+
+            self.stdout.write('{}: {}'.format(alias, format_stats(cache.get_stats())))
+            server_stats = cache.get_server_stats()
+            if server_stats:
+                self.stdout.write('{} (server): {}'.format(alias, format_stats(server_stats)))
+
+            if options['reset']:
+                cache.reset_stats()
+
+        if options['reset']:
+            self.stdout.write(self.style.SUCCESS('Counts reset'))
@@ -0,0 +1,39 @@
+"""
+Report hit and miss counts of the contract list response cache, optionally reset the counts
+with `--reset`, or invalidate every cached list with `--invalidate`.
+
+Usage: python manage.py contract_list_cache [--reset] [--invalidate]
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from django.core.management.base import BaseCommand
+
+from research_mgt.list_cache import get_stats, reset_stats, invalidate_users
+
+
+class Command(BaseCommand):
+    help = 'Report contract list cache hit rate, optionally reset counts or invalidate lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Reset hit and miss counts after reporting')
+        parser.add_argument('--invalidate', action='store_true',
+                            help='Invalidate cached lists of all users')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        total = stats['hits'] + stats['misses']
+        self.stdout.write('Hits: {hits}, misses: {misses}, hit rate: {rate}'.format(
+                rate='{:.1%}'.format(stats['hits'] / total) if total else 'n/a', **stats))
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counts reset'))
+        if options['invalidate']:
+            invalidate_users()
+            self.stdout.write(self.style.SUCCESS('Cached lists invalidated'))
@@ -0,0 +1,47 @@
+"""
+Deliver queued emails (see outbox.py). Keeps polling for due messages until stopped, or exit
+once no message is due with `--once`.
+
+Usage: python manage.py deliver_outbox [--once] [--batch-size 50] [--interval 5]
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from research_mgt.outbox import BATCH_SIZE, deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails, keep polling for new ones unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no message is due')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of messages delivered over one connection')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait before polling again when no message is due')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            sent, failed = deliver_batch(batch_size)
+            if sent or failed:
+                self.stdout.write('Delivered {} message(s), {} failed'.format(sent, failed))
+
+            # A full batch means more messages may be due
+            if sent + failed < batch_size:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+                # The worker lives much longer than a request, drop connections that went away
+                close_old_connections()
@@ -0,0 +1,40 @@
+"""
+Rebuild the materialized contract access table from supervise and examine relations, or check
+the table against them with `--check`.
+
+Usage: python manage.py rebuild_contract_access [--check]
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from django.core.management.base import BaseCommand, CommandError
+
+from research_mgt.access import rebuild_contract_access, check_contract_access
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the contract access table, or check it against contract relations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report mismatches, exit with error if there is any')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = check_contract_access()
+            for user_id, (table_only, relation_only) in sorted(mismatches.items()):
+                self.stdout.write('User {}: only in table {}, only in relations {}'.format(
+                        user_id, sorted(table_only), sorted(relation_only)))
+            if mismatches:
+                raise CommandError('{} user(s) have mismatched contract access'
+                                   .format(len(mismatches)))
+            self.stdout.write(self.style.SUCCESS('Contract access table is consistent'))
+        else:
+            inserted, deleted = rebuild_contract_access()
+            self.stdout.write(self.style.SUCCESS(
+                    'Contract access rebuilt, {} row(s) inserted, {} row(s) deleted'
+                    .format(inserted, deleted)))
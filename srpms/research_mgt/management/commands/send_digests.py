@@ -0,0 +1,44 @@
+"""
+Queue notification digests that are due in the outbox (see digests.py), they are then delivered
+by `deliver_outbox`. Keeps checking for due digests until stopped, or exit after one run with
+`--once`.
+
+Usage: python manage.py send_digests [--once] [--interval 60]
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from research_mgt.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Queue notification digests that are due, keep checking for them unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit after queuing digests that are due')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds to wait before checking for due digests again')
+
+    def handle(self, *args, **options):
+        while True:
+            digests, items = send_digests()
+            if digests or items:
+                self.stdout.write('Queued {} digest(s) of {} notification(s)'
+                                  .format(digests, items))
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+            # The worker lives much longer than a request, drop connections that went away
+            close_old_connections()
@@ -0,0 +1,38 @@
+"""
+Verify the denormalized approval counters and workflow state of contracts against related
+tables, and repair drifted contracts with `--fix`.
+
+Usage: python manage.py verify_contract_status [--fix]
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from django.core.management.base import BaseCommand, CommandError
+
+from research_mgt.workflow import check_contract_status, refresh_contract_status
+
+
+class Command(BaseCommand):
+    help = 'Verify contract approval counters and workflow state, optionally repair them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Recompute counters and state of drifted contracts')
+
+    def handle(self, *args, **options):
+        drifted = check_contract_status()
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Contract status is consistent'))
+            return
+
+        self.stdout.write('Drifted contracts: {}'.format(drifted))
+        if not options['fix']:
+            raise CommandError('{} contract(s) have drifted status, run with --fix to repair'
+                               .format(len(drifted)))
+
+        refresh_contract_status(drifted)
+        self.stdout.write(self.style.SUCCESS('{} contract(s) repaired'.format(len(drifted))))
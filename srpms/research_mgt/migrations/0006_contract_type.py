@@ -0,0 +1,43 @@
+"""Add contract type column to contract, and back fill it from the existing child tables"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.apps.registry import Apps
+
+from research_mgt.models import Contract
+
+
+# noinspection PyPep8Naming
+def fill_contract_type(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    TheContract: Contract = apps.get_model('research_mgt', 'Contract')
+
+    TheContract.objects.filter(individual_project__isnull=False) \
+        .update(contract_type='individual_project')
+    TheContract.objects.filter(special_topic__isnull=False) \
+        .update(contract_type='special_topic')
+
+
+# noinspection PyPep8Naming
+def revert_fill_contract_type(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    pass  # The column would be removed anyway
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('research_mgt', '0005_activity_actions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='contract_type',
+            field=models.CharField(blank=True, choices=[('individual_project', 'Individual Project'), ('special_topic', 'Special Topic')], default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_contract_type, revert_fill_contract_type),
+    ]
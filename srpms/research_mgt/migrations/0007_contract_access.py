@@ -0,0 +1,66 @@
+"""Create the materialized contract access table, and populate it from existing relations"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.apps.registry import Apps
+import django.db.models.deletion
+
+from research_mgt.models import ContractAccess
+
+
+# noinspection PyPep8Naming
+def populate_contract_access(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    TheContract = apps.get_model('research_mgt', 'Contract')
+    TheSupervise = apps.get_model('research_mgt', 'Supervise')
+    TheAssessmentExamine = apps.get_model('research_mgt', 'AssessmentExamine')
+    TheContractAccess: ContractAccess = apps.get_model('research_mgt', 'ContractAccess')
+
+    rows = set()
+    for contract_id, owner_id in TheContract.objects.values_list('pk', 'owner_id'):
+        rows.add((owner_id, contract_id, 'owner'))
+    for contract_id, supervisor_id in TheSupervise.objects.filter(
+            contract__was_submitted=True).values_list('contract_id', 'supervisor_id'):
+        rows.add((supervisor_id, contract_id, 'supervisor'))
+    for contract_id, examiner_id in TheAssessmentExamine.objects.filter(
+            contract__was_submitted=True).values_list('contract_id', 'examine__examiner_id'):
+        rows.add((examiner_id, contract_id, 'examiner'))
+
+    TheContractAccess.objects.bulk_create([
+        TheContractAccess(user_id=user_id, contract_id=contract_id, role=role)
+        for user_id, contract_id, role in rows
+    ])
+
+
+# noinspection PyPep8Naming
+def revert_populate_contract_access(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    pass  # The table would be dropped anyway
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('research_mgt', '0006_contract_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractAccess',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('supervisor', 'Supervisor'), ('examiner', 'Examiner')], max_length=20)),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='research_mgt.Contract')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contract_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'contract', 'role')},
+            },
+        ),
+        migrations.RunPython(populate_contract_access, revert_populate_contract_access),
+    ]
@@ -0,0 +1,104 @@
+"""Add denormalized approval counters and workflow state to contract, and back fill them"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.db import migrations, models
+from django.db.models import Subquery, OuterRef, Count, Case, When, Value, Q, F
+from django.db.models.functions import Coalesce
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.apps.registry import Apps
+
+from research_mgt.models import Contract
+
+
+def count_per_contract(queryset):
+    counts = queryset.filter(contract=OuterRef('pk')).order_by().values('contract') \
+        .annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+# noinspection PyPep8Naming
+def fill_contract_status(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    TheContract: Contract = apps.get_model('research_mgt', 'Contract')
+    TheSupervise = apps.get_model('research_mgt', 'Supervise')
+    TheAssessment = apps.get_model('research_mgt', 'Assessment')
+    TheAssessmentExamine = apps.get_model('research_mgt', 'AssessmentExamine')
+
+    TheContract.objects.update(
+            supervise_count=count_per_contract(TheSupervise.objects.all()),
+            supervise_approved_count=count_per_contract(
+                    TheSupervise.objects.filter(supervisor_approval_date__isnull=False)),
+            assessment_count=count_per_contract(TheAssessment.objects.all()),
+            assessment_without_examiner_count=count_per_contract(
+                    TheAssessment.objects.filter(assessment_examine__isnull=True)),
+            assessment_examine_count=count_per_contract(TheAssessmentExamine.objects.all()),
+            assessment_examine_approved_count=count_per_contract(
+                    TheAssessmentExamine.objects.filter(examiner_approval_date__isnull=False)),
+    )
+
+    all_supervisors_approved = Q(supervise_count__gt=0,
+                                 supervise_approved_count=F('supervise_count'))
+    all_assessments_approved = Q(assessment_count__gt=0, assessment_without_examiner_count=0,
+                                 assessment_examine_approved_count=F('assessment_examine_count'))
+    TheContract.objects.update(state=Case(
+            When(convener_approval_date__isnull=False, then=Value('finalized')),
+            When(submit_date__isnull=True, then=Value('draft')),
+            When(all_supervisors_approved & all_assessments_approved,
+                 then=Value('examiner_approved')),
+            When(all_supervisors_approved, then=Value('supervisor_approved')),
+            default=Value('submitted'),
+            output_field=models.CharField()))
+
+
+# noinspection PyPep8Naming
+def revert_fill_contract_status(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    pass  # The columns would be removed anyway
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('research_mgt', '0007_contract_access'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='supervise_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='supervise_approved_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='assessment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='assessment_without_examiner_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='assessment_examine_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='assessment_examine_approved_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='state',
+            field=models.CharField(choices=[('draft', 'Draft'), ('submitted', 'Submitted'), ('supervisor_approved', 'Supervisor Approved'), ('examiner_approved', 'Examiner Approved'), ('finalized', 'Finalized')], db_index=True, default='draft', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_contract_status, revert_fill_contract_status),
+    ]
@@ -0,0 +1,49 @@
+"""Back fill the role flags of users from permissions, see research_mgt/role_flags.py"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.db import migrations, models
+from django.db.models import Q, Case, When, Value
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.apps.registry import Apps
+
+from accounts.models import SrpmsUser
+
+
+# noinspection PyPep8Naming
+def fill_role_flags(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    TheSrpmsUser: SrpmsUser = apps.get_model('accounts', 'SrpmsUser')
+
+    def flag(codename: str):
+        granted = TheSrpmsUser.objects.filter(
+                Q(is_superuser=True) |
+                Q(user_permissions__codename=codename,
+                  user_permissions__content_type__app_label='research_mgt') |
+                Q(groups__permissions__codename=codename,
+                  groups__permissions__content_type__app_label='research_mgt')
+        ).values('pk')
+        return Case(When(pk__in=granted, then=Value(True)), default=Value(False),
+                    output_field=models.BooleanField())
+
+    TheSrpmsUser.objects.update(is_approved_supervisor=flag('can_supervise'),
+                                is_course_convener=flag('can_convene'))
+
+
+# noinspection PyPep8Naming
+def revert_fill_role_flags(apps: Apps, schema_editor: BaseDatabaseSchemaEditor):
+    pass  # The columns would be removed anyway
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('accounts', '0003_srpmsuser_role_flags'),
+        ('research_mgt', '0008_contract_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_role_flags, revert_fill_role_flags),
+    ]
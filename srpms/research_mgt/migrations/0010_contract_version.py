@@ -0,0 +1,29 @@
+"""Add contract version drawn from a database sequence, see workflow.py"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('research_mgt', '0009_user_role_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+                sql=['CREATE SEQUENCE research_mgt_contract_version_seq',
+                     "UPDATE research_mgt_contract "
+                     "SET version = nextval('research_mgt_contract_version_seq')"],
+                reverse_sql=['DROP SEQUENCE research_mgt_contract_version_seq'],
+        ),
+    ]
@@ -0,0 +1,49 @@
+"""Add the email outbox, see outbox.py"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('research_mgt', '0010_contract_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False,
+                                        verbose_name='ID')),
+                ('subject', models.TextField()),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(max_length=254)),
+                ('recipients', django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=254), size=None)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'),
+                                                     ('failed', 'Failed')],
+                                            default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('create_date', models.DateTimeField(auto_now_add=True)),
+                ('sent_date', models.DateTimeField(blank=True, null=True)),
+                ('activity_log', models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='outbox_messages', to='research_mgt.ActivityLog')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(status='pending'), fields=['next_attempt'],
+                               name='outbox_pending_idx'),
+        ),
+    ]
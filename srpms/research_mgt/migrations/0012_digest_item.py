@@ -0,0 +1,37 @@
+"""Add notification digests, see digests.py"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('accounts', '0004_srpmsuser_digest_frequency'),
+        ('research_mgt', '0011_outbox_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False,
+                                        verbose_name='ID')),
+                ('subject', models.TextField()),
+                ('body', models.TextField()),
+                ('create_date', models.DateTimeField(auto_now_add=True)),
+                ('activity_log', models.ForeignKey(
+                        blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                        related_name='digest_items', to='research_mgt.ActivityLog')),
+                ('user', models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name='digest_items',
+                        to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -2,7 +2,7 @@
 Re-write of the NestedViewSetMixin of drf-extension, the default one has some un-desire behavior
 for our purpose. Mainly some security concerns.
 
-Note: Please do not continue to develop this mixin, as documented in urls.py, nested resources
+Note: Please do not continue to develop the nested mixin, as documented in urls.py, nested resources
       should be avoided according to best practices.
 """
 
@@ -13,14 +13,118 @@ __maintainer__ = "Dajie (Cooper) Yang"
 __email__ = "dajie.yang@anu.edu.au"
 
 from collections import OrderedDict
+from typing import Any, Callable
 
 from django.utils import six
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.db.models import Model
 from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
 from rest_framework.exceptions import NotFound
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from rest_framework_extensions.settings import extensions_api_settings
 
+from .reference import ReferenceCache
+from .conditional import is_not_modified, get_not_modified_response
+
+
+class EagerLoadingViewSetMixin(object):
+    """
+    Apply the serializer's prefetch plan (see serializer_utils.EagerLoadingMixin) to the view's
+    queryset, so that nested serializers don't query the database for every object.
+
+    Actions with model unrelated serializers (e.g. SubmitSerializer) are not affected. If the
+    serializer support sparse fieldsets, only requested fields would be loaded.
+    """
+
+    def get_queryset(self):
+        queryset = super(EagerLoadingViewSetMixin, self).get_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            fields = serializer_class.get_requested_fields(self.request) \
+                if hasattr(serializer_class, 'get_requested_fields') else None
+            queryset = serializer_class.setup_eager_loading(queryset, fields)
+        return queryset
+
+
+class ReferenceCacheViewSetMixin(object):
+    """
+    Serve list and retrieve of reference data from the in-process cache (see reference.py)
+    rather than the database. Requests that ask for opt-in fields of the serializer (see
+    serializer_utils.SparseFieldsetMixin) would go through the queryset as usual, as these
+    fields are not cached.
+
+    Cached responses are also HTTP cacheable, with an entity tag derived from the reference
+    data version. Browsers revalidate on every use, which is answered with 304 without
+    serializing the data as long as nothing changed. Responses are private, as the endpoints
+    require authentication. nginx caches them nonetheless, but only answers requests it has
+    authenticated (see nginx/conf.d/local.conf), and revalidates them with the same tag.
+    """
+
+    reference_cache: ReferenceCache = None
+
+    # Seconds browsers may use a response without revalidation
+    reference_max_age = 0
+
+    def is_reference_cache_usable(self) -> bool:
+        serializer_class = self.get_serializer_class()
+        opt_in_fields = set(getattr(serializer_class, 'opt_in_fields', ()))
+        if not opt_in_fields:
+            return True
+        fields = serializer_class.get_requested_fields(self.request)
+        return fields is not None and not fields & opt_in_fields
+
+    def get_reference_etag(self) -> str:
+        return '"{}-{}"'.format(self.basename, self.reference_cache.get_data()[0])
+
+    def get_reference_response(self, get_data: Callable[[], Any], etag: str) -> Response:
+        """
+        Response of cached data with HTTP caching headers, or 304 if the client's copy is still
+        valid, in which case the data is never serialized.
+
+        Args:
+            get_data: function that returns serialized data
+            etag: current entity tag
+        """
+        if is_not_modified(self.request, etag):
+            response = get_not_modified_response(etag)
+        else:
+            response = Response(get_data())
+            response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=self.reference_max_age,
+                            must_revalidate=True)
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_reference_cache_usable():
+            return super(ReferenceCacheViewSetMixin, self).list(request, *args, **kwargs)
+
+        return self.get_reference_response(
+                lambda: self.get_serializer(self.reference_cache.all(), many=True).data,
+                self.get_reference_etag())
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_reference_cache_usable():
+            return super(ReferenceCacheViewSetMixin, self).retrieve(request, *args, **kwargs)
+
+        etag = self.get_reference_etag()
+        instance = self.get_object()  # Not found and permission are checked before 304
+        return self.get_reference_response(lambda: self.get_serializer(instance).data, etag)
+
+    def get_object(self):
+        if self.request.method not in SAFE_METHODS or not self.is_reference_cache_usable():
+            return super(ReferenceCacheViewSetMixin, self).get_object()
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = self.reference_cache.get(int(self.kwargs[lookup_url_kwarg]))
+        except (ValueError, self.reference_cache.model.DoesNotExist):
+            raise NotFound()
+        self.check_object_permissions(self.request, obj)
+        return obj
+
 
 class NestedGenericViewSet(GenericViewSet):
     """
@@ -34,7 +138,10 @@ class NestedGenericViewSet(GenericViewSet):
     The rewrite is based on https://github.com/chibisov/drf-extensions/issues/142,
     credit to @Place1 for the ideas and sample implementation.
     """
-    resolved_parents = OrderedDict()
+    # Resolved parent objects of the current request, keyed by parent lookup field. This is
+    # assigned to the viewset instance on every request, never share it on the class, as
+    # threaded workers would then see parents of another request.
+    resolved_parents: OrderedDict = None
 
     def initial(self, request, *args, **kwargs) -> None:
         """
@@ -49,10 +156,11 @@ class NestedGenericViewSet(GenericViewSet):
         PATCH the parent models can be reused in our perform_create and perform_update
         handlers to avoid accessing the DB twice.
         """
+        self.resolved_parents = OrderedDict()
         try:
             # Parents resolve need to be done before initial(), as these parent
             # objects may be used for permission checking during initial().
-            self.resolve_parent_lookup_fields()
+            self.resolved_parents = self.resolve_parent_lookup_fields()
             super(NestedGenericViewSet, self).initial(request, *args, **kwargs)
         except NotFound as exc:
             # If any parent notfound, render the response context and throw the exception.
@@ -91,34 +199,39 @@ class NestedGenericViewSet(GenericViewSet):
                 result[query_lookup] = query_value
         return result
 
-    def resolve_parent_lookup_fields(self) -> None:
-        """Update resolved parents to the instance variable"""
+    def resolve_parent_lookup_fields(self) -> OrderedDict:
+        """
+        Resolve all parent objects with one query, and return them keyed by lookup field.
 
+        The innermost parent is retrieved with all outer parents joined by select_related, and
+        filtered by the outer parents' lookup values. For example, parents of
+        /contracts/2/assessments/1/examine/ are resolved by
+        `Assessment.objects.select_related('contract').get(pk=1, contract=2)`, so that the
+        request must have all previous parents matched.
+        """
+        # TODO: support django ORM query string, like 'project__slug'
         parents_query_dict = self.get_parents_query_dict()
+        if not parents_query_dict:
+            return OrderedDict()
 
         keys = list(parents_query_dict.keys())
+        field = keys[-1]
+        previous_fields = keys[:-1]
 
-        for i in range(len(keys)):
-            # the lookup key can be a django ORM query string like 'project__slug'
-            # so we want to split on the first '__' to get the related field's name,
-            # followed by the lookup string for the related model. Using the given
-            # example the related field will be 'project' and the 'slug' property
-            # will be the lookup on that related model
-
-            # TODO: support django ORM query string, like 'project__slug'
-            field = keys[i]
-            value = parents_query_dict[keys[i]]
-
-            related_descriptor: ForwardManyToOneDescriptor = getattr(self.queryset.model, field)
-            related_model: Model = related_descriptor.field.related_model
+        related_descriptor: ForwardManyToOneDescriptor = getattr(self.queryset.model, field)
+        related_model: Model = related_descriptor.field.related_model
 
-            # The request must have all previous parents matched, for example
-            # /contracts/2/assessment-methods/1/examine/ must satisfy assessment-method=1
-            # can be query by contract=2
-            previous_parents = {k: self.resolved_parents[k] for k in keys[:i]}
+        # select_related() without fields would join every non-null foreign key
+        parents = related_model.objects.all()
+        if previous_fields:
+            parents = parents.select_related(*previous_fields)
 
-            try:
-                self.resolved_parents[field] = related_model.objects.get(
-                        **{'pk': value, **previous_parents})
-            except related_model.DoesNotExist:
-                raise NotFound()
+        try:
+            parent = parents.get(pk=parents_query_dict[field],
+                                 **{k: parents_query_dict[k] for k in previous_fields})
+        except (related_model.DoesNotExist, ValueError):
+            raise NotFound()
+
+        resolved_parents = OrderedDict((k, getattr(parent, k)) for k in previous_fields)
+        resolved_parents[field] = parent
+        return resolved_parents
@@ -13,13 +13,19 @@ __maintainer__ = "Dajie (Cooper) Yang"
 __email__ = "dajie.yang@anu.edu.au"
 
 from datetime import datetime, MINYEAR, MAXYEAR
+from typing import Iterable
 from django.db import models
+from django.db.models import Case, When, Value, Exists, OuterRef, Q, F
+from django.db.models.functions import Coalesce
 from django.core import validators
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
 from accounts.models import SrpmsUser
+from .reference import ReferenceCache
 
 
 def get_semester() -> int:
@@ -43,7 +49,117 @@ class Course(models.Model):
         return self.name
 
 
+# Reference data cache of courses, see reference.py
+COURSES = ReferenceCache(Course, 'course_number')
+
+
+def boolean_case(condition: Q) -> Case:
+    """Convert a condition to a boolean expression that can be used for annotation"""
+    return Case(When(condition, then=Value(True)), default=Value(False),
+                output_field=models.BooleanField())
+
+
+# Conditions on the persisted approval counters of contract, see workflow.py
+ALL_SUPERVISORS_APPROVED = Q(supervise_count__gt=0, supervise_approved_count=F('supervise_count'))
+ALL_ASSESSMENTS_APPROVED = Q(assessment_count__gt=0, assessment_without_examiner_count=0,
+                             assessment_examine_approved_count=F('assessment_examine_count'))
+
+
+def get_workflow_state_expression() -> Case:
+    """
+    Expression that derive the workflow state from approval dates and approval counters, it
+    follows the order a contract goes through: submitted, approved by all supervisors, approved
+    by all examiners, and finally approved by convener.
+    """
+    return Case(
+            When(convener_approval_date__isnull=False, then=Value(Contract.STATE_FINALIZED)),
+            When(submit_date__isnull=True, then=Value(Contract.STATE_DRAFT)),
+            When(ALL_SUPERVISORS_APPROVED & ALL_ASSESSMENTS_APPROVED,
+                 then=Value(Contract.STATE_EXAMINER_APPROVED)),
+            When(ALL_SUPERVISORS_APPROVED, then=Value(Contract.STATE_SUPERVISOR_APPROVED)),
+            default=Value(Contract.STATE_SUBMITTED),
+            output_field=models.CharField())
+
+
+class ContractQuerySet(models.QuerySet):
+    """
+    Custom queryset for contracts, so that approval status flags can be computed by the database
+    in the same query, rather than calling model methods for every contract.
+    """
+
+    def with_approval_status(self, names: Iterable[str] = None) -> 'ContractQuerySet':
+        """
+        Annotate the result of is_submitted(), is_convener_approved(), is_examiner_nominated(),
+        is_all_supervisors_approved() and is_all_assessments_approved() to every contract, the
+        annotated names are prefixed with 'annotated_', e.g. 'annotated_is_submitted'.
+
+        Flags are derived from the contract's own columns, i.e. approval dates and approval
+        counters, so no join is required. Note that annotations are only valid at the time of
+        query, model methods should be used instead after related objects being modified.
+
+        Args:
+            names: only annotate these flags (e.g. ['is_submitted']), all flags if None
+        """
+        flags = {
+            'is_submitted': Q(submit_date__isnull=False),
+            'is_convener_approved': Q(convener_approval_date__isnull=False),
+            'is_examiner_nominated': Q(assessment_without_examiner_count=0),
+            'is_all_supervisors_approved': ALL_SUPERVISORS_APPROVED,
+            'is_all_assessments_approved': ALL_ASSESSMENTS_APPROVED,
+        }
+
+        names = list(flags.keys()) if names is None else [n for n in flags if n in names]
+        if not names:
+            return self
+        return self.annotate(**{'annotated_' + name: boolean_case(flags[name])
+                                for name in names})
+
+    def with_workflow_state(self) -> 'ContractQuerySet':
+        """
+        Annotate the workflow state computed from the approval dates and counters as
+        'workflow_state'. It should always equal to the persisted `state` column, use this
+        for verification only, and filter on `state` otherwise.
+        """
+        return self.annotate(workflow_state=get_workflow_state_expression())
+
+    def summary_values(self) -> 'ContractQuerySet':
+        """
+        Return compact summary of contracts as dictionaries rather than model instances, for
+        listing large number of contracts. Each row contains id, contract_type, title,
+        course_number, year, semester, owner_name and workflow_state.
+        """
+        return self.annotate(
+                workflow_state=F('state'),
+                title=Coalesce(F('individual_project__title'), F('special_topic__title')),
+                course_number=F('course__course_number'),
+                owner_name=F('owner__display_name'),
+        ).values('id', 'contract_type', 'title', 'course_number', 'year', 'semester',
+                 'owner_name', 'workflow_state')
+
+
 class Contract(models.Model):
+    # Contract types, the value is the related name of the corresponding child model
+    INDIVIDUAL_PROJECT = 'individual_project'
+    SPECIAL_TOPIC = 'special_topic'
+    CONTRACT_TYPES = [
+        (INDIVIDUAL_PROJECT, 'Individual Project'),
+        (SPECIAL_TOPIC, 'Special Topic'),
+    ]
+
+    # Workflow states, see get_workflow_state_expression()
+    STATE_DRAFT = 'draft'
+    STATE_SUBMITTED = 'submitted'
+    STATE_SUPERVISOR_APPROVED = 'supervisor_approved'
+    STATE_EXAMINER_APPROVED = 'examiner_approved'
+    STATE_FINALIZED = 'finalized'
+    WORKFLOW_STATES = [
+        (STATE_DRAFT, 'Draft'),
+        (STATE_SUBMITTED, 'Submitted'),
+        (STATE_SUPERVISOR_APPROVED, 'Supervisor Approved'),
+        (STATE_EXAMINER_APPROVED, 'Examiner Approved'),
+        (STATE_FINALIZED, 'Finalized'),
+    ]
+
     year = models.IntegerField(null=False, blank=False, default=datetime.now().year, validators=[
         validators.MinValueValidator(MINYEAR, 'Year number should > {}'.format(MINYEAR)),
         validators.MaxValueValidator(MAXYEAR, 'Year number should < {}'.format(MAXYEAR)),
@@ -76,6 +192,47 @@ class Contract(models.Model):
     # supervisors if they disapprove, however that would cause some confusion.
     was_submitted = models.BooleanField(default=False, blank=True)
 
+    # Type of the contract, i.e. which child table holds the rest of the contract. This is set
+    # automatically by child models on save, so that we don't need to probe child tables (one
+    # query each) to find out the contract type.
+    contract_type = models.CharField(max_length=20, choices=CONTRACT_TYPES, default='',
+                                     blank=True, editable=False)
+
+    # Denormalized approval counters and workflow state, these are maintained by signals (see
+    # workflow.py) whenever supervise, assessment or assessment examine change, so that the
+    # approval status can be read without joining related tables.
+    supervise_count = models.PositiveIntegerField(default=0, editable=False)
+    supervise_approved_count = models.PositiveIntegerField(default=0, editable=False)
+    assessment_count = models.PositiveIntegerField(default=0, editable=False)
+    assessment_without_examiner_count = models.PositiveIntegerField(default=0, editable=False)
+    assessment_examine_count = models.PositiveIntegerField(default=0, editable=False)
+    assessment_examine_approved_count = models.PositiveIntegerField(default=0, editable=False)
+    state = models.CharField(max_length=20, choices=WORKFLOW_STATES, default=STATE_DRAFT,
+                             db_index=True, editable=False)
+
+    # Drawn from a database sequence whenever the contract or any of its supervise, assessment
+    # or assessment examine change (see workflow.py), used as entity tag for conditional
+    # requests. Values are unique across contracts, and only grow.
+    version = models.BigIntegerField(default=0, editable=False)
+
+    objects = ContractQuerySet.as_manager()
+
+    def is_individual_project(self) -> bool:
+        return self.contract_type == self.INDIVIDUAL_PROJECT
+
+    def is_special_topic(self) -> bool:
+        return self.contract_type == self.SPECIAL_TOPIC
+
+    def get_typed_contract(self) -> 'Contract':
+        """
+        Return the child model instance (e.g. IndividualProject) of this contract, or the
+        contract itself if it does not have a type. The child would be queried unless it's
+        already loaded, e.g. through select_related.
+        """
+        if isinstance(self, (IndividualProject, SpecialTopic)) or not self.contract_type:
+            return self
+        return getattr(self, self.contract_type)
+
     def is_submitted(self) -> bool:
         """Check if the contract is submitted"""
         return bool(self.submit_date)
@@ -181,10 +338,9 @@ class Contract(models.Model):
         return super(Contract, self).save(*args, **kwargs)
 
     def __str__(self):
-        if hasattr(self, 'individual_project'):
-            return str(self.individual_project)
-        elif hasattr(self, 'special_topic'):
-            return str(self.special_topic)
+        contract = self.get_typed_contract()
+        if contract is not self:
+            return str(contract)
         else:
             return super(Contract, self).__str__()
 
@@ -199,6 +355,7 @@ class IndividualProject(Contract):
     description = models.CharField(max_length=1000, default='', blank=True)
 
     def save(self, *args, **kwargs):
+        self.contract_type = Contract.INDIVIDUAL_PROJECT
         return super(IndividualProject, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -215,6 +372,7 @@ class SpecialTopic(Contract):
     description = models.CharField(max_length=1000, default='', blank=True)
 
     def save(self, *args, **kwargs):
+        self.contract_type = Contract.SPECIAL_TOPIC
         return super(SpecialTopic, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -291,6 +449,30 @@ class AssessmentTemplate(models.Model):
         return self.name
 
 
+# Reference data cache of assessment templates, see reference.py
+TEMPLATES = ReferenceCache(AssessmentTemplate, 'name')
+
+
+class AssessmentQuerySet(models.QuerySet):
+    """Custom queryset for assessments, see ContractQuerySet"""
+
+    def with_approval_status(self) -> 'AssessmentQuerySet':
+        """
+        Annotate the result of is_all_examiners_approved() to every assessment, as
+        'annotated_is_all_examiners_approved'.
+        """
+        return self.annotate(
+                has_examiner=Exists(
+                        AssessmentExamine.objects.filter(assessment=OuterRef('pk'))),
+                has_examiner_not_approved=Exists(
+                        AssessmentExamine.objects.filter(assessment=OuterRef('pk'),
+                                                         examiner_approval_date__isnull=True)),
+        ).annotate(
+                annotated_is_all_examiners_approved=boolean_case(
+                        Q(has_examiner=True, has_examiner_not_approved=False)),
+        )
+
+
 class Assessment(models.Model):
     template = models.ForeignKey(AssessmentTemplate, related_name='assessment',
                                  on_delete=models.PROTECT, null=False, blank=False)
@@ -300,6 +482,8 @@ class Assessment(models.Model):
     due = models.DateField(null=True, blank=True)
     weight = models.IntegerField(null=False, blank=True)
 
+    objects = AssessmentQuerySet.as_manager()
+
     def is_all_examiners_approved(self) -> bool:
         """
         Check if this assessment has been approved by all its examiners, one assessment
@@ -313,6 +497,12 @@ class Assessment(models.Model):
     def get_all_examiners(self):
         return SrpmsUser.objects.filter(examine__assessment_examine__assessment=self)
 
+    def get_template(self) -> AssessmentTemplate:
+        """Template of the assessment, from reference data cache if not loaded already"""
+        if not Assessment.template.is_cached(self):
+            self.template = TEMPLATES.get(self.template_id)
+        return self.template
+
     def clean(self):
         """Apply constraint to the model"""
 
@@ -320,7 +510,8 @@ class Assessment(models.Model):
 
         if self.weight:
             # Ensure each assessment item is within the valid rage specified by the template
-            if self.weight > self.template.max_weight or self.weight < self.template.min_weight:
+            template = self.get_template()
+            if self.weight > template.max_weight or self.weight < template.min_weight:
                 errors['weight'] = 'Please keep the weight within the valid range given by template'
         if self.contract.convener_approval_date:
             errors['convener_approve'] = 'convener approved contract is not allowed to modify.'
@@ -333,7 +524,7 @@ class Assessment(models.Model):
 
         # Assign default marking weight based on template if not given
         if not self.weight:
-            self.weight = self.template.default_weight
+            self.weight = self.get_template().default_weight
 
         return super(Assessment, self).save(*args, **kwargs)
 
@@ -421,6 +612,33 @@ class AssessmentExamine(models.Model):
         return super(AssessmentExamine, self).save(*args, **kwargs)
 
 
+class ContractAccess(models.Model):
+    """
+    Materialized relation of which user can see which contract, and in which role. This table
+    is maintained by signals (see signals.py and access.py), so that listing visible contracts
+    for a user would be a single indexed lookup, instead of a join across supervise and examine.
+
+    Note that the table only include roles that grant visibility, i.e. supervisor and examiner
+    rows only exist after the contract has been submitted at least once. Finalized contracts
+    are visible to everyone, and as such are not part of this table.
+    """
+    ROLE_OWNER = 'owner'
+    ROLE_SUPERVISOR = 'supervisor'
+    ROLE_EXAMINER = 'examiner'
+    ROLES = [
+        (ROLE_OWNER, 'Owner'),
+        (ROLE_SUPERVISOR, 'Supervisor'),
+        (ROLE_EXAMINER, 'Examiner'),
+    ]
+
+    user = models.ForeignKey(SrpmsUser, related_name='contract_access', on_delete=models.CASCADE)
+    contract = models.ForeignKey(Contract, related_name='access', on_delete=models.CASCADE)
+    role = models.CharField(max_length=20, choices=ROLES)
+
+    class Meta:
+        unique_together = ('user', 'contract', 'role')
+
+
 class ActivityAction(models.Model):
     """For specifying activity action in activity log"""
     name = models.SlugField(unique=True)
@@ -448,6 +666,63 @@ class ActivityLog(models.Model):
     content_object = GenericForeignKey('content_type', 'object_id')
 
 
+class OutboxMessage(models.Model):
+    """
+    An email waiting to be delivered. Notifications are queued in the same transaction as the
+    activity they report, and delivered by the `deliver_outbox` command (see outbox.py), so that
+    requests never wait for the mail server.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = ArrayField(models.CharField(max_length=254))
+
+    # Activity that caused the notification, if any
+    activity_log = models.ForeignKey(ActivityLog, null=True, blank=True,
+                                     related_name='outbox_messages', on_delete=models.SET_NULL)
+
+    # Delivery status, failed deliveries are retried at next_attempt until given up
+    status = models.CharField(max_length=10, choices=STATUSES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(default='', blank=True)
+
+    create_date = models.DateTimeField(auto_now_add=True)
+    sent_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Only pending messages are ever polled
+            models.Index(fields=['next_attempt'], name='outbox_pending_idx',
+                         condition=Q(status='pending')),
+        ]
+
+
+class DigestItem(models.Model):
+    """
+    A notification held for a user who prefers digests, it's sent together with the user's other
+    notifications in one email by the `send_digests` command (see digests.py).
+    """
+    user = models.ForeignKey(SrpmsUser, related_name='digest_items', on_delete=models.CASCADE)
+    subject = models.TextField()
+    body = models.TextField()
+
+    # Activity that caused the notification, if any
+    activity_log = models.ForeignKey(ActivityLog, null=True, blank=True,
+                                     related_name='digest_items', on_delete=models.SET_NULL)
+
+    create_date = models.DateTimeField(auto_now_add=True)
+
+
 class AppPermission(models.Model):
     """A dummy model for holding permissions for this app"""
 
@@ -0,0 +1,113 @@
+"""
+Batched notification dispatch.
+
+Notification handlers in signals.py used to loop over recipients and queue one email per address,
+formatting the same message again for each of them. Handlers now call `notify()` once per event
+with all recipients. Within `dispatch_notifications()`, which views wrap around the activity log
+and its signal, notifications are collected rather than queued right away:
+
+- the per-recipient copies of a message are built once, each recipient gets an email of their
+  own, so that they won't see each other's address
+- the same message to the same recipient is only queued once, even if sent by different
+  handlers, e.g. a supervisor approval that also makes the contract ready for final approval
+- all emails are queued in one insert at the end of the block, in the same transaction
+- notifications to users who prefer digests are held for their next digest (see digests.py)
+
+The outbox worker then delivers them over one connection per batch (see outbox.py).
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+from django.db import transaction
+
+from .models import OutboxMessage, DigestItem, ActivityLog
+from .digests import get_digest_users
+
+_local = threading.local()
+
+# (recipient, subject, message)
+NotificationKey = Tuple[str, str, str]
+
+
+class NotificationBatch(object):
+    """Notifications collected by `dispatch_notifications()`, one message per recipient"""
+
+    def __init__(self):
+        self.messages: 'OrderedDict[NotificationKey, OutboxMessage]' = OrderedDict()
+
+    def add(self, subject: str, message: str, from_email: str, recipient_list: Iterable[str],
+            activity_log: ActivityLog = None) -> None:
+        for address in recipient_list:
+            key = (address, subject, message)
+            if address and key not in self.messages:
+                self.messages[key] = OutboxMessage(subject=subject, body=message,
+                                                   from_email=from_email, recipients=[address],
+                                                   activity_log=activity_log)
+
+    def flush(self) -> List[OutboxMessage]:
+        """
+        Queue collected messages in one insert, messages to users who prefer digests are held
+        for their next digest instead (see digests.py).
+        """
+        if not self.messages:
+            return []
+
+        digest_users = get_digest_users({address for address, _, _ in self.messages})
+        messages, items = [], []
+        for (address, subject, message), outbox_message in self.messages.items():
+            if address in digest_users:
+                items.append(DigestItem(user_id=digest_users[address], subject=subject,
+                                        body=message, activity_log=outbox_message.activity_log))
+            else:
+                messages.append(outbox_message)
+
+        DigestItem.objects.bulk_create(items)
+        messages = OutboxMessage.objects.bulk_create(messages)
+        self.messages.clear()
+        return messages
+
+
+def get_current_batch() -> Optional[NotificationBatch]:
+    return getattr(_local, 'batch', None)
+
+
+@contextmanager
+def dispatch_notifications():
+    """
+    Collect notifications sent within the block, and queue them at the end of it, in the same
+    transaction. Nested blocks join the outermost one. Nothing is queued if the block raises.
+    """
+    if get_current_batch() is not None:
+        yield get_current_batch()
+        return
+
+    batch = _local.batch = NotificationBatch()
+    try:
+        with transaction.atomic():
+            yield batch
+            batch.flush()
+    finally:
+        _local.batch = None
+
+
+def notify(subject: str, message: str, from_email: str, recipient_list: Iterable[str],
+           activity_log: ActivityLog = None) -> None:
+    """
+    Send one notification to every recipient, each as an email of its own. Same arguments as
+    send_mail(), queued at the end of the current `dispatch_notifications()` block if any,
+    otherwise right away.
+
+    Args:
+        activity_log: the activity that caused the notification, if any
+    """
+    with dispatch_notifications() as batch:
+        batch.add(subject, message, from_email, recipient_list, activity_log=activity_log)
@@ -0,0 +1,116 @@
+"""
+Transactional email outbox.
+
+Notification handlers in signals.py used to call send_mail() inside the request, so a stalled
+mail server would hold the request (and the gunicorn worker) for as long as the SMTP timeout.
+Emails are now queued as OutboxMessage rows by `notify()` (see notifications.py), in the same
+transaction as the activity that caused them, i.e. notifications are queued if and only if the
+change is committed. The `deliver_outbox` management command delivers them in the background.
+
+Workers claim batches with `SELECT ... FOR UPDATE SKIP LOCKED`, so that any number of workers
+can run at the same time without delivering a message twice. Each batch is delivered over one
+connection to the mail server, and failed deliveries are retried with exponential backoff
+until `MAX_ATTEMPTS` is reached.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+import logging
+from datetime import timedelta
+from typing import List, Tuple
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+
+# Delay before the first retry in seconds, doubled on every retry after
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 3600
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """Delay before the next attempt, after the given number of failed attempts"""
+    return timedelta(seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size: int = BATCH_SIZE) -> List[OutboxMessage]:
+    """
+    Lock due messages until the end of the current transaction, messages locked by other
+    workers are skipped rather than waited for.
+    """
+    return list(OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            status=OutboxMessage.STATUS_PENDING, next_attempt__lte=timezone.now()
+    ).order_by('next_attempt', 'pk')[:batch_size])
+
+
+def mark_sent(message: OutboxMessage) -> None:
+    message.status = OutboxMessage.STATUS_SENT
+    message.attempts += 1
+    message.sent_date = timezone.now()
+    message.save(update_fields=['status', 'attempts', 'sent_date'])
+
+
+def mark_failed(message: OutboxMessage, exc: Exception) -> None:
+    """Schedule a retry, or give up after MAX_ATTEMPTS"""
+    message.attempts += 1
+    message.last_error = '{}: {}'.format(type(exc).__name__, exc)
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = OutboxMessage.STATUS_FAILED
+        logger.error('Outbox message %s given up after %s attempts: %s',
+                     message.pk, message.attempts, message.last_error)
+    else:
+        message.next_attempt = timezone.now() + get_retry_delay(message.attempts)
+        logger.warning('Outbox message %s failed, retry at %s: %s',
+                       message.pk, message.next_attempt, message.last_error)
+    message.save(update_fields=['status', 'attempts', 'next_attempt', 'last_error'])
+
+
+def deliver_batch(batch_size: int = BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Claim one batch of due messages and deliver them over one connection. Messages stay locked
+    until their status is updated, as such they are never delivered by two workers.
+
+    Returns:
+        number of messages delivered, and number of messages failed
+    """
+    with transaction.atomic():
+        messages = claim_batch(batch_size)
+        if not messages:
+            return 0, 0
+
+        try:
+            connection = get_connection()
+            connection.open()
+        except Exception as exc:
+            for message in messages:
+                mark_failed(message, exc)
+            return 0, len(messages)
+
+        sent = failed = 0
+        try:
+            for message in messages:
+                email = EmailMessage(message.subject, message.body, message.from_email,
+                                     message.recipients, connection=connection)
+                try:
+                    email.send()
+                except Exception as exc:
+                    mark_failed(message, exc)
+                    failed += 1
+                else:
+                    mark_sent(message)
+                    sent += 1
+        finally:
+            connection.close()
+
+    return sent, failed
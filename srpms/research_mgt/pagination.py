@@ -0,0 +1,133 @@
+"""
+Pagination classes for views. Currently only contract listing is paginated, as it's the only list
+that grows without bound over the semesters.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Iterator, Sequence, Tuple
+
+from django.db.models import Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+def get_keyset_position(instance: Model, ordering: Sequence[str]) -> Tuple[int, ...]:
+    """
+    Get the position of an instance in the keyset, i.e. the values of all ordering fields.
+
+    Args:
+        instance: model instance (or dictionary from `.values()`) to get position from
+        ordering: list of ordering fields, may prefix with '-' for descending order
+    """
+    fields = [field.lstrip('-') for field in ordering]
+    if isinstance(instance, dict):
+        return tuple(instance[field] for field in fields)
+    return tuple(getattr(instance, field) for field in fields)
+
+
+def get_keyset_filter(ordering: Sequence[str], position: Sequence) -> Q:
+    """
+    Build the filter that selects every row after the given position. For ordering
+    ('year', 'semester', 'id') and position (2019, 1, 42) the result is:
+
+    year > 2019 OR (year = 2019 AND semester > 1) OR (year = 2019 AND semester = 1 AND id > 42)
+
+    Args:
+        ordering: list of ordering fields, may prefix with '-' for descending order
+        position: values of the ordering fields of the last row already returned
+    """
+    q = Q()
+    previous_fields = {}
+    for field, value in zip(ordering, position):
+        field_name = field.lstrip('-')
+        lookup = '{}__lt' if field.startswith('-') else '{}__gt'
+        q |= Q(**previous_fields, **{lookup.format(field_name): value})
+        previous_fields[field_name] = value
+    return q
+
+
+def iterate_by_keyset(queryset: QuerySet, ordering: Sequence[str], batch_size: int = 100) \
+        -> Iterator[Model]:
+    """
+    Iterate over a queryset in fixed sized batches, using the same keyset as the cursor
+    pagination. This keeps memory usage bounded for exports of arbitrary size, while
+    prefetch_related on the queryset would still be applied per batch.
+
+    Args:
+        queryset: the queryset to iterate over
+        ordering: list of ordering fields, must end with an unique field, e.g. 'id'
+        batch_size: number of rows retrieved per query
+    """
+    queryset = queryset.order_by(*ordering)
+    batch = list(queryset[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            break
+        position = get_keyset_position(batch[-1], ordering)
+        batch = list(queryset.filter(get_keyset_filter(ordering, position))[:batch_size])
+
+
+class ContractCursorPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination for contracts, ordered by (year, semester, id).
+
+    Unlike the default CursorPagination which only uses the first ordering field as position
+    (and an offset for duplicated values), the cursor here store the complete key, so a page
+    boundary won't shift when contracts are being approved or created concurrently.
+
+    Pagination is opt-in, the full list would be returned unless the client specify the
+    `page_size` query parameter. Only the `next` cursor is provided, clients are expected to
+    walk forward through the list.
+    """
+
+    ordering = ('year', 'semester', 'id')
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None and self.cursor.position is not None:
+            try:
+                position = [int(value) for value in self.cursor.position.split(',')]
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if len(position) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(get_keyset_filter(self.ordering, position))
+
+        # Retrieve one more item to determine whether there's a next page
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        self.has_next = len(results) > self.page_size
+        self.has_previous = False
+        self.next_position = get_keyset_position(self.page[-1], self.ordering) \
+            if self.page else None
+
+        self.display_page_controls = self.has_next and self.template is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        position = ','.join(str(value) for value in self.next_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        return None
@@ -8,6 +8,10 @@ would not pass the has_object_permission() check.
 Also, while all permission class support logical operators (i.e. OR, AND, and NOT), it is
 not recommend to use NOT operator on permissions that are model relevant, since the negation
 might not be completely complementary.
+
+Contract related facts (e.g. whether the requester supervise the contract) are read from the
+request scoped ContractRoleFacts (see roles.py), so that they are only queried once per request
+regardless of how many permission classes are composed.
 """
 
 __author__ = "Dajie (Cooper) Yang"
@@ -22,6 +26,7 @@ from rest_framework.request import Request
 
 from . import views
 from .models import (Contract, Supervise, Assessment, AssessmentExamine)
+from .roles import get_role_facts
 from accounts.models import SrpmsUser
 
 
@@ -97,7 +102,7 @@ class IsContractOwner(BasePermission):
 
     @staticmethod
     def check(contract: Contract, user: SrpmsUser):
-        return contract.owner == user
+        return contract.owner_id == user.pk
 
     def has_permission(self, request, view) -> bool:
         if isinstance(view, views.ContractViewSet):
@@ -106,7 +111,7 @@ class IsContractOwner(BasePermission):
             return self.check(view.resolved_parents['contract'], request.user)
         elif isinstance(view, views.AssessmentViewSet):
             contract: Contract = view.resolved_parents['contract']
-            if hasattr(contract, 'individual_project') and request.method in ['POST', 'DELETE']:
+            if contract.is_individual_project() and request.method in ['POST', 'DELETE']:
                 return False
             else:
                 return self.check(view.resolved_parents['contract'], request.user)
@@ -117,9 +122,9 @@ class IsContractOwner(BasePermission):
         if isinstance(obj, Contract):
             return self.check(obj, request.user)
         elif isinstance(obj, Assessment):
-            return self.check(obj.contract, request.user)
+            return get_role_facts(request, obj.contract_id).is_owner
         elif isinstance(obj, Supervise):
-            return self.check(obj.contract, request.user)
+            return get_role_facts(request, obj.contract_id).is_owner
 
         return False
 
@@ -130,21 +135,21 @@ class IsContractFormalSupervisor(BasePermission):
     message = 'You\'re not the formal supervisor of the contract'
 
     @staticmethod
-    def check(contract: Contract, user: SrpmsUser) -> bool:
-        return user in contract.get_all_formal_supervisors()
+    def check(request: Request, contract_id: int) -> bool:
+        return get_role_facts(request, contract_id).is_formal_supervisor
 
     def has_permission(self, request, view) -> bool:
         if isinstance(view, views.SuperviseViewSet):
-            return self.check(view.resolved_parents['contract'], request.user)
+            return self.check(request, view.resolved_parents['contract'].pk)
         elif isinstance(view, views.AssessmentExamineViewSet):
-            return self.check(view.resolved_parents['contract'], request.user)
+            return self.check(request, view.resolved_parents['contract'].pk)
         return False
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, Supervise):
-            return self.check(obj.contract, request.user)
+            return self.check(request, obj.contract_id)
         elif isinstance(obj, AssessmentExamine):
-            return self.check(obj.contract, request.user)
+            return self.check(request, obj.contract_id)
         return False
 
 
@@ -162,7 +167,7 @@ class IsContractSuperviseOwner(BasePermission):
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, Supervise):
-            return obj.supervisor == request.user
+            return obj.supervisor_id == request.user.pk
         return False
 
 
@@ -176,12 +181,12 @@ class IsContractAssessmentExaminer(BasePermission):
 
     def has_permission(self, request, view) -> bool:
         if isinstance(view, views.AssessmentExamineViewSet):
-            return request.user in view.resolved_parents['contract'].get_all_examiners()
+            return get_role_facts(request, view.resolved_parents['contract'].pk).is_examiner
         return False
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, AssessmentExamine):
-            return obj.examine.examiner == request.user
+            return obj.pk in get_role_facts(request, obj.contract_id).examine_ids
         return False
 
 
@@ -191,8 +196,9 @@ class IsExaminerNominator(BasePermission):
     message = 'You\'re not the nominator of this examiner'
 
     @staticmethod
-    def check(assessment_examine: AssessmentExamine, user):
-        return assessment_examine.examine.nominator == user
+    def check(request: Request, assessment_examine: AssessmentExamine):
+        facts = get_role_facts(request, assessment_examine.contract_id)
+        return assessment_examine.pk in facts.nominated_examine_ids
 
     def has_permission(self, request, view) -> bool:
         if isinstance(view, views.AssessmentExamineViewSet):
@@ -201,7 +207,7 @@ class IsExaminerNominator(BasePermission):
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, AssessmentExamine):
-            return self.check(obj, request.user)
+            return self.check(request, obj)
         return False
 
 
@@ -240,12 +246,8 @@ class ContractNotFinalApproved(BasePermission):
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, Contract):
             return not obj.is_convener_approved()
-        elif isinstance(obj, Supervise):
-            return not obj.contract.is_convener_approved()
-        elif isinstance(obj, Assessment):
-            return not obj.contract.is_convener_approved()
-        elif isinstance(obj, AssessmentExamine):
-            return not obj.contract.is_convener_approved()
+        elif isinstance(obj, (Supervise, Assessment, AssessmentExamine)):
+            return not get_role_facts(request, obj.contract_id).is_convener_approved
         return False
 
 
@@ -265,11 +267,11 @@ class ContractSubmitted(BasePermission):
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, Supervise):
-            return obj.contract.is_submitted()
+            return get_role_facts(request, obj.contract_id).is_submitted
         elif isinstance(obj, AssessmentExamine):
-            return obj.contract.is_submitted()
+            return get_role_facts(request, obj.contract_id).is_submitted
         elif isinstance(obj, Assessment):
-            return not obj.contract.is_submitted()
+            return not get_role_facts(request, obj.contract_id).is_submitted
         return False
 
 
@@ -289,11 +291,11 @@ class ContractNotSubmitted(BasePermission):
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, Supervise):
-            return not obj.contract.is_submitted()
+            return not get_role_facts(request, obj.contract_id).is_submitted
         elif isinstance(obj, Contract):
             return not obj.is_submitted()
         elif isinstance(obj, Assessment):
-            return not obj.contract.is_submitted()
+            return not get_role_facts(request, obj.contract_id).is_submitted
         return False
 
 
@@ -303,17 +305,17 @@ class ContractApprovedBySupervisor(BasePermission):
     message = 'This contract haven\'t been approved by supervisor yet'
 
     @staticmethod
-    def check(contract: Contract) -> bool:
-        return contract.is_all_supervisors_approved()
+    def check(request: Request, contract_id: int) -> bool:
+        return get_role_facts(request, contract_id).is_all_supervisors_approved
 
     def has_permission(self, request, view) -> bool:
         if isinstance(view, views.AssessmentExamineViewSet):
-            return self.check(view.resolved_parents['contract'])
+            return self.check(request, view.resolved_parents['contract'].pk)
         return False
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, AssessmentExamine):
-            return self.check(obj.contract)
+            return self.check(request, obj.contract_id)
         return False
 
 
@@ -324,28 +326,20 @@ class IsThisSupervisorNotApprove(BasePermission):
 
     @staticmethod
     def check(supervise: Supervise, user: SrpmsUser) -> bool:
-        return supervise.supervisor == user and not supervise.supervisor_approval_date
+        return supervise.supervisor_id == user.pk and not supervise.supervisor_approval_date
 
     def has_permission(self, request, view) -> bool:
         if isinstance(view, views.AssessmentExamineViewSet):
-            contract: Contract = view.resolved_parents['contract']
-            try:
-                supervise = contract.supervise.get(supervisor=request.user)
-                return self.check(supervise, request.user)
-            except Supervise.DoesNotExist:
-                return False
+            facts = get_role_facts(request, view.resolved_parents['contract'].pk)
+            return facts.is_supervisor and not facts.is_supervisor_approved
         elif isinstance(view, views.SuperviseViewSet):
             return True
         return False
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, AssessmentExamine):
-            contract: Contract = view.resolved_parents['contract']
-            try:
-                supervise = contract.supervise.get(supervisor=request.user)
-                return self.check(supervise, request.user)
-            except Supervise.DoesNotExist:
-                return False
+            facts = get_role_facts(request, view.resolved_parents['contract'].pk)
+            return facts.is_supervisor and not facts.is_supervisor_approved
         if isinstance(obj, Supervise):
             return self.check(obj, request.user)
         return False
@@ -363,5 +357,5 @@ class IsSuperviseNominator(BasePermission):
 
     def has_object_permission(self, request, view, obj) -> bool:
         if isinstance(obj, Supervise):
-            return obj.nominator == request.user
+            return obj.nominator_id == request.user.pk
         return False
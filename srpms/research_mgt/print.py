@@ -14,8 +14,7 @@ from typing import List, Union, Set, Tuple
 from collections import OrderedDict
 
 from django.template.loader import render_to_string
-from django.db.models.query import Q, QuerySet
-from django.contrib.auth.models import Permission
+from django.db.models.query import QuerySet
 from weasyprint import HTML
 from weasyprint.fonts import FontConfiguration
 
@@ -73,8 +72,6 @@ def print_individual_project_contract(contract: Contract, file_object: BytesIO,
     assessments: Union[QuerySet, List[Assessment]] = contract.assessment.all()
     assess_examines: Union[QuerySet, List[AssessmentExamine]] = contract.assessment_examine.all()
 
-    perm = Permission.objects.get(codename='can_supervise')
-
     owner: SrpmsUser = contract.owner
 
     course: Course = contract.course
@@ -83,12 +80,8 @@ def print_individual_project_contract(contract: Contract, file_object: BytesIO,
                                                                unit=course.units)
 
     # Supervisor information
-    formal_supervisors = supervises.filter(Q(supervisor__groups__permissions=perm) |
-                                           Q(supervisor__user_permissions=perm) |
-                                           Q(supervisor__is_superuser=True))
-    other_supervisors = supervises.filter(~Q(supervisor__groups__permissions=perm) &
-                                          ~Q(supervisor__user_permissions=perm) &
-                                          Q(supervisor__is_superuser=False))
+    formal_supervisors = supervises.filter(supervisor__is_approved_supervisor=True)
+    other_supervisors = supervises.filter(supervisor__is_approved_supervisor=False)
 
     # Supervisor approval information
     supervise_approval: List[Tuple[SrpmsUser, datetime]] = list()
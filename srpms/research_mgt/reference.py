@@ -0,0 +1,117 @@
+"""
+In-process cache of reference data, i.e. courses and assessment templates.
+
+Reference data rarely changes after deployment, but is read everywhere, e.g. every individual
+project creation looks up three assessment templates by name, and every assessment validation
+loads its template. Each process keeps a copy of the whole table instead, stamped with a version
+number kept in the Django cache. Saving or deleting an object bumps the version (see signals.py),
+and every process reloads its copy once it sees a different version. As such, the version check
+is one cache read rather than one database query, and is shared across workers as long as the
+cache backend is.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+import time
+from copy import copy
+from typing import Dict, List, Optional, Tuple, Type
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model
+
+# (version, objects by primary key, primary key by unique key)
+ReferenceData = Tuple[int, Dict[int, Model], Dict[str, int]]
+
+
+class ReferenceCache(object):
+    """
+    Copy of a small table, keyed by primary key and a unique field. Objects returned are
+    copies, so that callers modifying them won't affect other threads.
+    """
+
+    def __init__(self, model: Type[Model], key_field: str):
+        self.model = model
+        self.key_field = key_field
+        self.version_key = 'reference_version:{}'.format(model._meta.label_lower)
+        self.data: Optional[ReferenceData] = None
+
+    @staticmethod
+    def new_version() -> int:
+        """
+        Initial version on cache miss (e.g. evicted), based on current time so that it won't
+        collide with versions seen before
+        """
+        return int(time.time() * 1000)
+
+    def get_version(self) -> int:
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, self.new_version(), timeout=None)
+            version = cache.get(self.version_key)
+        return version
+
+    def bump_version(self) -> None:
+        try:
+            cache.incr(self.version_key)
+        except ValueError:  # Missing key
+            cache.set(self.version_key, self.new_version(), timeout=None)
+
+    def invalidate(self) -> None:
+        """
+        Drop the local copy and bump the version, once now and once more after the transaction
+        commits, as another process may reload the table before the change become visible.
+        """
+        self.data = None
+        self.bump_version()
+        transaction.on_commit(self.bump_version)
+
+    def clear(self) -> None:
+        """Drop the local copy only, e.g. after the database is rolled back in tests"""
+        self.data = None
+
+    def get_data(self) -> ReferenceData:
+        version = self.get_version()
+        data = self.data
+        if data is None or data[0] != version:
+            # Version is read before the table, a change in between would be picked up on the
+            # next access. The tuple is replaced as a whole, so readers never see half of it.
+            objects = {obj.pk: obj for obj in self.model.objects.all()}
+            keys = {getattr(obj, self.key_field): pk for pk, obj in objects.items()}
+            data = self.data = (version, objects, keys)
+        return data
+
+    def all(self) -> List[Model]:
+        """All objects ordered by primary key"""
+        objects = self.get_data()[1]
+        return [copy(objects[pk]) for pk in sorted(objects)]
+
+    def get(self, pk: int) -> Model:
+        """
+        Get object by primary key.
+
+        Raises:
+            DoesNotExist of the model, same as `Model.objects.get()`
+        """
+        objects = self.get_data()[1]
+        if pk not in objects:
+            raise self.model.DoesNotExist('{} matching pk={} does not exist.'.format(
+                    self.model._meta.object_name, pk))
+        return copy(objects[pk])
+
+    def get_by_key(self, key: str) -> Model:
+        """
+        Get object by the unique key, e.g. template name.
+
+        Raises:
+            DoesNotExist of the model, same as `Model.objects.get()`
+        """
+        version, objects, keys = self.get_data()
+        if key not in keys:
+            raise self.model.DoesNotExist('{} matching {}={} does not exist.'.format(
+                    self.model._meta.object_name, self.key_field, key))
+        return copy(objects[keys[key]])
@@ -0,0 +1,118 @@
+"""
+Process-wide registry of permission and group ids.
+
+Permissions and groups of this app are created by migration 0002_create_group_permission and
+never change afterwards, yet they used to be looked up by codename or name on every request.
+Ids are loaded on first use instead, and kept for the lifetime of the process. The registry is
+cleared by signals defined in signals.py whenever a permission or group is saved or deleted, so
+that changes made in the admin site take effect without restart (in the same process).
+
+Activity actions (created by migration 0005_activity_actions) are kept the same way, as model
+instances rather than ids, since activity logs are created with them. They used to be loaded on
+app ready, post_migrate and action save, after parsing the output of `showmigrations` to tell
+whether the migration was applied, which slowed down every worker start and test run.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Dict, Optional, Type
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.db.models import Model, QuerySet
+from django.contrib.auth.models import Permission, Group
+
+from .models import ActivityAction
+
+
+class IdRegistry(object):
+    """
+    Lazily loaded mapping from a unique key (e.g. permission codename) to primary key. The
+    mapping is replaced as a whole on load, so concurrent threads would at worst load it twice.
+    """
+
+    def __init__(self, model: Type[Model], key_field: str, **filters):
+        self.model = model
+        self.key_field = key_field
+        self.filters = filters
+        self.ids: Optional[Dict[str, int]] = None
+
+    def get_queryset(self) -> QuerySet:
+        return self.model.objects.filter(**self.filters)
+
+    def fetch(self) -> Dict[str, int]:
+        return dict(self.get_queryset().values_list(self.key_field, 'pk'))
+
+    def load(self) -> Dict[str, int]:
+        self.ids = self.fetch()
+        return self.ids
+
+    def clear(self) -> None:
+        self.ids = None
+
+    def get(self, key: str) -> int:
+        """
+        Get primary key by the unique key.
+
+        Raises:
+            DoesNotExist of the model, same as `Model.objects.get()`
+        """
+        ids = self.ids if self.ids is not None else self.load()
+        if key not in ids:
+            # Might be created after loaded, a missing key is an error anyway, so reload is cheap
+            ids = self.load()
+        if key not in ids:
+            raise self.model.DoesNotExist('{} matching {}={} does not exist.'.format(
+                    self.model._meta.object_name, self.key_field, key))
+        return ids[key]
+
+
+class ObjectRegistry(IdRegistry):
+    """
+    Same as IdRegistry, but maps to model instances instead of primary keys. Instances are shared
+    by all threads of the process, and must not be modified.
+    """
+
+    def fetch(self) -> Dict[str, Model]:
+        try:
+            return self.get_queryset().in_bulk(field_name=self.key_field)
+        except DatabaseError as exc:
+            raise ImproperlyConfigured(
+                    'Unable to load {} from the database, make sure migrations are applied with '
+                    '`python manage.py migrate`: {}'.format(self.model._meta.verbose_name_plural,
+                                                             exc)) from exc
+
+
+# Permissions of this app, keyed by codename, e.g. PERMISSIONS.get('can_supervise')
+PERMISSIONS = IdRegistry(Permission, 'codename', content_type__app_label='research_mgt')
+
+# All groups, keyed by name, e.g. GROUPS.get('approved_supervisors')
+GROUPS = IdRegistry(Group, 'name')
+
+# All activity actions, keyed by name, e.g. ACTIONS.get('contract_submit')
+ACTIONS = ObjectRegistry(ActivityAction, 'name')
+
+
+def get_permission_id(codename: str) -> int:
+    """Primary key of a research_mgt permission"""
+    return PERMISSIONS.get(codename)
+
+
+def get_group_id(name: str) -> int:
+    """Primary key of a group"""
+    return GROUPS.get(name)
+
+
+def get_action(name: str) -> ActivityAction:
+    """Activity action for logging, the instance must not be modified"""
+    return ACTIONS.get(name)
+
+
+def clear_registry() -> None:
+    PERMISSIONS.clear()
+    GROUPS.clear()
+    ACTIONS.clear()
@@ -0,0 +1,79 @@
+"""
+Maintain the materialized role flags of users (is_approved_supervisor and is_course_convener).
+
+Whether a user is an approved supervisor or a course convener is defined by permissions, which
+can be granted directly or through groups. Filtering users by permission means joining both
+many-to-many tables and apply DISTINCT, and the negated form becomes anti-joins over both of
+them. The flags are persisted on the user instead, so that filtering is an indexed equality.
+
+Flags are re-derived from permissions rather than toggled, and are kept in sync by signals
+defined in signals.py. As with the permission filter they replaced, Django superusers have all
+the flags set.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Iterable, List
+
+from django.db.models import Q, F, Case, When, Value, BooleanField, Expression
+
+from accounts.models import SrpmsUser
+from .registry import get_permission_id
+
+# Flag field on user -> codename of the research_mgt permission that it reflects
+ROLE_FLAGS = {
+    'is_approved_supervisor': 'can_supervise',
+    'is_course_convener': 'can_convene',
+}
+
+
+def get_role_flag_expression(codename: str) -> Expression:
+    """
+    Expression that derive a flag from the user's permissions, i.e. granted directly, through
+    groups, or being a superuser.
+
+    Args:
+        codename: codename of the research_mgt permission
+    """
+    perm_id = get_permission_id(codename)
+    granted = SrpmsUser.objects.filter(
+            Q(is_superuser=True) | Q(user_permissions=perm_id) | Q(groups__permissions=perm_id)
+    ).values('pk')
+    return Case(When(pk__in=granted, then=Value(True)), default=Value(False),
+                output_field=BooleanField())
+
+
+def refresh_role_flags(user_ids: Iterable[int] = None) -> None:
+    """
+    Re-derive role flags from permissions.
+
+    Args:
+        user_ids: primary keys of users to refresh, all users if None
+    """
+    users = SrpmsUser.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=list(user_ids))
+
+    users.update(**{flag: get_role_flag_expression(codename)
+                    for flag, codename in ROLE_FLAGS.items()})
+
+
+def check_role_flags() -> List[int]:
+    """
+    Compare persisted flags against permissions.
+
+    Returns:
+        primary keys of users whose flags have drifted
+    """
+    computed = {'computed_' + flag: get_role_flag_expression(codename)
+                for flag, codename in ROLE_FLAGS.items()}
+    mismatch = Q()
+    for flag in ROLE_FLAGS:
+        mismatch |= ~Q(**{flag: F('computed_' + flag)})
+
+    drifted = SrpmsUser.objects.annotate(**computed).filter(mismatch)
+    return list(drifted.order_by('pk').values_list('pk', flat=True))
@@ -0,0 +1,129 @@
+"""
+Request scoped facts about the requester's relationship to a contract, e.g. whether the requester
+is the owner, a supervisor, or an examiner of the contract.
+
+Permission classes in permissions.py are composed with logical operators, and are evaluated for
+both has_permission() and has_object_permission(). Without caching, the same fact would be
+queried again and again during one request. These facts are loaded on first use and stored on
+the request, so that they would not outlive the request.
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Dict, Set, Optional
+
+from django.db.models import OuterRef, Subquery, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from accounts.models import SrpmsUser
+from .models import Contract, Supervise, AssessmentExamine
+
+
+class ContractRoleFacts(object):
+    """
+    Requester's relationship to a contract, as well as the contract's status that are relevant
+    to permission checking.
+
+    Contract status and supervise relation are loaded in one query on creation, examine
+    relations are loaded in another query on first access.
+    """
+
+    def __init__(self, contract_id: int, user: SrpmsUser):
+        self.contract_id = contract_id
+        self.user = user
+
+        supervise = Supervise.objects.filter(contract=OuterRef('pk'), supervisor=user)
+        try:
+            row = Contract.objects.filter(pk=contract_id).with_approval_status().annotate(
+                    supervise_id=Subquery(supervise.values('pk')[:1]),
+                    supervise_is_formal=Subquery(supervise.values('is_formal')[:1]),
+                    supervise_approval_date=Subquery(
+                            supervise.values('supervisor_approval_date')[:1]),
+            ).values('owner_id', 'submit_date', 'convener_approval_date',
+                     'annotated_is_all_supervisors_approved', 'annotated_is_examiner_nominated',
+                     'supervise_id', 'supervise_is_formal', 'supervise_approval_date').get()
+        except Contract.DoesNotExist:
+            raise NotFound()
+
+        # Contract status
+        self.is_submitted: bool = bool(row['submit_date'])
+        self.is_convener_approved: bool = bool(row['convener_approval_date'])
+        self.is_all_supervisors_approved: bool = row['annotated_is_all_supervisors_approved']
+        self.is_examiner_nominated: bool = row['annotated_is_examiner_nominated']
+
+        # Owner
+        self.is_owner: bool = row['owner_id'] == user.pk
+
+        # Supervise relation
+        self.supervise_id: Optional[int] = row['supervise_id']
+        self.is_supervisor: bool = row['supervise_id'] is not None
+        self.is_formal_supervisor: bool = self.is_supervisor and bool(row['supervise_is_formal'])
+        self.is_supervisor_approved: bool = bool(row['supervise_approval_date'])
+
+    @cached_property
+    def assessment_examines(self) -> Dict[int, dict]:
+        """
+        Assessment examine relations of this contract that the requester is either the examiner
+        or the examiner nominator, keyed by the assessment examine id.
+        """
+        rows = AssessmentExamine.objects.filter(
+                Q(examine__examiner=self.user) | Q(examine__nominator=self.user),
+                contract_id=self.contract_id
+        ).values('pk', 'assessment_id', 'examine__examiner_id', 'examine__nominator_id',
+                 'examiner_approval_date')
+        return {row['pk']: row for row in rows}
+
+    @cached_property
+    def examine_ids(self) -> Set[int]:
+        """Assessment examine relations that the requester is the examiner"""
+        return {pk for pk, row in self.assessment_examines.items()
+                if row['examine__examiner_id'] == self.user.pk}
+
+    @cached_property
+    def examine_assessment_ids(self) -> Set[int]:
+        """Assessments that the requester examine"""
+        return {self.assessment_examines[pk]['assessment_id'] for pk in self.examine_ids}
+
+    @cached_property
+    def nominated_examine_ids(self) -> Set[int]:
+        """Assessment examine relations that the requester nominated the examiner"""
+        return {pk for pk, row in self.assessment_examines.items()
+                if row['examine__nominator_id'] == self.user.pk}
+
+    @property
+    def is_examiner(self) -> bool:
+        return bool(self.examine_ids)
+
+    @property
+    def is_convener(self) -> bool:
+        return self.user.has_perm('research_mgt.can_convene')
+
+    @property
+    def is_superuser(self) -> bool:
+        return self.user.has_perm('research_mgt.is_mgt_superuser')
+
+
+def get_role_facts(request: Request, contract_id: int) -> ContractRoleFacts:
+    """
+    Get the requester's role facts for the given contract, facts would only be loaded once
+    for each contract during the request.
+
+    Args:
+        request: the current request, facts would be stored on it
+        contract_id: primary key of the contract
+    """
+    cache: Dict[int, ContractRoleFacts] = getattr(request, '_contract_role_facts', None)
+    if cache is None:
+        cache = {}
+        request._contract_role_facts = cache
+
+    if contract_id not in cache:
+        cache[contract_id] = ContractRoleFacts(contract_id, request.user)
+
+    return cache[contract_id]
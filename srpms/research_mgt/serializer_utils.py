@@ -9,8 +9,16 @@ __maintainer__ = "Dajie (Cooper) Yang"
 __email__ = "dajie.yang@anu.edu.au"
 
 from datetime import datetime
+from typing import Tuple, List, Union, Dict, Set, Optional
 from django.utils import timezone
-from rest_framework.serializers import BooleanField, ValidationError, Serializer, CharField
+from django.db import models
+from django.db.models import QuerySet, Prefetch, Subquery, OuterRef
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.serializers import (BooleanField, ValidationError, Serializer, CharField,
+                                        ReadOnlyField, ListField, IntegerField)
 
 
 class DateTimeBooleanField(BooleanField):
@@ -52,6 +60,169 @@ class DateTimeBooleanField(BooleanField):
         return bool(attr)
 
 
+class AnnotatedReadOnlyField(ReadOnlyField):
+    """
+    Read-only field that prefer the value annotated by queryset, e.g. the approval status
+    annotated by `ContractQuerySet.with_approval_status()`.
+
+    The annotation is looked up with the name 'annotated_<source>'. If the instance is not
+    annotated (e.g. newly created instance), fall back to the source attribute, which would
+    be called if it's a method.
+    """
+
+    def get_attribute(self, instance):
+        annotation = 'annotated_{}'.format(self.source)
+        if hasattr(instance, annotation):
+            return getattr(instance, annotation)
+        return super(AnnotatedReadOnlyField, self).get_attribute(instance)
+
+
+class EagerLoadingMixin(object):
+    """
+    Serializer mixin for declaring related objects the serializer would access, so that views
+    can load them in bulk through `setup_eager_loading()`, rather than one query per related
+    object during serialization.
+
+    Serializers with nested serializers should override `get_prefetch_related()` to include
+    the nested serializer's plan through `Prefetch` objects.
+
+    If only part of the fields are requested (see SparseFieldsetMixin), lookups for fields not
+    requested would be skipped. A lookup is matched to the field of the same name, unless
+    specified otherwise in `lookup_field_names`, e.g. {'template': 'template_info'}.
+    """
+
+    select_related_fields: Tuple[str, ...] = ()
+    prefetch_related_fields: Tuple[Union[str, Prefetch], ...] = ()
+    lookup_field_names: Dict[str, str] = {}
+
+    @classmethod
+    def is_lookup_requested(cls, lookup: Union[str, Prefetch], fields: Set[str] = None) -> bool:
+        """
+        Check whether a related lookup is needed by the requested fields.
+
+        Args:
+            lookup: lookup string or Prefetch object
+            fields: requested field names, None for all fields
+        """
+        if fields is None:
+            return True
+        if isinstance(lookup, Prefetch):
+            lookup = lookup.prefetch_to
+        root = lookup.split('__')[0]
+        return cls.lookup_field_names.get(root, root) in fields
+
+    @classmethod
+    def get_select_related(cls, fields: Set[str] = None) -> List[str]:
+        """Return lookups that would be passed to `select_related()`"""
+        return [lookup for lookup in cls.select_related_fields
+                if cls.is_lookup_requested(lookup, fields)]
+
+    @classmethod
+    def get_prefetch_related(cls, fields: Set[str] = None) -> List[Union[str, Prefetch]]:
+        """Return lookups that would be passed to `prefetch_related()`"""
+        return [lookup for lookup in cls.prefetch_related_fields
+                if cls.is_lookup_requested(lookup, fields)]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset: QuerySet, fields: Set[str] = None) -> QuerySet:
+        """
+        Apply the prefetch plan to the queryset.
+
+        Args:
+            queryset: the queryset that would be serialized by this serializer
+            fields: requested field names, None for all fields
+        """
+        select_related = cls.get_select_related(fields)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        prefetch_related = cls.get_prefetch_related(fields)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+def array_subquery(queryset: QuerySet, outer_field: str, field: str = 'pk',
+                   output_field=None) -> Subquery:
+    """
+    Sub-query that aggregate values of rows related to the outer object into an array, e.g.
+    `array_subquery(Contract.objects.all(), 'owner')` annotated on users gives the ids of
+    contracts each user own. The result would be None if there's no related row.
+
+    Args:
+        queryset: queryset of related rows
+        outer_field: lookup from the related rows to the outer object
+        field: the field to aggregate, distinct values only
+        output_field: model field of the aggregated values, default to IntegerField
+    """
+    arrays = queryset.filter(**{outer_field: OuterRef('pk')}).order_by().values(outer_field) \
+        .annotate(array=ArrayAgg(field, distinct=True)).values('array')
+    return Subquery(arrays, output_field=ArrayField(output_field or models.IntegerField()))
+
+
+class SparseFieldsetMixin(object):
+    """
+    Serializer mixin that allow clients to choose the fields to be returned, through the
+    `fields` and `expand` query parameters:
+
+    - `?fields=id,year,is_submitted` only return the listed fields
+    - `?expand=supervise` return all fields, except expandable fields not listed
+    - `?fields=id&expand=supervise` return id and supervise
+
+    Expandable fields are the expensive ones, i.e. nested serializers and method fields, they
+    are left out once any of the parameters present, unless listed. Without the parameters,
+    all fields are returned as before.
+
+    Fields not requested are removed from the serializer, so they are never computed. Views
+    should also pass `get_requested_fields()` to `setup_eager_loading()` (see
+    EagerLoadingViewSetMixin), so that they are not prefetched either. Only applies to the
+    top level serializer of safe requests, nested serializers always return all fields.
+
+    Opt-in fields are expandable fields that are left out even without the parameters, and
+    for any other request as well, e.g. unbounded lists of related ids.
+    """
+
+    expandable_fields: Tuple[str, ...] = ()
+    opt_in_fields: Tuple[str, ...] = ()
+
+    @staticmethod
+    def parse_field_names(value: str) -> Set[str]:
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    @classmethod
+    def get_requested_fields(cls, request: Request = None) -> Optional[Set[str]]:
+        """
+        Return the names of requested fields, or None if all fields are requested.
+
+        Args:
+            request: the current request, query parameters are read from it
+        """
+        if request is None or request.method not in SAFE_METHODS:
+            params = {}
+        else:
+            params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return set(cls.Meta.fields) - set(cls.opt_in_fields) if cls.opt_in_fields else None
+
+        all_fields = set(cls.Meta.fields)
+        expandable = set(cls.expandable_fields)
+        if 'fields' in params:
+            fields = cls.parse_field_names(params['fields'])
+        else:
+            fields = all_fields - expandable
+        fields |= cls.parse_field_names(params.get('expand', '')) & expandable
+
+        return fields & all_fields
+
+    def __init__(self, *args, **kwargs):
+        super(SparseFieldsetMixin, self).__init__(*args, **kwargs)
+
+        # Nested serializers are not given context on init, so they won't be affected
+        requested = self.get_requested_fields(self._context.get('request', None))
+        if requested is not None:
+            for name in set(self.fields.keys()) - requested:
+                self.fields.pop(name)
+
+
 class SubmitSerializer(Serializer):
     """For converting boolean to current server time only, model unrelated"""
 
@@ -76,3 +247,10 @@ class ApproveSerializer(Serializer):
 
     def update(self, instance, validated_data):
         pass
+
+
+class BulkApproveSerializer(ApproveSerializer):
+    """Approve or disapprove a list of objects by their primary keys, model unrelated"""
+
+    ids = ListField(child=IntegerField(min_value=1), write_only=True, allow_empty=False,
+                    max_length=500)
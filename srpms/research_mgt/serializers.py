@@ -12,23 +12,37 @@ __credits__ = ["Dajie Yang", "Euikyum Yang"]
 __maintainer__ = "Dajie (Cooper) Yang"
 __email__ = "dajie.yang@anu.edu.au"
 
-from typing import Tuple
+from typing import Tuple, List, Set
 from django.db import transaction
+from django.db import models
+from django.db.models import QuerySet, Prefetch
+from django.contrib.auth.models import Permission
 from rest_framework import serializers
 
 from accounts.models import SrpmsUser
+from research_mgt.serializer_utils import (AnnotatedReadOnlyField, EagerLoadingMixin,
+                                           SparseFieldsetMixin, array_subquery)
 from research_mgt.models import (Course, AssessmentTemplate,
                                  Contract, IndividualProject, SpecialTopic, Supervise, Examine,
-                                 Assessment, AssessmentExamine)
+                                 Assessment, AssessmentExamine, TEMPLATES)
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    """
+    Contracts of the course are unbounded and rarely needed, they're only returned with
+    `?expand=contract`, see SparseFieldsetMixin.
+    """
+
     contract = serializers.PrimaryKeyRelatedField(read_only=True, many=True)
 
     class Meta:
         model = Course
         fields = ['id', 'course_number', 'name', 'units', 'contract']
 
+    expandable_fields = ('contract',)
+    opt_in_fields = ('contract',)
+    prefetch_related_fields = ('contract',)
+
 
 class AssessmentTemplateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,10 +50,27 @@ class AssessmentTemplateSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'max_weight', 'min_weight', 'default_weight']
 
 
-class UserContractSerializer(serializers.ModelSerializer):
-    """For serializing user and its associated contracts"""
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Basic user information only, for side-loading users referenced by other objects"""
+
+    class Meta:
+        model = SrpmsUser
+        fields = ['id', 'username', 'first_name', 'last_name', 'email', 'display_name', 'uni_id']
+
+
+class UserContractSerializer(SparseFieldsetMixin, EagerLoadingMixin,
+                             serializers.ModelSerializer):
+    """
+    For serializing user and its associated contracts. Contract lists are expandable, see
+    SparseFieldsetMixin.
+
+    Contract ids and permissions are read from annotations added by `setup_eager_loading()`,
+    so that a list of users is serialized in a constant number of queries. Without annotations
+    (e.g. user created in the same request), they're queried for the user directly. Role flags
+    are persisted on the user, see research_mgt/role_flags.py
+    """
 
-    own = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    own = serializers.SerializerMethodField(read_only=True)
     supervise = serializers.SerializerMethodField(read_only=True)
     examine = serializers.SerializerMethodField(read_only=True)
     convene = serializers.SerializerMethodField(read_only=True)
@@ -52,6 +83,87 @@ class UserContractSerializer(serializers.ModelSerializer):
                   'is_approved_supervisor', 'is_course_convener',
                   'own', 'convene', 'supervise', 'examine']
 
+    expandable_fields = ('own', 'convene', 'supervise', 'examine')
+
+    @staticmethod
+    def get_own_contracts() -> QuerySet:
+        return Contract.objects.all()
+
+    @staticmethod
+    def get_supervise_contracts() -> QuerySet:
+        return Contract.objects.filter(submit_date__isnull=False)
+
+    @staticmethod
+    def get_examine_contracts() -> QuerySet:
+        # The contract must has been approved by supervisor
+        return Contract.objects.filter(supervise__supervisor_approval_date__isnull=False)
+
+    @staticmethod
+    def get_user_permissions() -> QuerySet:
+        """Permissions of this app, granted to user directly or through groups"""
+        return Permission.objects.filter(content_type__app_label='research_mgt')
+
+    @classmethod
+    def setup_eager_loading(cls, queryset: QuerySet, fields: Set[str] = None) -> QuerySet:
+        """
+        Annotate contract ids as arrays, and codenames of the user's permissions for checking
+        the research_mgt superuser permission, each as one sub-query.
+        """
+        annotations = {
+            'own': ('annotated_own',
+                    lambda: array_subquery(cls.get_own_contracts(), 'owner')),
+            'supervise': ('annotated_supervise',
+                          lambda: array_subquery(cls.get_supervise_contracts(),
+                                                 'supervise__supervisor')),
+            'examine': ('annotated_examine',
+                        lambda: array_subquery(cls.get_examine_contracts(),
+                                               'assessment_examine__examine__examiner')),
+        }
+        queryset = queryset.annotate(**{
+            name: expression() for field, (name, expression) in annotations.items()
+            if fields is None or field in fields})
+
+        if fields is None or 'convene' in fields:
+            queryset = queryset.annotate(
+                    annotated_user_perms=array_subquery(cls.get_user_permissions(),
+                                                        'user', 'codename', models.CharField()),
+                    annotated_group_perms=array_subquery(cls.get_user_permissions(),
+                                                         'group__user', 'codename',
+                                                         models.CharField()))
+        return queryset
+
+    def has_perm(self, obj: SrpmsUser, codename: str) -> bool:
+        """
+        Same as `obj.has_perm('research_mgt.<codename>')`, but read from annotations if
+        available. Follows ModelBackend, i.e. inactive user has no permission, and active
+        superuser has all permissions.
+        """
+        if not hasattr(obj, 'annotated_user_perms'):
+            return obj.has_perm('research_mgt.' + codename)
+        if not obj.is_active:
+            return False
+        return obj.is_superuser or codename in (obj.annotated_user_perms or []) or \
+            codename in (obj.annotated_group_perms or [])
+
+    def get_context_ids(self, key: str, queryset: QuerySet) -> Tuple[int]:
+        """Contract ids shared by all users being serialized, queried once per serialization"""
+        cache = self.context.setdefault('user_contract_ids', {})
+        if key not in cache:
+            cache[key] = tuple(queryset.values_list('pk', flat=True))
+        return cache[key]
+
+    # noinspection PyMethodMayBeStatic
+    def get_own(self, obj: SrpmsUser) -> Tuple[int]:
+        """
+        Show contracts a user own
+
+        Args:
+            obj: the user that is being serialized currently
+        """
+        if hasattr(obj, 'annotated_own'):
+            return tuple(sorted(obj.annotated_own or []))
+        return tuple(self.get_own_contracts().filter(owner=obj).values_list('pk', flat=True))
+
     # noinspection PyMethodMayBeStatic
     def get_supervise(self, obj: SrpmsUser) -> Tuple[int]:
         """
@@ -60,8 +172,9 @@ class UserContractSerializer(serializers.ModelSerializer):
         Args:
             obj: the user that is being serialized currently
         """
-        return tuple(Contract.objects.filter(submit_date__isnull=False,
-                                             supervise__supervisor=obj)
+        if hasattr(obj, 'annotated_supervise'):
+            return tuple(sorted(obj.annotated_supervise or []))
+        return tuple(self.get_supervise_contracts().filter(supervise__supervisor=obj)
                      .values_list('pk', flat=True).distinct())
 
     # noinspection PyMethodMayBeStatic
@@ -72,52 +185,54 @@ class UserContractSerializer(serializers.ModelSerializer):
         Args:
             obj: the user that is being serialized currently
         """
-        return tuple(Contract.objects.filter(
-                assessment_examine__examine__examiner=obj,
-                supervise__supervisor_approval_date__isnull=False)
+        if hasattr(obj, 'annotated_examine'):
+            return tuple(sorted(obj.annotated_examine or []))
+        return tuple(self.get_examine_contracts()
+                     .filter(assessment_examine__examine__examiner=obj)
                      .values_list('pk', flat=True).distinct())
 
-    # noinspection PyMethodMayBeStatic
     def get_convene(self, obj: SrpmsUser) -> Tuple[int]:
         """
-        Shows submitted contracts for privileged users.
+        Shows submitted contracts for privileged users. The contract list is the same for all
+        privileged users, and as such only queried once.
 
         Args:
             obj: the user that is being serialized currently
         """
-        if obj.has_perm('research_mgt.is_mgt_superuser'):
-            return tuple(Contract.objects.all().values_list('pk', flat=True))
-        elif obj.has_perm('research_mgt.can_convene'):
-            return tuple(Contract.objects.filter(
-                    submit_date__isnull=False,
-                    supervise__supervisor_approval_date__isnull=False,
-                    assessment_examine__examiner_approval_date__isnull=False)
-                         .values_list('pk', flat=True).distinct())
+        if self.has_perm(obj, 'is_mgt_superuser'):
+            return self.get_context_ids('superuser', Contract.objects.all())
+        elif self.get_is_course_convener(obj):
+            # Contracts approved by all supervisors and examiners, i.e. awaiting or passed
+            # convener's approval
+            return self.get_context_ids('convener', Contract.objects.filter(
+                    state__in=[Contract.STATE_EXAMINER_APPROVED, Contract.STATE_FINALIZED]))
         else:
             return tuple()
 
     # noinspection PyMethodMayBeStatic
     def get_is_approved_supervisor(self, obj: SrpmsUser) -> bool:
         """
-        Show whether the current user have 'can_supervise' permission
+        Show whether the current user have 'can_supervise' permission, inactive user has no
+        permission as in `has_perm()`
 
         Args:
             obj: the user that is being serialized currently
         """
-        return obj.has_perm('research_mgt.can_supervise')
+        return obj.is_active and obj.is_approved_supervisor
 
     # noinspection PyMethodMayBeStatic
     def get_is_course_convener(self, obj: SrpmsUser) -> bool:
         """
-        Show whether the current user have 'can_convene' permission
+        Show whether the current user have 'can_convene' permission, inactive user has no
+        permission as in `has_perm()`
 
         Args:
             obj: the user that is being serialized currently
         """
-        return obj.has_perm('research_mgt.can_convene')
+        return obj.is_active and obj.is_course_convener
 
 
-class SuperviseSerializer(serializers.ModelSerializer):
+class SuperviseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     # Contract would be attached automatically to the nested view
     contract = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -140,7 +255,7 @@ class SuperviseSerializer(serializers.ModelSerializer):
             validated_data: a dictionary contain the data a request sent, already validated
         """
         contract: Contract = validated_data['contract']
-        if hasattr(contract, 'individual_project') and validated_data['is_formal'] and \
+        if contract.is_individual_project() and validated_data['is_formal'] and \
                 len(Supervise.objects.filter(contract=contract, is_formal=True)) >= 1:
             raise serializers.ValidationError(
                     'Individual project does not allowed more than 1 formal supervisor.')
@@ -165,12 +280,15 @@ class SuperviseSerializer(serializers.ModelSerializer):
         return super(SuperviseSerializer, self).update(instance, validated_data)
 
 
-class AssessmentExamineSerializer(serializers.ModelSerializer):
+class AssessmentExamineSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     examiner = serializers.PrimaryKeyRelatedField(source='examine.examiner',
                                                   queryset=SrpmsUser.objects.all())
     nominator = serializers.PrimaryKeyRelatedField(source='examine.nominator', read_only=True)
     examiner_approval_date = serializers.ReadOnlyField()
 
+    # Only primary keys of examiner and nominator are read, loading examine is enough
+    select_related_fields = ('examine',)
+
     class Meta:
         model = AssessmentExamine
         fields = ['id', 'examiner', 'nominator', 'examiner_approval_date']
@@ -194,11 +312,11 @@ class AssessmentExamineSerializer(serializers.ModelSerializer):
         # Forbid individual project and special topic contract to have more than one
         # examiner for each assessment
         assessment: Assessment = validated_data['assessment']
-        if hasattr(assessment.contract, 'individual_project') and \
+        if assessment.contract.is_individual_project() and \
                 len(AssessmentExamine.objects.filter(assessment=assessment)) >= 1:
             raise serializers.ValidationError('Individual project cannot have more than one '
                                               'examiner for each assessment.')
-        if hasattr(assessment.contract, 'special_topic') and \
+        if assessment.contract.is_special_topic() and \
                 len(AssessmentExamine.objects.filter(assessment=assessment)) >= 1:
             raise serializers.ValidationError('Special topic cannot have more than one examiner '
                                               'for each assessment.')
@@ -234,7 +352,7 @@ class AssessmentExamineSerializer(serializers.ModelSerializer):
         return super(AssessmentExamineSerializer, self).update(instance, validated_data)
 
 
-class AssessmentSerializer(serializers.ModelSerializer):
+class AssessmentSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     template_info = AssessmentTemplateSerializer(source='template', read_only=True)
 
     # Contract would be attached automatically to the nested view
@@ -242,11 +360,30 @@ class AssessmentSerializer(serializers.ModelSerializer):
 
     assessment_examine = AssessmentExamineSerializer(read_only=True, many=True)
 
+    is_all_examiners_approved = AnnotatedReadOnlyField()
+
+    select_related_fields = ('template',)
+    lookup_field_names = {'template': 'template_info'}
+    expandable_fields = ('template_info', 'assessment_examine')
+
     class Meta:
         model = Assessment
         fields = ['id', 'template', 'template_info', 'contract', 'additional_description', 'due',
                   'weight', 'assessment_examine', 'is_all_examiners_approved']
 
+    @classmethod
+    def get_prefetch_related(cls, fields: Set[str] = None) -> List[Prefetch]:
+        lookups = [Prefetch('assessment_examine',
+                            queryset=AssessmentExamineSerializer.setup_eager_loading(
+                                    AssessmentExamine.objects.all()))]
+        return [lookup for lookup in lookups if cls.is_lookup_requested(lookup, fields)]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset: QuerySet, fields: Set[str] = None) -> QuerySet:
+        if fields is None or 'is_all_examiners_approved' in fields:
+            queryset = queryset.with_approval_status()
+        return super(AssessmentSerializer, cls).setup_eager_loading(queryset, fields)
+
 
 class IndividualProjectSerializer(serializers.ModelSerializer):
     class Meta:
@@ -260,7 +397,29 @@ class SpecialTopicSerializer(serializers.ModelSerializer):
         fields = ['title', 'objectives', 'description']
 
 
-class ContractSerializer(serializers.ModelSerializer):
+class ContractSummarySerializer(serializers.Serializer):
+    """
+    Compact read-only representation of contracts for listing, serialize rows returned by
+    `ContractQuerySet.summary_values()` rather than model instances.
+    """
+
+    id = serializers.IntegerField(read_only=True)
+    contract_type = serializers.CharField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    course_number = serializers.CharField(read_only=True)
+    year = serializers.IntegerField(read_only=True)
+    semester = serializers.IntegerField(read_only=True)
+    owner_name = serializers.CharField(read_only=True)
+    workflow_state = serializers.ChoiceField(Contract.WORKFLOW_STATES, read_only=True)
+
+    def create(self, validated_data):
+        pass
+
+    def update(self, instance, validated_data):
+        pass
+
+
+class ContractSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """
     Contract serializer for all types of contract.
 
@@ -270,6 +429,9 @@ class ContractSerializer(serializers.ModelSerializer):
 
     In this serializer, different types of contract would be serialized as a nested field. It
     also support write for these nested field by overriding the `create` and `update` method.
+
+    Nested fields are expandable, clients may only ask for the fields they need, e.g.
+    `contracts/?fields=id,year,semester,is_submitted` (see SparseFieldsetMixin).
     """
 
     individual_project = IndividualProjectSerializer(required=False, allow_null=True)
@@ -290,16 +452,45 @@ class ContractSerializer(serializers.ModelSerializer):
     supervise = SuperviseSerializer(read_only=True, many=True)
     assessment = AssessmentSerializer(read_only=True, many=True)
 
+    # Approval status, read from queryset annotations if available
+    is_convener_approved = AnnotatedReadOnlyField()
+    is_submitted = AnnotatedReadOnlyField()
+    is_all_supervisors_approved = AnnotatedReadOnlyField()
+    is_all_assessments_approved = AnnotatedReadOnlyField()
+    is_examiner_nominated = AnnotatedReadOnlyField()
+
+    select_related_fields = ('individual_project', 'special_topic')
+    expandable_fields = ('individual_project', 'special_topic', 'supervise', 'assessment')
+
     class Meta:
         model = Contract
         fields = ['id', 'year', 'semester', 'duration', 'resources', 'course',
                   'convener', 'is_convener_approved', 'convener_approval_date',
                   'owner', 'create_date', 'submit_date', 'is_submitted', 'was_submitted',
-                  'individual_project', 'special_topic',
+                  'contract_type', 'individual_project', 'special_topic',
                   'supervise', 'is_all_supervisors_approved',
                   'assessment', 'is_all_assessments_approved',
                   'is_examiner_nominated']
 
+    @classmethod
+    def get_prefetch_related(cls, fields: Set[str] = None) -> List[Prefetch]:
+        lookups = [Prefetch('supervise',
+                            queryset=SuperviseSerializer.setup_eager_loading(
+                                    Supervise.objects.all())),
+                   Prefetch('assessment',
+                            queryset=AssessmentSerializer.setup_eager_loading(
+                                    Assessment.objects.all()))]
+        return [lookup for lookup in lookups if cls.is_lookup_requested(lookup, fields)]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset: QuerySet, fields: Set[str] = None) -> QuerySet:
+        # Only annotate approval status that are requested
+        annotated = [name for name, field in cls._declared_fields.items()
+                     if isinstance(field, AnnotatedReadOnlyField)]
+        queryset = queryset.with_approval_status(
+                annotated if fields is None else [name for name in annotated if name in fields])
+        return super(ContractSerializer, cls).setup_eager_loading(queryset, fields)
+
     def create(self, validated_data: dict) -> Contract:
         """
         Nested field does not support write by DRF, we have to do it ourselves
@@ -337,13 +528,13 @@ class ContractSerializer(serializers.ModelSerializer):
             with transaction.atomic():
                 contract = IndividualProject.objects.create(**validated_data, **individual_project)
                 Assessment.objects.create(
-                        template=AssessmentTemplate.objects.get(name='report'),
+                        template=TEMPLATES.get_by_key('report'),
                         contract=contract)
                 Assessment.objects.create(
-                        template=AssessmentTemplate.objects.get(name='artifact'),
+                        template=TEMPLATES.get_by_key('artifact'),
                         contract=contract)
                 Assessment.objects.create(
-                        template=AssessmentTemplate.objects.get(name='presentation'),
+                        template=TEMPLATES.get_by_key('presentation'),
                         contract=contract)
             return contract
         if special_topic:
@@ -365,7 +556,7 @@ class ContractSerializer(serializers.ModelSerializer):
             individual_project: dict = validated_data.pop('individual_project')
         except KeyError:
             # PATCH may missing this field, but the request is still valid
-            if hasattr(instance, 'individual_project'):
+            if instance.is_individual_project():
                 individual_project = {}
             else:
                 individual_project = None
@@ -376,7 +567,7 @@ class ContractSerializer(serializers.ModelSerializer):
             special_topic: dict = validated_data.pop('special_topic')
         except KeyError:
             # PATCH may missing this field, but the request is still valid
-            if hasattr(instance, 'special_topic'):
+            if instance.is_special_topic():
                 special_topic = {}
             else:
                 special_topic = None
@@ -391,11 +582,11 @@ class ContractSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Contract must be one and only one type')
 
         # Set contract type related data
-        if hasattr(instance, 'individual_project') and individual_project is not None:
+        if instance.is_individual_project() and individual_project is not None:
             instance = instance.individual_project
             for attr, value in individual_project.items():
                 setattr(instance, attr, value)
-        elif hasattr(instance, 'special_topic') and special_topic is not None:
+        elif instance.is_special_topic() and special_topic is not None:
             instance = instance.special_topic
             for attr, value in special_topic.items():
                 setattr(instance, attr, value)
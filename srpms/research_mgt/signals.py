@@ -4,8 +4,8 @@ Define signals. Mainly for the purpose of sending notifications, but not limited
 Signal with @receiver decorator would be automatically registered on app initialization, which
 currently happen inside apps.py
 
-Please be careful when using send_mail() function, as recipient in the recipient_list would be
-able to see each other's address.
+Notifications are sent with notify(), which gives every recipient an email of their own, and
+are delivered in the background (see notifications.py and outbox.py).
 """
 
 __author__ = "Dajie (Cooper) Yang"
@@ -14,18 +14,22 @@ __credits__ = ["Dajie Yang"]
 __maintainer__ = "Dajie (Cooper) Yang"
 __email__ = "dajie.yang@anu.edu.au"
 
-import re
-from io import StringIO
-from typing import List
+from typing import Iterable
 from accounts.models import SrpmsUser
 from django.dispatch import receiver, Signal
-from django.core import management
-from django.core.mail import send_mail
-from django.db.models.signals import post_migrate, post_save
-from django.db.models.query import Q
-from django.contrib.auth.models import Permission
-
-from .models import (Contract, Supervise, AssessmentExamine, ActivityLog, ActivityAction)
+from django.db.models.signals import (post_migrate, post_save, pre_delete, post_delete,
+                                      m2m_changed)
+from django.contrib.auth.models import Permission, Group
+
+from .models import (Contract, IndividualProject, SpecialTopic, Supervise, Examine, Assessment,
+                     AssessmentExamine, ActivityLog, ActivityAction, Course, AssessmentTemplate,
+                     COURSES, TEMPLATES)
+from .access import sync_contract_access
+from .workflow import refresh_contract_status
+from .role_flags import refresh_role_flags
+from .registry import clear_registry
+from .list_cache import invalidate_contracts, invalidate_users
+from .notifications import notify
 from srpms.settings import EMAIL_SENDER
 
 CONTRACT_SUBMIT = Signal(providing_args=['contract', 'activity_log'])
@@ -33,65 +37,185 @@ CONTRACT_APPROVE = Signal(providing_args=['contract', 'activity_log'])
 SUPERVISE_APPROVE = Signal(providing_args=['supervise', 'activity_log'])
 EXAMINER_APPROVE = Signal(providing_args=['assessment_examine', 'activity_log'])
 
-# List of actions
-ACTION_CONTRACT_SUBMIT = None
-ACTION_CONTRACT_UN_SUBMIT = None
-ACTION_CONTRACT_APPROVE = None
-ACTION_CONTRACT_DISAPPROVE = None
-ACTION_SUPERVISE_APPROVE = None
-ACTION_SUPERVISE_DISAPPROVE = None
-ACTION_EXAMINER_APPROVE = None
-ACTION_EXAMINER_DISAPPROVE = None
+# Names of activity actions, created by migration 0005_activity_actions. Actions are looked up
+# with registry.get_action() when logging activities.
+ACTION_CONTRACT_SUBMIT = 'contract_submit'
+ACTION_CONTRACT_UN_SUBMIT = 'contract_un_submit'
+ACTION_CONTRACT_APPROVE = 'contract_approve'
+ACTION_CONTRACT_DISAPPROVE = 'contract_disapprove'
+ACTION_SUPERVISE_APPROVE = 'supervise_approve'
+ACTION_SUPERVISE_DISAPPROVE = 'supervise_disapprove'
+ACTION_EXAMINER_APPROVE = 'examiner_approve'
+ACTION_EXAMINER_DISAPPROVE = 'examiner_disapprove'
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Contract, dispatch_uid='post_save_contract_access')
+@receiver(post_save, sender=IndividualProject, dispatch_uid='post_save_ip_contract_access')
+@receiver(post_save, sender=SpecialTopic, dispatch_uid='post_save_st_contract_access')
+def contract_save_access(instance: Contract, raw: bool = False, **kwargs):
+    """
+    Keep contract access table in sync on contract owner and submit status change. Note that
+    child models send post_save with themselves as the sender, not Contract.
+    """
+    if not raw:
+        sync_contract_access(instance.pk)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Supervise, dispatch_uid='post_save_supervise_access')
+@receiver(post_save, sender=Examine, dispatch_uid='post_save_examine_access')
+@receiver(post_save, sender=AssessmentExamine, dispatch_uid='post_save_ae_access')
+def relation_save_access(instance, raw: bool = False, **kwargs):
+    """Keep contract access table in sync on supervise and examine relation change"""
+    if not raw and instance.contract_id:
+        sync_contract_access(instance.contract_id)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_delete, sender=Supervise, dispatch_uid='post_delete_supervise_access')
+@receiver(post_delete, sender=Examine, dispatch_uid='post_delete_examine_access')
+@receiver(post_delete, sender=AssessmentExamine, dispatch_uid='post_delete_ae_access')
+def relation_delete_access(instance, **kwargs):
+    """
+    Remove stale contract access on relation delete. Rows are never inserted here, as the
+    relation may be deleted as part of a contract cascade delete.
+    """
+    if instance.contract_id:
+        sync_contract_access(instance.contract_id, insert=False)
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Contract, dispatch_uid='post_save_contract_status')
+@receiver(post_save, sender=IndividualProject, dispatch_uid='post_save_ip_contract_status')
+@receiver(post_save, sender=SpecialTopic, dispatch_uid='post_save_st_contract_status')
+def contract_save_status(instance: Contract, raw: bool = False, **kwargs):
+    """
+    Re-derive contract state on submit or approval change. Counters are refreshed as well,
+    since saving an instance loaded earlier would write back its stale counters.
+    """
+    if not raw:
+        refresh_contract_status([instance.pk])
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Supervise, dispatch_uid='post_save_supervise_status')
+@receiver(post_save, sender=Assessment, dispatch_uid='post_save_assessment_status')
+@receiver(post_save, sender=AssessmentExamine, dispatch_uid='post_save_ae_status')
+@receiver(post_save, sender=Examine, dispatch_uid='post_save_examine_status')
+@receiver(post_delete, sender=Supervise, dispatch_uid='post_delete_supervise_status')
+@receiver(post_delete, sender=Assessment, dispatch_uid='post_delete_assessment_status')
+@receiver(post_delete, sender=AssessmentExamine, dispatch_uid='post_delete_ae_status')
+@receiver(post_delete, sender=Examine, dispatch_uid='post_delete_examine_status')
+def relation_change_status(instance, raw: bool = False, **kwargs):
+    """
+    Keep contract approval counters and state in sync with its related objects, and draw a new
+    contract version. Examine does not affect counters, but is part of the contract's
+    representation.
+    """
+    if not raw and instance.contract_id:
+        refresh_contract_status([instance.contract_id])
+
+
+# noinspection PyUnusedLocal
+@receiver(pre_delete, sender=Contract, dispatch_uid='pre_delete_contract_list')
+def contract_delete_list(instance: Contract, **kwargs):
+    """
+    Invalidate cached contract lists containing the contract, while its access rows are still
+    there to tell whose lists they are. Deleting a child (e.g. IndividualProject) deletes the
+    parent contract as well, and also sends this signal.
+    """
+    invalidate_contracts([instance.pk])
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Course, dispatch_uid='post_save_course_reference')
+@receiver(post_delete, sender=Course, dispatch_uid='post_delete_course_reference')
+def course_change_reference(**kwargs):
+    """Courses are cached by every process, see reference.py"""
+    COURSES.invalidate()
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=AssessmentTemplate, dispatch_uid='post_save_template_reference')
+@receiver(post_delete, sender=AssessmentTemplate, dispatch_uid='post_delete_template_reference')
+def template_change_reference(**kwargs):
+    """Assessment templates are cached by every process, see reference.py"""
+    TEMPLATES.invalidate()
+
+
+# noinspection PyUnusedLocal
+@receiver(post_save, sender=Permission, dispatch_uid='post_save_permission_registry')
+@receiver(post_save, sender=Group, dispatch_uid='post_save_group_registry')
+@receiver(post_delete, sender=Permission, dispatch_uid='post_delete_permission_registry')
+@receiver(post_delete, sender=Group, dispatch_uid='post_delete_group_registry')
+@receiver(post_save, sender=ActivityAction, dispatch_uid='post_save_action_registry')
+@receiver(post_delete, sender=ActivityAction, dispatch_uid='post_delete_action_registry')
+@receiver(post_migrate, dispatch_uid='post_migrate_registry')
+def registry_change(**kwargs):
+    """
+    Permission and group ids, and activity actions are cached for the process, reload them on
+    next use. Migrate (and flush) may recreate them without sending delete signals.
+    """
+    clear_registry()
 
 
 # noinspection PyUnusedLocal
-@receiver(post_save, sender=ActivityAction, dispatch_uid='post_save_init_actions')
-@receiver(post_migrate, dispatch_uid='post_migrate_init_actions')
-def init_actions(**kwargs):
-    """
-    Initiate activity actions after database migration completed, otherwise these actions
-    won't exist in database.
-
-    Actions would also be refreshed on any action create/update, to cope with any on-the-fly
-    change during the server running.
-
-    The 'get_or_create()' method is not recommend here as instance created here won't exist
-    during test, and would cause errors during test.
-    """
-    global ACTION_CONTRACT_SUBMIT
-    global ACTION_CONTRACT_UN_SUBMIT
-    global ACTION_CONTRACT_APPROVE
-    global ACTION_CONTRACT_DISAPPROVE
-    global ACTION_SUPERVISE_APPROVE
-    global ACTION_SUPERVISE_DISAPPROVE
-    global ACTION_EXAMINER_APPROVE
-    global ACTION_EXAMINER_DISAPPROVE
-
-    s_io = None
-    try:
-        s_io = StringIO()
-        management.call_command('showmigrations', stdout=s_io)
-
-        # Only initialize actions when corresponding migration is finished
-        if re.search(r'(?<=\[)X(?=\] 0005_activity_actions)', s_io.getvalue()):
-            ACTION_CONTRACT_SUBMIT = ActivityAction.objects.get(name='contract_submit')
-            ACTION_CONTRACT_UN_SUBMIT = ActivityAction.objects.get(name='contract_un_submit')
-            ACTION_CONTRACT_APPROVE = ActivityAction.objects.get(name='contract_approve')
-            ACTION_CONTRACT_DISAPPROVE = ActivityAction.objects.get(name='contract_disapprove')
-            ACTION_SUPERVISE_APPROVE = ActivityAction.objects.get(name='supervise_approve')
-            ACTION_SUPERVISE_DISAPPROVE = ActivityAction.objects.get(name='supervise_disapprove')
-            ACTION_EXAMINER_APPROVE = ActivityAction.objects.get(name='examiner_approve')
-            ACTION_EXAMINER_DISAPPROVE = ActivityAction.objects.get(name='examiner_disapprove')
-
-    except Exception as exc:
-        raise exc
-    finally:
-        s_io.close() if s_io else None
+@receiver(post_save, sender=SrpmsUser, dispatch_uid='post_save_user_role_flags')
+def user_save_role_flags(instance: SrpmsUser, raw: bool = False, update_fields=None, **kwargs):
+    """
+    Superusers have all role flags, re-derive them in case is_superuser changed. Cached
+    contract lists of the user are invalidated as well, see list_cache.py.
+    """
+    if not raw and (update_fields is None or 'is_superuser' in update_fields):
+        refresh_role_flags([instance.pk])
+        invalidate_users([instance.pk])
+
+
+# noinspection PyUnusedLocal
+@receiver(m2m_changed, sender=SrpmsUser.groups.through, dispatch_uid='m2m_user_groups_flags')
+@receiver(m2m_changed, sender=SrpmsUser.user_permissions.through,
+          dispatch_uid='m2m_user_permissions_flags')
+def user_permission_role_flags(instance, action: str, reverse: bool, pk_set, **kwargs):
+    """
+    Keep role flags in sync when users are added to or removed from groups, or are granted or
+    revoked permissions directly, and invalidate their cached contract lists. On the reverse
+    side (e.g. `group.user_set.add()`), pk_set holds the users affected, which is not available
+    on clear, so all users are refreshed.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_role_flags([instance.pk])
+        invalidate_users([instance.pk])
+    else:
+        refresh_role_flags(pk_set)
+        invalidate_users(pk_set)
+
+
+# noinspection PyUnusedLocal
+@receiver(m2m_changed, sender=Group.permissions.through, dispatch_uid='m2m_group_perms_flags')
+def group_permission_role_flags(instance, action: str, reverse: bool, pk_set, **kwargs):
+    """
+    Keep role flags of group members in sync when permissions of groups change, and invalidate
+    their cached contract lists.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        users = SrpmsUser.objects.filter(groups=instance)
+    elif pk_set is not None:
+        users = SrpmsUser.objects.filter(groups__in=pk_set)
+    else:
+        users = SrpmsUser.objects.all()
+    user_ids = list(users.values_list('pk', flat=True))
+    refresh_role_flags(user_ids)
+    invalidate_users(user_ids)
 
 
 # TODO: HTML message for email notifications
 
-def get_email_addr(users: List[SrpmsUser]) -> list:
+def get_email_addr(users: Iterable[SrpmsUser]) -> list:
     """
     Filter all available email addresses given a list of users.
 
@@ -112,34 +236,36 @@ def contract_submit_notifications(contract: Contract, activity_log: ActivityLog,
     """
 
     # Submit
-    if activity_log.action == ACTION_CONTRACT_SUBMIT:
+    if activity_log.action.name == ACTION_CONTRACT_SUBMIT:
         # Inform contract owner
-        send_mail('We\'ve received your submitted contract',
-                  'Your contract "{contract_title}" has been submitted '
-                  'successfully to Student Research Project Management System.'
-                  .format(contract_title=str(contract)),
-                  EMAIL_SENDER,
-                  get_email_addr([contract.owner]))
+        notify('We\'ve received your submitted contract',
+               'Your contract "{contract_title}" has been submitted '
+               'successfully to Student Research Project Management System.'
+               .format(contract_title=str(contract)),
+               EMAIL_SENDER,
+               get_email_addr([contract.owner]),
+               activity_log=activity_log)
         # Inform contract supervisor
-        for address in get_email_addr(contract.get_all_supervisors()):
-            send_mail('New contract submission',
-                      'Contract "{contract_title}" (created by {contract_owner}) invited you '
-                      'as the contract\'s supervisor.'
-                      .format(contract_title=str(contract),
-                              contract_owner=contract.owner.get_display_name()),
-                      EMAIL_SENDER,
-                      [address])
+        notify('New contract submission',
+               'Contract "{contract_title}" (created by {contract_owner}) invited you '
+               'as the contract\'s supervisor.'
+               .format(contract_title=str(contract),
+                       contract_owner=contract.owner.get_display_name()),
+               EMAIL_SENDER,
+               get_email_addr(contract.get_all_supervisors()),
+               activity_log=activity_log)
     # Un-submit
-    elif activity_log.action == ACTION_CONTRACT_UN_SUBMIT:
+    elif activity_log.action.name == ACTION_CONTRACT_UN_SUBMIT:
         # Inform contract owner if the actor is not contract owner, note that contract
         # owner normally don't have the privilege to un-submit their own contract.
         if activity_log.actor != contract.owner:
-            send_mail('Contract status has been set to un-submit',
-                      'Your contract "{contract_title}"\'s submit status has been '
-                      'changed to un-submit.'
-                      .format(contract_title=str(contract)),
-                      EMAIL_SENDER,
-                      get_email_addr([contract.owner]))
+            notify('Contract status has been set to un-submit',
+                   'Your contract "{contract_title}"\'s submit status has been '
+                   'changed to un-submit.'
+                   .format(contract_title=str(contract)),
+                   EMAIL_SENDER,
+                   get_email_addr([contract.owner]),
+                   activity_log=activity_log)
 
 
 # noinspection PyUnusedLocal
@@ -150,33 +276,33 @@ def contract_approve_notifications(contract: Contract, activity_log: ActivityLog
     """
 
     # Approve
-    if activity_log.action == ACTION_CONTRACT_APPROVE:
+    if activity_log.action.name == ACTION_CONTRACT_APPROVE:
         # Inform contract owner and all its supervisors
-        for address in get_email_addr(list(contract.get_all_supervisors()) + [contract.owner]):
-            send_mail('Contract approved by course convener',
-                      'Contract "{contract_title}" has been approved by '
-                      'course convener {convener_name}.'
-                      .format(contract_title=str(contract),
-                              convener_name=contract.convener.get_display_name()),
-                      EMAIL_SENDER,
-                      [address])
+        notify('Contract approved by course convener',
+               'Contract "{contract_title}" has been approved by '
+               'course convener {convener_name}.'
+               .format(contract_title=str(contract),
+                       convener_name=contract.convener.get_display_name()),
+               EMAIL_SENDER,
+               get_email_addr(list(contract.get_all_supervisors()) + [contract.owner]),
+               activity_log=activity_log)
     # Disapprove
-    elif activity_log.action == ACTION_CONTRACT_DISAPPROVE:
+    elif activity_log.action.name == ACTION_CONTRACT_DISAPPROVE:
         # Inform formal supervisors. Contract owner is not being notified here, since the owner
         # would need to wait for supervisor's disapproval before editing the contract. Also, if
         # it's just a matter of changing examiner, the contract owner doesn't really need to be
         # involve.
-        for address in get_email_addr(contract.get_all_formal_supervisors()):
-            send_mail('Contract disapproved by convener',
-                      'Contract "{contract_title}" has been disapproved by convener {convener_name}'
-                      '{disapprove_reason}'
-                      .format(contract_title=str(contract),
-                              convener_name=activity_log.actor.get_display_name(),
-                              disapprove_reason='' if not activity_log.message else
-                              ', with the following message "{message}"'
-                              .format(message=activity_log.message)),
-                      EMAIL_SENDER,
-                      [address])
+        notify('Contract disapproved by convener',
+               'Contract "{contract_title}" has been disapproved by convener {convener_name}'
+               '{disapprove_reason}'
+               .format(contract_title=str(contract),
+                       convener_name=activity_log.actor.get_display_name(),
+                       disapprove_reason='' if not activity_log.message else
+                       ', with the following message "{message}"'
+                       .format(message=activity_log.message)),
+               EMAIL_SENDER,
+               get_email_addr(contract.get_all_formal_supervisors()),
+               activity_log=activity_log)
 
 
 # noinspection PyUnusedLocal
@@ -190,44 +316,46 @@ def supervise_approve_notifications(supervise: Supervise, activity_log: Activity
     """
 
     # Approve
-    if activity_log.action == ACTION_SUPERVISE_APPROVE:
+    if activity_log.action.name == ACTION_SUPERVISE_APPROVE:
         # Inform contract owner
-        send_mail('Contract approved by supervisor',
-                  'Your contract "{contract_title}" has been approved by '
-                  'contract supervisor {supervisor_name}.'
-                  .format(contract_title=str(supervise.contract),
-                          supervisor_name=supervise.supervisor.get_display_name()),
-                  EMAIL_SENDER,
-                  get_email_addr([supervise.contract.owner]))
+        notify('Contract approved by supervisor',
+               'Your contract "{contract_title}" has been approved by '
+               'contract supervisor {supervisor_name}.'
+               .format(contract_title=str(supervise.contract),
+                       supervisor_name=supervise.supervisor.get_display_name()),
+               EMAIL_SENDER,
+               get_email_addr([supervise.contract.owner]),
+               activity_log=activity_log)
         # Inform examiners on all supervisor approval passed, exclude the course convener
         if supervise.contract.is_all_supervisors_approved():
-            perm = Permission.objects.get(codename='can_convene')
-            for address in get_email_addr(SrpmsUser.objects.filter(
-                    ~Q(groups__permissions=perm) & ~Q(user_permissions=perm) &
-                    Q(is_superuser=False),
-                    examine__contract=supervise.contract,
-                    examine__assessment_examine__examiner_approval_date__isnull=True)):
-                send_mail('New contract assessment',
-                          'Contract "{contract_title}"\'s invites you '
-                          'as the examiner for its assessment.'
-                          .format(contract_title=str(supervise.contract)), EMAIL_SENDER, [address])
+            notify('New contract assessment',
+                   'Contract "{contract_title}"\'s invites you '
+                   'as the examiner for its assessment.'
+                   .format(contract_title=str(supervise.contract)),
+                   EMAIL_SENDER,
+                   get_email_addr(SrpmsUser.objects.filter(
+                           is_course_convener=False,
+                           examine__contract=supervise.contract,
+                           examine__assessment_examine__examiner_approval_date__isnull=True)),
+                   activity_log=activity_log)
 
         # Inform course convener if necessary
-        contract_finalized_ready(supervise.contract)
+        contract_finalized_ready(supervise.contract, activity_log)
     # Disapprove
-    elif activity_log.action == ACTION_SUPERVISE_DISAPPROVE:
+    elif activity_log.action.name == ACTION_SUPERVISE_DISAPPROVE:
         # Inform contract owner
-        send_mail('Contract disapproved by supervisor',
-                  'Contract "{contract_title}" has been disapproved by '
-                  'contract supervisor {supervisor_name}'
-                  '{disapprove_reason}'
-                  .format(contract_title=str(supervise.contract),
-                          supervisor_name=supervise.supervisor.get_display_name(),
-                          disapprove_reason='' if not activity_log.message else
-                          ', with the following message "{message}"'
-                          .format(message=activity_log.message)),
-                  EMAIL_SENDER,
-                  get_email_addr([supervise.contract.owner]))
+        notify('Contract disapproved by supervisor',
+               'Contract "{contract_title}" has been disapproved by '
+               'contract supervisor {supervisor_name}'
+               '{disapprove_reason}'
+               .format(contract_title=str(supervise.contract),
+                       supervisor_name=supervise.supervisor.get_display_name(),
+                       disapprove_reason='' if not activity_log.message else
+                       ', with the following message "{message}"'
+                       .format(message=activity_log.message)),
+               EMAIL_SENDER,
+               get_email_addr([supervise.contract.owner]),
+               activity_log=activity_log)
         # TODO: ? Inform examiners that already approved, as their approval would be cleared
 
 
@@ -240,53 +368,57 @@ def examiner_approve_notifications(assessment_examine: AssessmentExamine,
     """
 
     # Approve
-    if activity_log.action == ACTION_EXAMINER_APPROVE:
+    if activity_log.action.name == ACTION_EXAMINER_APPROVE:
         # Inform contract owner and examiner nominator
-        for address in get_email_addr([assessment_examine.contract.owner,
-                                       assessment_examine.examine.nominator]):
-            send_mail('Contract assessment approved',
-                      'Contract "{contract_title}"\'s assessment "{assessment_name}" has '
-                      'been approved by examiner {examiner_name}.'
-                      .format(contract_title=str(assessment_examine.contract),
-                              assessment_name=assessment_examine.assessment.template.name,
-                              examiner_name=assessment_examine.examine.examiner.get_display_name()),
-                      EMAIL_SENDER,
-                      [address])
+        notify('Contract assessment approved',
+               'Contract "{contract_title}"\'s assessment "{assessment_name}" has '
+               'been approved by examiner {examiner_name}.'
+               .format(contract_title=str(assessment_examine.contract),
+                       assessment_name=assessment_examine.assessment.template.name,
+                       examiner_name=assessment_examine.examine.examiner.get_display_name()),
+               EMAIL_SENDER,
+               get_email_addr([assessment_examine.contract.owner,
+                               assessment_examine.examine.nominator]),
+               activity_log=activity_log)
 
         # Inform course convener if necessary
-        contract_finalized_ready(assessment_examine.contract)
+        contract_finalized_ready(assessment_examine.contract, activity_log)
     # Disapprove
-    elif activity_log.action == ACTION_EXAMINER_DISAPPROVE:
-        send_mail('Contract assessment disapproved by examiner',
-                  'Contract "{contract_title}"\'s assessment "{assessment_name}" '
-                  'disapproved by examiner {examiner_name}'
-                  '{disapprove_reason}'
-                  .format(contract_title=str(assessment_examine.contract),
-                          assessment_name=assessment_examine.assessment.template.name,
-                          examiner_name=assessment_examine.examine.examiner.get_display_name(),
-                          disapprove_reason='' if not activity_log.message else
-                          ', because "{message}"'.format(message=activity_log.message)),
-                  EMAIL_SENDER,
-                  get_email_addr([assessment_examine.examine.nominator]))
+    elif activity_log.action.name == ACTION_EXAMINER_DISAPPROVE:
+        notify('Contract assessment disapproved by examiner',
+               'Contract "{contract_title}"\'s assessment "{assessment_name}" '
+               'disapproved by examiner {examiner_name}'
+               '{disapprove_reason}'
+               .format(contract_title=str(assessment_examine.contract),
+                       assessment_name=assessment_examine.assessment.template.name,
+                       examiner_name=assessment_examine.examine.examiner.get_display_name(),
+                       disapprove_reason='' if not activity_log.message else
+                       ', because "{message}"'.format(message=activity_log.message)),
+               EMAIL_SENDER,
+               get_email_addr([assessment_examine.examine.nominator]),
+               activity_log=activity_log)
         # TODO: ? Inform contract owner
 
 
-def contract_finalized_ready(contract: Contract) -> None:
+def contract_finalized_ready(contract: Contract, activity_log: ActivityLog = None) -> None:
     """
     Inform course convener if the contract is ready for final approval, i.e. all supervisor
-    approved and all assessments approved.
+    approved and all assessments approved. The persisted state is read, since the given
+    instance may be loaded before the approval.
 
     Args:
         contract: the contract this function going to check
+        activity_log: the activity that made the contract ready, if any
     """
-    if contract.convener and contract.is_all_supervisors_approved() and \
-            contract.is_all_assessments_approved():
-        send_mail('Contract awaiting for approval',
-                  'Contract "{contract_title}" has been approved by all its supervisor and '
-                  'examiners, and its now awaiting for your final approval.'
-                  .format(contract_title=str(contract)),
-                  EMAIL_SENDER,
-                  [contract.convener.email])
+    if contract.convener and Contract.objects.filter(
+            pk=contract.pk, state=Contract.STATE_EXAMINER_APPROVED).exists():
+        notify('Contract awaiting for approval',
+               'Contract "{contract_title}" has been approved by all its supervisor and '
+               'examiners, and its now awaiting for your final approval.'
+               .format(contract_title=str(contract)),
+               EMAIL_SENDER,
+               [contract.convener.email],
+               activity_log=activity_log)
 
 
 # noinspection PyUnusedLocal
@@ -177,6 +177,7 @@ contract_01_response = {
     'owner': None,  # Supply data here
     'submit_date': None,
     'is_submitted': False,
+    'contract_type': 'individual_project',
     'individual_project': {
         'title': 'Test',
         'objectives': '',
@@ -210,6 +211,7 @@ contract_02_response = {
     'owner': None,  # Supply data here
     'submit_date': None,
     'is_submitted': False,
+    'contract_type': 'special_topic',
     'individual_project': None,
     'special_topic': {
         'title': 'Test',
@@ -0,0 +1,78 @@
+"""
+Test the materialized contract access table, and its consistency with contract relations.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from io import StringIO
+
+from django.core import management
+
+from research_mgt.models import (Contract, Assessment, Supervise, Examine, AssessmentExamine,
+                                 ContractAccess)
+from research_mgt.access import (check_contract_access, rebuild_contract_access,
+                                 get_visible_contracts)
+from . import utils
+from . import data
+
+
+class TestContractAccess(utils.SrpmsTest):
+    def setUp(self):
+        super(TestContractAccess, self).setUp()
+
+        self.contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                                course=data.comp8755, owner=self.user_01.obj)
+        self.assessment = Assessment.objects.create(template=data.temp_custom,
+                                                    contract=self.contract, weight=100)
+        self.supervise = Supervise.objects.create(supervisor=self.supervisor_formal.obj,
+                                                  is_formal=True, contract=self.contract,
+                                                  nominator=self.user_01.obj)
+        self.examine = Examine.objects.create(contract=self.contract, examiner=self.user_02.obj,
+                                              nominator=self.supervisor_formal.obj)
+        AssessmentExamine.objects.create(assessment=self.assessment, examine=self.examine)
+
+    def assert_visible(self, user, visible: bool):
+        self.assertEqual(get_visible_contracts(user).filter(pk=self.contract.pk).exists(), visible)
+
+    def test_sync(self):
+        # Before submission, only owner can see the contract
+        self.assert_visible(self.user_01.obj, True)
+        self.assert_visible(self.supervisor_formal.obj, False)
+        self.assert_visible(self.user_02.obj, False)
+        self.assertEqual(check_contract_access(), {})
+
+        # Submission grant supervisor and examiner access
+        self.contract.was_submitted = True
+        self.contract.save()
+        self.assert_visible(self.supervisor_formal.obj, True)
+        self.assert_visible(self.user_02.obj, True)
+        self.assertEqual(check_contract_access(), {})
+
+        # Removing relations revoke access
+        self.examine.delete()
+        self.assert_visible(self.user_02.obj, False)
+        self.supervise.delete()
+        self.assert_visible(self.supervisor_formal.obj, False)
+        self.assertEqual(check_contract_access(), {})
+
+        # Deleting contract remove all its access rows
+        self.contract.delete()
+        self.assertFalse(ContractAccess.objects.exists())
+
+    def test_rebuild(self):
+        self.contract.was_submitted = True
+        self.contract.save()
+        ContractAccess.objects.all().delete()
+        self.assertNotEqual(check_contract_access(), {})
+
+        inserted, deleted = rebuild_contract_access()
+        self.assertEqual((inserted, deleted), (3, 0))
+        self.assertEqual(check_contract_access(), {})
+
+        out = StringIO()
+        management.call_command('rebuild_contract_access', '--check', stdout=out)
+        self.assertIn('consistent', out.getvalue())
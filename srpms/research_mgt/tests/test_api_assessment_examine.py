@@ -57,6 +57,7 @@ class IndividualProject(utils.SrpmsTest):
                                     data.get_submit_data(True))
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
 
+        self.assessment_id = assessment_report_id
         self.examine_list_url = utils.get_examine_url(self.contract['id'], assessment_report_id)
 
         # Pick assessment for testing edit and delete
@@ -226,6 +227,18 @@ class IndividualProject(utils.SrpmsTest):
         response = self.superuser.delete(self.examine_detail_url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
+    def test_mismatched_parents(self):
+        # Assessment exists, but does not belong to the other contract
+        response = self.user_02.post(utils.ApiUrls.contract, data.contract_01_request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.superuser.get(utils.get_examine_url(response.data['id'],
+                                                            self.assessment_id))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Correct parents should still be resolved
+        response = self.superuser.get(self.examine_list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_assign_examiner_for_non_submitted_contract(self):
         # Disapprove to reset the submit status
         response = self.supervisor_formal.put(utils.get_supervise_url(self.contract['id'],
@@ -283,6 +296,7 @@ class SpecialTopic(IndividualProject):
                                     data.get_submit_data(True))
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
 
+        self.assessment_id = assessment_01_id
         self.examine_list_url = utils.get_examine_url(self.contract['id'], assessment_01_id)
 
         # Pick assessment for test edit and delete
@@ -8,9 +8,14 @@ __credits__ = ['Dajie Yang']
 __maintainer__ = 'Dajie (Cooper) Yang'
 __email__ = 'dajie.yang@anu.edu.au'
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
+from research_mgt.models import Contract, ActivityLog
+from research_mgt.list_cache import get_stats
+
 from . import utils
 from . import data
 
@@ -378,3 +383,276 @@ class TestContract(utils.SrpmsTest):
 
         response = self.superuser.delete(utils.get_contract_url(con_id))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_GET_pagination(self):
+        con_req, _ = data.get_contract(owner=self.user_01)
+        con_ids = []
+        for _ in range(3):
+            response = self.user_01.post(utils.ApiUrls.contract, con_req)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            con_ids.append(response.data['id'])
+
+        # Without page size, the full list should be returned as before
+        response = self.user_01.get(utils.ApiUrls.contract)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+        # With page size, contracts should be split into pages following the next cursor
+        response = self.user_01.get(utils.ApiUrls.contract, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in response.data['results']], con_ids[:2])
+        self.assertTrue(response.data['next'])
+
+        response = self.user_01.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['id'] for c in response.data['results']], con_ids[2:])
+        self.assertIsNone(response.data['next'])
+
+        # Invalid cursor
+        response = self.user_01.get(utils.ApiUrls.contract, {'page_size': 2, 'cursor': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_GET_query_count(self):
+        """Number of queries for listing contracts should not grow with number of contracts"""
+
+        def count_list_queries() -> int:
+            with CaptureQueriesContext(connection) as context:
+                response = self.user_01.get(utils.ApiUrls.contract)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.set_submit(self.user_01, response.data['id'])
+        num_queries = count_list_queries()
+
+        for _ in range(3):
+            response = self.user_01.post(utils.ApiUrls.contract, con_req)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.set_submit(self.user_01, response.data['id'])
+        self.assertEqual(count_list_queries(), num_queries)
+
+    def test_GET_sparse_fields(self):
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Only listed fields are returned
+        response = self.user_01.get(utils.ApiUrls.contract, {'fields': 'id,year,is_submitted'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0].keys()), {'id', 'year', 'is_submitted'})
+
+        # Expand alone return all plain fields, with only the listed nested fields
+        response = self.user_01.get(utils.ApiUrls.contract, {'expand': 'supervise'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('supervise', response.data[0])
+        self.assertIn('is_all_assessments_approved', response.data[0])
+        self.assertNotIn('assessment', response.data[0])
+        self.assertNotIn('individual_project', response.data[0])
+
+        # Fields and expand combined
+        response = self.user_01.get(utils.ApiUrls.contract,
+                                    {'fields': 'id', 'expand': 'assessment'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0].keys()), {'id', 'assessment'})
+
+        # Unrequested nested fields should not be queried
+        with CaptureQueriesContext(connection) as full:
+            self.user_01.get(utils.ApiUrls.contract)
+        with CaptureQueriesContext(connection) as sparse:
+            self.user_01.get(utils.ApiUrls.contract, {'fields': 'id,year'})
+        self.assertLess(len(sparse.captured_queries), len(full.captured_queries))
+
+    def test_GET_summary(self):
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        contract = response.data
+
+        response = self.user_01.get(utils.ApiUrls.contract + 'summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        summary = response.data[0]
+        contract_detail = contract[contract['contract_type']]
+        self.assertEqual(summary, {
+            'id': contract['id'],
+            'contract_type': contract['contract_type'],
+            'title': contract_detail['title'],
+            'course_number': data.comp8755.course_number,
+            'year': contract['year'],
+            'semester': contract['semester'],
+            'owner_name': self.user_01.obj.display_name,
+            'workflow_state': 'draft',
+        })
+
+        self.set_submit(self.user_01, contract['id'])
+        response = self.user_01.get(utils.ApiUrls.contract + 'summary/')
+        self.assertEqual(response.data[0]['workflow_state'], 'submitted')
+
+        # Other users can't see the draft
+        response = self.user_02.get(utils.ApiUrls.contract + 'summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_GET_bundle(self):
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        contract_id = response.data['id']
+        self.set_submit(self.user_01, contract_id)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.user_01.get(utils.get_contract_url(contract_id) + 'bundle/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        num_queries = len(context.captured_queries)
+
+        contract = response.data['contract']
+        self.assertEqual(contract, self.user_01.get(utils.get_contract_url(contract_id)).data)
+
+        users = response.data['users']
+        self.assertIn(self.user_01.id, users)
+        for supervise in contract['supervise']:
+            self.assertIn(supervise['supervisor'], users)
+            self.assertIn(supervise['nominator'], users)
+        self.assertEqual(users[self.user_01.id]['username'], self.user_01.obj.username)
+
+        # Adding more supervisors should not add more queries
+        req, _ = data.gen_supervise_req_resp(contract_id, self.supervisor_non_formal.id, False)
+        response = self.superuser.post(utils.get_supervise_url(contract_id), req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as context:
+            response = self.user_01.get(utils.get_contract_url(contract_id) + 'bundle/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(self.supervisor_non_formal.id, response.data['users'])
+        self.assertEqual(len(context.captured_queries), num_queries)
+
+    def test_GET_conditional(self):
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        contract_id = response.data['id']
+        contract_url = utils.get_contract_url(contract_id)
+        supervise_url = utils.get_supervise_url(contract_id)
+
+        response = self.user_01.get(contract_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        response = self.user_01.get(supervise_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        supervise_etag = response['ETag']
+        self.assertNotEqual(etag, supervise_etag)
+
+        # Not modified
+        response = self.user_01.get(contract_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.user_01.get(supervise_url, HTTP_IF_NONE_MATCH=supervise_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Related object changed
+        req, _ = data.gen_supervise_req_resp(contract_id, self.supervisor_formal.id, True)
+        response = self.user_01.post(supervise_url, req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.user_01.get(contract_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.user_01.get(supervise_url, HTTP_IF_NONE_MATCH=supervise_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Lost update
+        response = self.user_01.patch(contract_url, {'year': 2050}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertNotEqual(Contract.objects.get(pk=contract_id).year, 2050)
+
+        etag = self.user_01.get(contract_url)['ETag']
+        response = self.user_01.patch(contract_url, {'year': 2050}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.user_01.get(contract_url)['ETag'], response['ETag'])
+
+        # Write again with the tag of the last write
+        etag = response['ETag']
+        response = self.user_01.patch(contract_url, {'year': 2051}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Modified by someone else between retrieve and update
+        etag = response['ETag']
+        response = self.superuser.patch(contract_url, {'year': 2052})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.user_01.patch(contract_url, {'year': 2053}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Contract.objects.get(pk=contract_id).year, 2052)
+
+    def test_GET_list_cache(self):
+        def list_contracts(user: utils.User) -> dict:
+            response = user.get(utils.ApiUrls.contract, {'fields': 'id,year'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return {c['id']: c['year'] for c in response.data}
+
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        contract_id = response.data['id']
+        self.assertEqual(list(list_contracts(self.user_01)), [contract_id])
+
+        # Repeated request hit the cache
+        hits = get_stats()['hits']
+        self.assertEqual(list(list_contracts(self.user_01)), [contract_id])
+        self.assertEqual(get_stats()['hits'], hits + 1)
+        self.assertEqual(list_contracts(self.supervisor_non_formal), {})
+        self.assertEqual(list_contracts(self.convener), {})
+        self.assertEqual(list_contracts(self.user_02), {})
+
+        # Changes are visible right away to the users involved
+        self.set_submit(self.user_01, contract_id)
+        self.assertEqual(list(list_contracts(self.supervisor_non_formal)), [contract_id])
+        self.assertEqual(list(list_contracts(self.convener)), [contract_id])
+        response = self.superuser.patch(utils.get_contract_url(contract_id), {'year': 2050})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list_contracts(self.user_01), {contract_id: 2050})
+        self.assertEqual(list_contracts(self.supervisor_non_formal), {contract_id: 2050})
+
+        # Lists of other users are not invalidated
+        hits = get_stats()['hits']
+        self.assertEqual(list_contracts(self.user_02), {})
+        self.assertEqual(get_stats()['hits'], hits + 1)
+
+        response = self.superuser.delete(utils.get_contract_url(contract_id))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list_contracts(self.user_01), {})
+        self.assertEqual(list_contracts(self.convener), {})
+
+    def test_POST_bulk_approve(self):
+        url = utils.ApiUrls.contract + 'bulk_approve/'
+        con_req, _ = data.get_contract(owner=self.user_01)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        submitted_id = response.data['id']
+        self.set_submit(self.user_01, submitted_id)
+        response = self.user_01.post(utils.ApiUrls.contract, con_req)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        draft_id = response.data['id']
+
+        # Only convener and superuser are allowed
+        response = self.user_01.post(url, {'ids': [submitted_id], 'approve': True})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        # None of the contracts are ready for approval
+        response = self.convener.post(url, {'ids': [submitted_id, draft_id], 'approve': True})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        results = {result['id']: result for result in response.data['results']}
+        self.assertEqual(results[submitted_id]['status'], 'rejected')
+        self.assertIn('All supervisors must approve this contract before final approval',
+                      results[submitted_id]['errors'])
+        self.assertEqual(results[draft_id]['status'], 'rejected')
+        self.assertEqual(results[draft_id]['errors'], ['Contract not found.'])
+        self.assertFalse(Contract.objects.get(pk=submitted_id).convener_approval_date)
+
+        # Disapprove is allowed, and is logged
+        num_logs = ActivityLog.objects.count()
+        response = self.convener.post(url, {'ids': [submitted_id], 'approve': False,
+                                            'message': 'test'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(response.data['results'],
+                         [{'id': submitted_id, 'errors': [], 'status': 'disapproved'}])
+        self.assertEqual(ActivityLog.objects.count(), num_logs + 1)
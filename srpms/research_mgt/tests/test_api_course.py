@@ -10,6 +10,7 @@ __email__ = 'dajie.yang@anu.edu.au'
 
 from rest_framework import status
 
+from research_mgt.models import Contract
 from . import utils
 from . import data
 
@@ -20,7 +21,7 @@ class TestCourse(utils.SrpmsTest):
             response = self.convener.post(utils.ApiUrls.course, cour)
             self.assertEqual(response.status_code, status.HTTP_201_CREATED)
             self.assertTrue(response.data.pop('id'))
-            self.assertTrue(response.data.pop('contract') is not None)
+            self.assertNotIn('contract', response.data)
             self.assertEqual(response.data, cour)
 
         for cour in data.course_list_invalid:
@@ -46,7 +47,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.convener.post(utils.ApiUrls.course, course)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
         ########################################
@@ -54,7 +55,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.superuser.post(utils.ApiUrls.course, course_another)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course_another)
 
     def test_PUT(self):
@@ -68,7 +69,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.convener.put(utils.ApiUrls.course + str(course_id) + '/', course)
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
         # Illegal
@@ -98,7 +99,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.convener.put(utils.ApiUrls.course + str(course_id) + '/', course)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
         ########################################
@@ -106,7 +107,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.superuser.put(utils.ApiUrls.course + str(course_id) + '/', course)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
     def test_PATCH(self):
@@ -121,7 +122,7 @@ class TestCourse(utils.SrpmsTest):
                                        {'course_number': course['course_number']})
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
         # Legal
@@ -129,7 +130,7 @@ class TestCourse(utils.SrpmsTest):
                                        {'name': course['name']})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
         # Illegal
@@ -159,7 +160,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.convener.patch(utils.ApiUrls.course + str(course_id) + '/', course)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
         ########################################
@@ -167,7 +168,7 @@ class TestCourse(utils.SrpmsTest):
         response = self.superuser.patch(utils.ApiUrls.course + str(course_id) + '/', course)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data.pop('id'))
-        self.assertTrue(response.data.pop('contract') is not None)
+        self.assertNotIn('contract', response.data)
         self.assertEqual(response.data, course)
 
     def test_DELETE(self):
@@ -218,3 +219,48 @@ class TestCourse(utils.SrpmsTest):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         response = self.convener.delete(utils.ApiUrls.course + str(course_id) + '/', course)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_GET(self):
+        course = data.get_course()
+        response = self.convener.post(utils.ApiUrls.course, course)
+        course_id = response.data['id']
+
+        # Served from reference data cache, with the new course picked up
+        response = self.user_01.get(utils.ApiUrls.course)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(course_id, [cour['id'] for cour in response.data])
+        self.assertTrue(all('contract' not in cour for cour in response.data))
+        response = self.user_01.get(utils.ApiUrls.course + str(course_id) + '/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], course['name'])
+
+        # HTTP caching, the tag changes on every change
+        response = self.user_01.get(utils.ApiUrls.course)
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Authorization', response['Vary'])
+        response = self.user_01.get(utils.ApiUrls.course, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.user_01.get(utils.ApiUrls.course + str(course_id) + '/',
+                                    HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client_nologin.get(utils.ApiUrls.course, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Contracts are opt-in
+        contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                           course=data.comp8755, owner=self.user_01.obj)
+        response = self.user_01.get('{}{}/?expand=contract'.format(utils.ApiUrls.course,
+                                                                   data.comp8755.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['contract']), [contract.id])
+
+        # Changes are visible right away
+        self.convener.patch(utils.ApiUrls.course + str(course_id) + '/', {'name': 'Changed'})
+        response = self.user_01.get(utils.ApiUrls.course + str(course_id) + '/',
+                                    HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Changed')
+        self.convener.delete(utils.ApiUrls.course + str(course_id) + '/')
+        response = self.user_01.get(utils.ApiUrls.course + str(course_id) + '/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
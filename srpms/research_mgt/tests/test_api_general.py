@@ -9,9 +9,12 @@ __credits__ = ['Dajie Yang']
 __maintainer__ = 'Dajie (Cooper) Yang'
 __email__ = 'dajie.yang@anu.edu.au'
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
 from . import utils
+from . import data
 
 
 class APITests(utils.SrpmsTest):
@@ -86,3 +89,20 @@ class APITests(utils.SrpmsTest):
         response = self.convener.put(utils.get_user_url(user_id, convener=True),
                                      {'submit': False})
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+
+    def test_user_list_queries(self):
+        """Test listing users take constant number of queries as users and contracts grow"""
+        with CaptureQueriesContext(connection) as before:
+            response = self.convener.get(utils.ApiUrls.mgt_user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+
+        for i in range(5):
+            user = utils.User('user_extra_{}'.format(i), 'Extra_12345')
+            con_req, _ = data.get_contract(owner=user)
+            response = user.post(utils.ApiUrls.contract, con_req)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+
+        with CaptureQueriesContext(connection) as after:
+            response = self.convener.get(utils.ApiUrls.mgt_user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(len(before.captured_queries), len(after.captured_queries))
@@ -129,3 +129,61 @@ class SpecialTopic(utils.SrpmsTest):
         self.set_supervise_approve()
         self.set_examiner_approve()
         self.set_convener_approve()
+
+    def test_work_flow_conditional(self):
+        """Writes to nested objects with an outdated tag are rejected"""
+        self.set_supervise()
+        self.set_assessment()
+
+        supervise_url = utils.get_supervise_url(self.contract_id)
+        assessment_url = utils.get_assessment_url(self.contract_id)
+        examine_url = utils.get_examine_url(self.contract_id, self.assess_01_id)
+        supervise_etag = self.user_01.get(supervise_url)['ETag']
+        assessment_etag = self.user_01.get(assessment_url)['ETag']
+        examine_etag = self.user_01.get(examine_url)['ETag']
+
+        # Contract modified since the tags were retrieved
+        self.set_submit()
+        self.set_examine()
+
+        response = self.user_01.patch(utils.get_assessment_url(self.contract_id,
+                                                               self.assess_01_id),
+                                      {'weight': 50}, HTTP_IF_MATCH=assessment_etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = self.supervisor_formal.patch(
+                utils.get_supervise_url(self.contract_id, self.supervise_non_formal_id), {},
+                HTTP_IF_MATCH=supervise_etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = self.supervisor_formal.put(self.supervise_formal_approve_url,
+                                              data.get_approve_data(True),
+                                              HTTP_IF_MATCH=supervise_etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.user_01.get(utils.get_supervise_url(self.contract_id,
+                                                            self.supervise_formal_id))
+        self.assertIsNone(response.data['supervisor_approval_date'])
+
+        response = self.supervisor_formal.patch(
+                utils.get_examine_url(self.contract_id, self.assess_01_id, self.examine_01_id),
+                {}, HTTP_IF_MATCH=examine_etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        # Successful writes respond with the new tag, which is good for the next write
+        supervise_etag = self.user_01.get(supervise_url)['ETag']
+        response = self.supervisor_formal.put(self.supervise_formal_approve_url,
+                                              data.get_approve_data(True),
+                                              HTTP_IF_MATCH=supervise_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertNotEqual(response['ETag'], supervise_etag)
+        self.assertEqual(self.user_01.get(supervise_url)['ETag'], response['ETag'])
+
+        response = self.supervisor_non_formal.put(self.supervise_non_formal_approve_url,
+                                                  data.get_approve_data(True),
+                                                  HTTP_IF_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+
+        response = self.user_03.put(utils.get_examine_url(self.contract_id, self.assess_01_id,
+                                                          self.examine_01_id, approve=True),
+                                    data.get_approve_data(True), HTTP_IF_MATCH=examine_etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
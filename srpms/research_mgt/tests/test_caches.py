@@ -0,0 +1,52 @@
+"""
+Test hit and miss counting of the cache backends.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from io import StringIO
+
+from django.core import management
+from django.test import SimpleTestCase
+
+from srpms.caches import LocMemCache
+
+
+class TestCacheStats(SimpleTestCase):
+    def setUp(self) -> None:
+        self.cache = LocMemCache('test_cache_stats', {})
+        self.cache.clear()
+
+    def test_count(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', None)
+        self.assertIsNone(self.cache.get('key', 'default'))
+        self.cache.set('other', 1)
+        self.assertEqual(self.cache.get_many(['other', 'missing']), {'other': 1})
+        self.assertEqual(self.cache.get_stats(), {'hits': 2, 'misses': 2})
+
+        # Only lookups are counted
+        self.cache.incr('other')
+        self.assertTrue(self.cache.has_key('other'))
+        self.assertEqual(self.cache.get_stats(), {'hits': 2, 'misses': 2})
+
+        self.cache.reset_stats()
+        self.assertEqual(self.cache.get_stats(), {'hits': 0, 'misses': 0})
+
+    def test_flush(self):
+        self.cache.stats_flush_interval = 2
+        self.cache.get('key')
+        self.assertEqual(self.cache._pending['misses'], 1)
+        self.cache.get('key')
+        self.assertEqual(self.cache._pending['misses'], 0)
+        self.assertEqual(self.cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    def test_command(self):
+        out = StringIO()
+        management.call_command('cache_stats', stdout=out)
+        for alias in ('default', 'ldap', 'responses', 'sessions'):
+            self.assertIn(alias + ': hits', out.getvalue())
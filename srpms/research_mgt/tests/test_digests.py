@@ -0,0 +1,67 @@
+"""
+Test notification digests, i.e. notifications to users who prefer digests are held, and sent in
+one email per user once their window passed.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts.models import SrpmsUser
+from research_mgt.models import OutboxMessage, DigestItem
+from research_mgt.notifications import notify, dispatch_notifications
+from research_mgt.digests import send_digests
+from . import utils
+
+
+class TestDigests(utils.SrpmsTest):
+    def test_digests(self):
+        SrpmsUser.objects.filter(pk=self.user_01.id).update(
+                digest_frequency=SrpmsUser.DIGEST_HOURLY)
+        SrpmsUser.objects.filter(pk=self.user_02.id).update(digest_frequency=SrpmsUser.DIGEST_DAILY)
+
+        recipients = [self.user_01.email, self.user_02.email, self.user_03.email]
+        with dispatch_notifications():
+            notify('Subject 1', 'Body 1', 'sender@example.com', recipients)
+            notify('Subject 2', 'Body 2', 'sender@example.com', recipients)
+
+        # Only the user without digest preference is emailed right away
+        self.assertEqual(OutboxMessage.objects.filter(recipients=[self.user_03.email]).count(), 2)
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+        self.assertEqual(DigestItem.objects.count(), 4)
+
+        # Not due yet
+        self.assertEqual(send_digests(), (0, 0))
+
+        # Hourly digest is due
+        DigestItem.objects.update(create_date=timezone.now() - timedelta(hours=2))
+        self.assertEqual(send_digests(), (1, 2))
+        digest = OutboxMessage.objects.get(recipients=[self.user_01.email])
+        self.assertEqual(digest.subject, 'You have 2 new notification(s)')
+        self.assertLess(digest.body.index('Subject 1'), digest.body.index('Subject 2'))
+        self.assertIn('Body 2', digest.body)
+        self.assertFalse(DigestItem.objects.filter(user=self.user_01.id).exists())
+
+        # Daily digest is due
+        DigestItem.objects.update(create_date=timezone.now() - timedelta(days=2))
+        self.assertEqual(send_digests(), (1, 2))
+        self.assertTrue(OutboxMessage.objects.filter(recipients=[self.user_02.email]).exists())
+        self.assertFalse(DigestItem.objects.exists())
+
+    def test_switch_to_immediate(self):
+        SrpmsUser.objects.filter(pk=self.user_01.id).update(digest_frequency=SrpmsUser.DIGEST_DAILY)
+        notify('Subject', 'Body', 'sender@example.com', [self.user_01.email])
+        self.assertEqual(send_digests(), (0, 0))
+
+        # Held notifications are sent on the next run, rather than being stuck forever
+        SrpmsUser.objects.filter(pk=self.user_01.id).update(
+                digest_frequency=SrpmsUser.DIGEST_IMMEDIATE)
+        self.assertEqual(send_digests(), (1, 1))
+        self.assertTrue(OutboxMessage.objects.filter(recipients=[self.user_01.email]).exists())
+        self.assertFalse(DigestItem.objects.exists())
@@ -10,9 +10,10 @@ __maintainer__ = 'Dajie (Cooper) Yang'
 __email__ = 'dajie.yang@anu.edu.au'
 
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 from research_mgt.models import (Contract, IndividualProject, SpecialTopic, Assessment,
-                                 Examine, AssessmentExamine)
+                                 Supervise, Examine, AssessmentExamine)
 from . import utils
 from . import data
 
@@ -24,12 +25,16 @@ class TestModel(utils.SrpmsTest):
                                    **individual_project_data}
         c = IndividualProject.objects.create(owner=self.user_01.obj, **individual_project_data)
         self.assertEqual(str(c), c.title)
+        self.assertEqual(str(Contract.objects.get(pk=c.pk)), c.title)
+        self.assertTrue(Contract.objects.get(pk=c.pk).is_individual_project())
 
         special_topic_data = {**data.contract_02_request, 'course': data.comp6470}
         special_topic_data = {**special_topic_data.pop('special_topic'),
                               **special_topic_data}
         c = SpecialTopic.objects.create(owner=self.user_01.obj, **special_topic_data)
         self.assertEqual(str(c), c.title)
+        self.assertEqual(str(Contract.objects.get(pk=c.pk)), c.title)
+        self.assertTrue(Contract.objects.get(pk=c.pk).is_special_topic())
 
     def test_assessment_examine(self):
         contract_01 = Contract.objects.create(year=2019, semester=2, duration=1,
@@ -72,3 +77,47 @@ class TestModel(utils.SrpmsTest):
         with self.assertRaises(ValidationError):
             AssessmentExamine.objects.create(assessment=assessment_01, examine=examine_01)
             AssessmentExamine.objects.create(assessment=assessment_02, examine=examine_02)
+
+    def test_contract_approval_status_annotation(self):
+        contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                           course=data.comp8755,
+                                           owner=self.user_01.obj)
+
+        def assert_annotation_consistent():
+            annotated = Contract.objects.with_approval_status().get(pk=contract.pk)
+            for method in ['is_submitted', 'is_convener_approved', 'is_examiner_nominated',
+                           'is_all_supervisors_approved', 'is_all_assessments_approved']:
+                self.assertEqual(getattr(annotated, 'annotated_' + method),
+                                 getattr(contract, method)(), method)
+
+            for assessment in Assessment.objects.with_approval_status().filter(contract=contract):
+                self.assertEqual(assessment.annotated_is_all_examiners_approved,
+                                 assessment.is_all_examiners_approved())
+
+        # Empty contract
+        assert_annotation_consistent()
+
+        # Contract with assessment and supervisor, but no examiner
+        assessment = Assessment.objects.create(template=data.temp_custom, contract=contract,
+                                               weight=100)
+        supervise = Supervise.objects.create(supervisor=self.supervisor_formal.obj,
+                                             is_formal=True, contract=contract,
+                                             nominator=self.user_01.obj)
+        assert_annotation_consistent()
+
+        # Contract submitted with examiner assigned
+        examine = Examine.objects.create(contract=contract, examiner=self.user_02.obj,
+                                         nominator=self.supervisor_formal.obj)
+        assessment_examine = AssessmentExamine.objects.create(assessment=assessment,
+                                                              examine=examine)
+        contract.submit_date = timezone.now()
+        contract.save()
+        assert_annotation_consistent()
+
+        # Contract approved by all supervisors and examiners
+        supervise.supervisor_approval_date = timezone.now()
+        supervise.save()
+        assert_annotation_consistent()
+        assessment_examine.examiner_approval_date = timezone.now()
+        assessment_examine.save()
+        assert_annotation_consistent()
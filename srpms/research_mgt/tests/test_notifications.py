@@ -0,0 +1,41 @@
+"""
+Test batched notification dispatch.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from research_mgt.models import OutboxMessage
+from research_mgt.notifications import notify, dispatch_notifications
+from . import utils
+
+
+class TestNotifications(utils.SrpmsTest):
+    def test_dispatch(self):
+        with dispatch_notifications():
+            notify('Subject', 'Body', 'sender@example.com', ['a@example.com', 'b@example.com'])
+            with dispatch_notifications():
+                notify('Subject', 'Body', 'sender@example.com', ['b@example.com', ''])
+                notify('Other', 'Body', 'sender@example.com', ['b@example.com'])
+
+            # Queued at the end of the outermost block
+            self.assertFalse(OutboxMessage.objects.exists())
+
+        # Every recipient gets its own email, duplicates are only queued once
+        self.assertEqual(sorted(OutboxMessage.objects.values_list('subject', 'recipients')),
+                         [('Other', ['b@example.com']), ('Subject', ['a@example.com']),
+                          ('Subject', ['b@example.com'])])
+
+    def test_dispatch_error(self):
+        with self.assertRaises(ValueError):
+            with dispatch_notifications():
+                notify('Subject', 'Body', 'sender@example.com', ['a@example.com'])
+                raise ValueError()
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        # Queued right away without a block
+        notify('Subject', 'Body', 'sender@example.com', ['a@example.com'])
+        self.assertEqual(OutboxMessage.objects.count(), 1)
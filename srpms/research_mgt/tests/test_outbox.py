@@ -0,0 +1,59 @@
+"""
+Test the email outbox, i.e. queued emails are delivered by batch, and retried on failure.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+import tempfile
+
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+
+from research_mgt.models import OutboxMessage
+from research_mgt.notifications import notify
+from research_mgt.outbox import deliver_batch
+from . import utils
+
+
+class TestOutbox(utils.SrpmsTest):
+    def test_deliver(self):
+        notify('Subject', 'Body', 'sender@example.com', [''])
+        self.assertFalse(OutboxMessage.objects.exists())
+        for i in range(3):
+            notify('Subject {}'.format(i), 'Body', 'sender@example.com', ['user.01@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(deliver_batch(batch_size=2), (2, 0))
+        self.assertEqual([email.subject for email in mail.outbox], ['Subject 0', 'Subject 1'])
+        self.assertEqual(mail.outbox[0].to, ['user.01@example.com'])
+        self.assertEqual(deliver_batch(batch_size=2), (1, 0))
+        self.assertEqual(deliver_batch(batch_size=2), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxMessage.STATUS_SENT).exists())
+
+    def test_retry(self):
+        notify('Subject', 'Body', 'sender@example.com', ['user.01@example.com'])
+        message = OutboxMessage.objects.get()
+
+        # File backend fails when the path is not a directory
+        with tempfile.NamedTemporaryFile() as file, \
+                override_settings(EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+                                  EMAIL_FILE_PATH=file.name):
+            self.assertEqual(deliver_batch(), (0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.STATUS_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertTrue(message.last_error)
+        self.assertGreater(message.next_attempt, timezone.now())
+
+        # Not retried before due
+        self.assertEqual(deliver_batch(), (0, 0))
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt=timezone.now())
+        self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,61 @@
+"""
+Test the process-wide registry of permission and group ids, and activity actions.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.contrib.auth.models import Group, Permission
+
+from research_mgt.models import ActivityAction
+from research_mgt.registry import get_group_id, get_permission_id, get_action, clear_registry
+from research_mgt.signals import ACTION_CONTRACT_SUBMIT, ACTION_EXAMINER_DISAPPROVE
+from . import utils
+
+
+class TestRegistry(utils.SrpmsTest):
+    def test_lookup(self):
+        group_id = get_group_id('approved_supervisors')
+        self.assertEqual(group_id, Group.objects.get(name='approved_supervisors').pk)
+        self.assertEqual(get_permission_id('can_supervise'),
+                         Permission.objects.get(codename='can_supervise').pk)
+
+        # Loaded once for the process
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group_id('approved_supervisors'), group_id)
+            get_permission_id('can_convene')
+
+        with self.assertRaises(Group.DoesNotExist):
+            get_group_id('not_exist')
+
+    def test_invalidate(self):
+        get_group_id('approved_supervisors')
+
+        group = Group.objects.create(name='new_group')
+        self.assertEqual(get_group_id('new_group'), group.pk)
+
+        group.delete()
+        with self.assertNumQueries(2):
+            # Reloaded after delete, and once again for the missing key
+            with self.assertRaises(Group.DoesNotExist):
+                get_group_id('new_group')
+
+    def test_actions(self):
+        clear_registry()
+
+        # All actions are loaded in one query
+        with self.assertNumQueries(1):
+            action = get_action(ACTION_CONTRACT_SUBMIT)
+            get_action(ACTION_EXAMINER_DISAPPROVE)
+        self.assertEqual(action, ActivityAction.objects.get(name='contract_submit'))
+
+        with self.assertRaises(ActivityAction.DoesNotExist):
+            get_action('not_exist')
+
+        # Reloaded on change
+        new_action = ActivityAction.objects.create(name='new_action')
+        with self.assertNumQueries(1):
+            self.assertEqual(get_action('new_action'), new_action)
@@ -0,0 +1,77 @@
+"""
+Test materialized role flags of users, and the user filter based on them.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.contrib.auth.models import Group, Permission
+from rest_framework import status
+
+from accounts.models import SrpmsUser
+from research_mgt.role_flags import check_role_flags
+from . import utils
+
+
+class TestRoleFlags(utils.SrpmsTest):
+    def assert_flags(self, user: utils.User, is_approved_supervisor: bool,
+                     is_course_convener: bool):
+        obj = SrpmsUser.objects.get(pk=user.id)
+        self.assertEqual(obj.is_approved_supervisor, is_approved_supervisor)
+        self.assertEqual(obj.is_course_convener, is_course_convener)
+        self.assertEqual(check_role_flags(), [])
+
+    def test_flags(self):
+        self.assert_flags(self.user_01, False, False)
+        self.assert_flags(self.supervisor_formal, True, False)
+        self.assert_flags(self.convener, False, True)
+
+        # Through group, from both sides of the relation
+        supervisors = Group.objects.get(name='approved_supervisors')
+        supervisors.user_set.add(self.user_01.obj)
+        self.assert_flags(self.user_01, True, False)
+        self.user_01.obj.groups.remove(supervisors)
+        self.assert_flags(self.user_01, False, False)
+
+        # Through permission granted directly
+        can_convene = Permission.objects.get(codename='can_convene')
+        self.user_01.obj.user_permissions.add(can_convene)
+        self.assert_flags(self.user_01, False, True)
+        self.user_01.obj.user_permissions.clear()
+        self.assert_flags(self.user_01, False, False)
+
+        # Through group permission change
+        supervisors.permissions.add(can_convene)
+        self.assert_flags(self.supervisor_formal, True, True)
+        supervisors.permissions.remove(can_convene)
+        self.assert_flags(self.supervisor_formal, True, False)
+
+        # Django superuser has all flags
+        self.user_01.obj.is_superuser = True
+        self.user_01.obj.save()
+        self.assert_flags(self.user_01, True, True)
+
+    def test_filter(self):
+        response = self.user_01.get(
+                '{}?is_approved_supervisor=true'.format(utils.ApiUrls.mgt_user))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({user['id'] for user in response.data},
+                         {self.supervisor_formal.id})
+
+        response = self.user_01.put(utils.get_user_url(self.user_02.id, supervisor=True),
+                                    {'submit': True})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.convener.put(utils.get_user_url(self.user_02.id, supervisor=True),
+                                     {'submit': True})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.user_01.get(
+                '{}?is_approved_supervisor=true'.format(utils.ApiUrls.mgt_user))
+        self.assertEqual({user['id'] for user in response.data},
+                         {self.supervisor_formal.id, self.user_02.id})
+
+        response = self.user_01.get('{}?is_course_convener=false'.format(utils.ApiUrls.mgt_user))
+        self.assertNotIn(self.convener.id, {user['id'] for user in response.data})
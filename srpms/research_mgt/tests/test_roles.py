@@ -0,0 +1,72 @@
+"""
+Test request scoped role facts, i.e. the requester's relationship to a contract.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.utils import timezone
+
+from research_mgt.models import Contract, Assessment, Supervise, Examine, AssessmentExamine
+from research_mgt.roles import ContractRoleFacts
+from research_mgt.workflow import refresh_contract_status
+from . import utils
+from . import data
+
+
+class TestRoleFacts(utils.SrpmsTest):
+    def setUp(self):
+        super(TestRoleFacts, self).setUp()
+
+        self.contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                                course=data.comp8755, owner=self.user_01.obj)
+        self.assessment = Assessment.objects.create(template=data.temp_custom,
+                                                    contract=self.contract, weight=100)
+        Supervise.objects.create(supervisor=self.supervisor_formal.obj, is_formal=True,
+                                 contract=self.contract, nominator=self.user_01.obj,
+                                 supervisor_approval_date=None)
+        examine = Examine.objects.create(contract=self.contract, examiner=self.user_02.obj,
+                                         nominator=self.supervisor_formal.obj)
+        self.assessment_examine = AssessmentExamine.objects.create(assessment=self.assessment,
+                                                                   examine=examine)
+
+    def test_owner(self):
+        facts = ContractRoleFacts(self.contract.pk, self.user_01.obj)
+        self.assertTrue(facts.is_owner)
+        self.assertFalse(facts.is_supervisor)
+        self.assertFalse(facts.is_examiner)
+        self.assertFalse(facts.is_submitted)
+        self.assertFalse(facts.is_all_supervisors_approved)
+        self.assertTrue(facts.is_examiner_nominated)
+
+    def test_supervisor(self):
+        facts = ContractRoleFacts(self.contract.pk, self.supervisor_formal.obj)
+        self.assertFalse(facts.is_owner)
+        self.assertTrue(facts.is_supervisor)
+        self.assertTrue(facts.is_formal_supervisor)
+        self.assertFalse(facts.is_supervisor_approved)
+        self.assertFalse(facts.is_examiner)
+        self.assertEqual(facts.nominated_examine_ids, {self.assessment_examine.pk})
+
+        Supervise.objects.filter(contract=self.contract).update(
+                supervisor_approval_date=timezone.now())
+        refresh_contract_status([self.contract.pk])
+        facts = ContractRoleFacts(self.contract.pk, self.supervisor_formal.obj)
+        self.assertTrue(facts.is_supervisor_approved)
+        self.assertTrue(facts.is_all_supervisors_approved)
+
+    def test_examiner(self):
+        facts = ContractRoleFacts(self.contract.pk, self.user_02.obj)
+        self.assertFalse(facts.is_owner)
+        self.assertFalse(facts.is_supervisor)
+        self.assertTrue(facts.is_examiner)
+        self.assertEqual(facts.examine_ids, {self.assessment_examine.pk})
+        self.assertEqual(facts.examine_assessment_ids, {self.assessment.pk})
+        self.assertFalse(facts.nominated_examine_ids)
+
+        # Un-related user
+        facts = ContractRoleFacts(self.contract.pk, self.user_03.obj)
+        self.assertFalse(any([facts.is_owner, facts.is_supervisor, facts.is_examiner]))
@@ -1,5 +1,5 @@
 """
-Test signals, i.e. notification emails are sent correctly.
+Test signals, i.e. notification emails are queued and delivered correctly.
 """
 
 __author__ = 'Dajie (Cooper) Yang'
@@ -8,33 +8,46 @@ __credits__ = ['Dajie Yang']
 __maintainer__ = 'Dajie (Cooper) Yang'
 __email__ = 'dajie.yang@anu.edu.au'
 
-from django.core import mail
+from io import StringIO
+
+from django.core import mail, management
 
 from .test_api_integration_special_topic import SpecialTopic
 
 
 class SignalTest(SpecialTopic):
+    @staticmethod
+    def deliver():
+        management.call_command('deliver_outbox', once=True, stdout=StringIO())
+
     def test_notifications(self):
         self.set_supervise()
         self.set_assessment()
         self.set_submit()
 
+        # Nothing is sent until delivered
+        self.assertEqual(len(mail.outbox), 0)
+        self.deliver()
+
         # 3 emails, one for contract owner, 2 for supervisors
         self.assertEqual(len(mail.outbox), 3)
 
         self.set_examine()
         self.set_supervise_approve()
+        self.deliver()
 
         # 3 more emails, 2 for contract owner (for each supervisor's approval), 2 for examiners
         self.assertEqual(len(mail.outbox), 7)
 
         self.set_examiner_approve()
+        self.deliver()
 
         # 4 more emails, 2 for contract owner (for each examiner's approval), 2 for
         # examiner nominators
         self.assertEqual(len(mail.outbox), 11)
 
         self.set_convener_approve()
+        self.deliver()
 
         # 3 more emails, one for contract owner, 2 for supervisors
         self.assertEqual(len(mail.outbox), 14)
@@ -0,0 +1,91 @@
+"""
+Test set-based workflow transitions.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+
+from research_mgt.models import Contract, Assessment, Supervise, Examine, AssessmentExamine
+from research_mgt.transitions import (disapprove_supervise, disapprove_contracts,
+                                      disapprove_assessment_examine)
+from . import utils
+from . import data
+
+
+class TestTransitions(utils.SrpmsTest):
+    def setUp(self):
+        super(TestTransitions, self).setUp()
+
+        self.contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                                course=data.comp8755, owner=self.user_01.obj)
+        self.supervise = Supervise.objects.create(supervisor=self.supervisor_formal.obj,
+                                                  is_formal=True, contract=self.contract,
+                                                  nominator=self.user_01.obj)
+        self.examine = Examine.objects.create(contract=self.contract, examiner=self.user_02.obj,
+                                              nominator=self.supervisor_formal.obj)
+
+    def add_approved_assessment(self) -> AssessmentExamine:
+        assessment = Assessment.objects.create(template=data.temp_custom,
+                                               contract=self.contract, weight=0)
+        assessment_examine = AssessmentExamine.objects.create(assessment=assessment,
+                                                              examine=self.examine)
+        AssessmentExamine.objects.filter(pk=assessment_examine.pk).update(
+                examiner_approval_date=timezone.now())
+        return assessment_examine
+
+    def approve_all(self):
+        now = timezone.now()
+        Contract.objects.filter(pk=self.contract.pk).update(submit_date=now)
+        Supervise.objects.filter(pk=self.supervise.pk).update(supervisor_approval_date=now)
+
+    def count_disapprove_supervise_queries(self) -> int:
+        self.approve_all()
+        supervise = Supervise.objects.select_related('contract').get(pk=self.supervise.pk)
+        with CaptureQueriesContext(connection) as context:
+            disapprove_supervise(supervise)
+        return len(context.captured_queries)
+
+    def test_disapprove_supervise(self):
+        self.add_approved_assessment()
+        num_queries = self.count_disapprove_supervise_queries()
+
+        self.assertFalse(Supervise.objects.get(pk=self.supervise.pk).supervisor_approval_date)
+        self.assertFalse(Contract.objects.get(pk=self.contract.pk).submit_date)
+        self.assertFalse(AssessmentExamine.objects.filter(
+                contract=self.contract, examiner_approval_date__isnull=False).exists())
+
+        # Number of statements should not grow with number of examiners
+        for _ in range(5):
+            self.add_approved_assessment()
+        self.assertEqual(self.count_disapprove_supervise_queries(), num_queries)
+
+    def test_disapprove_assessment_examine(self):
+        assessment_examine = self.add_approved_assessment()
+        self.approve_all()
+
+        disapprove_assessment_examine(assessment_examine)
+        self.assertFalse(Supervise.objects.get(pk=self.supervise.pk).supervisor_approval_date)
+
+    def test_convener_approved(self):
+        self.add_approved_assessment()
+        self.approve_all()
+        Contract.objects.filter(pk=self.contract.pk).update(
+                convener=self.convener.obj, convener_approval_date=timezone.now())
+
+        # Same as model validation, convener approved contract is not allowed to modify
+        with self.assertRaises(ValidationError):
+            disapprove_supervise(Supervise.objects.get(pk=self.supervise.pk))
+
+        # Unless the convener approval itself is being cleared
+        disapprove_contracts([self.contract.pk])
+        contract = Contract.objects.get(pk=self.contract.pk)
+        self.assertFalse(contract.convener_approval_date)
+        self.assertFalse(Supervise.objects.get(pk=self.supervise.pk).supervisor_approval_date)
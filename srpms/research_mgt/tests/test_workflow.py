@@ -0,0 +1,147 @@
+"""
+Test denormalized approval counters and workflow state of contracts.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+import threading
+import time
+from io import StringIO
+
+from django.core import management
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from accounts.models import SrpmsUser
+from research_mgt.models import (Contract, Assessment, Supervise, Examine, AssessmentExamine,
+                                 COURSES, TEMPLATES)
+from research_mgt.workflow import check_contract_status
+from . import utils
+from . import data
+
+
+class TestContractStatus(utils.SrpmsTest):
+    def setUp(self):
+        super(TestContractStatus, self).setUp()
+
+        self.contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                                course=data.comp8755, owner=self.user_01.obj)
+
+    def assert_state(self, state: str):
+        contract = Contract.objects.get(pk=self.contract.pk)
+        self.assertEqual(contract.state, state)
+        self.assertEqual(check_contract_status(), [])
+
+    def test_state(self):
+        self.assert_state(Contract.STATE_DRAFT)
+
+        assessment = Assessment.objects.create(template=data.temp_custom,
+                                               contract=self.contract, weight=100)
+        supervise = Supervise.objects.create(supervisor=self.supervisor_formal.obj,
+                                             is_formal=True, contract=self.contract,
+                                             nominator=self.user_01.obj)
+        examine = Examine.objects.create(contract=self.contract, examiner=self.user_02.obj,
+                                         nominator=self.supervisor_formal.obj)
+        assessment_examine = AssessmentExamine.objects.create(assessment=assessment,
+                                                              examine=examine)
+        contract = Contract.objects.get(pk=self.contract.pk)
+        self.assertEqual((contract.supervise_count, contract.assessment_count,
+                          contract.assessment_examine_count,
+                          contract.assessment_without_examiner_count), (1, 1, 1, 0))
+
+        self.contract.submit_date = timezone.now()
+        self.contract.save()
+        self.assert_state(Contract.STATE_SUBMITTED)
+
+        supervise.supervisor_approval_date = timezone.now()
+        supervise.save()
+        self.assert_state(Contract.STATE_SUPERVISOR_APPROVED)
+
+        assessment_examine.examiner_approval_date = timezone.now()
+        assessment_examine.save()
+        self.assert_state(Contract.STATE_EXAMINER_APPROVED)
+
+        # Saving a stale instance should not leave stale counters behind
+        self.contract.convener = self.convener.obj
+        self.contract.convener_approval_date = timezone.now()
+        self.contract.save()
+        self.assert_state(Contract.STATE_FINALIZED)
+        self.assertTrue(Contract.objects.filter(state=Contract.STATE_FINALIZED).exists())
+
+    def test_verify_command(self):
+        Supervise.objects.create(supervisor=self.supervisor_formal.obj, is_formal=True,
+                                 contract=self.contract, nominator=self.user_01.obj)
+        Contract.objects.filter(pk=self.contract.pk).update(supervise_count=0)
+        self.assertEqual(check_contract_status(), [self.contract.pk])
+
+        with self.assertRaises(CommandError):
+            management.call_command('verify_contract_status', stdout=StringIO())
+
+        out = StringIO()
+        management.call_command('verify_contract_status', '--fix', stdout=out)
+        self.assertIn('1 contract(s) repaired', out.getvalue())
+        self.assertEqual(check_contract_status(), [])
+        self.assertEqual(Contract.objects.get(pk=self.contract.pk).supervise_count, 1)
+
+
+class TestContractStatusConcurrency(TransactionTestCase):
+    """Changes made in overlapping transactions, which TestCase can't do"""
+
+    # Groups, courses, etc. created by data migrations are restored after each test
+    serialized_rollback = True
+
+    def setUp(self):
+        COURSES.clear()
+        TEMPLATES.clear()
+
+        owner = SrpmsUser.objects.create_user(username='owner', password='Basic_12345')
+        self.contract = Contract.objects.create(year=2019, semester=2, duration=1,
+                                                course=data.comp8755, owner=owner,
+                                                submit_date=timezone.now())
+        self.supervises = [
+            Supervise.objects.create(supervisor=SrpmsUser.objects.create_user(
+                    username='supervisor_{}'.format(i), password='Sup_12345'),
+                    is_formal=True, contract=self.contract, nominator=owner)
+            for i in range(2)
+        ]
+
+    def test_concurrent_approve(self):
+        first_saved = threading.Event()
+        second_started = threading.Event()
+        errors = []
+
+        def approve(supervise: Supervise, before_commit: threading.Event = None):
+            try:
+                with transaction.atomic():
+                    supervise.supervisor_approval_date = timezone.now()
+                    supervise.save()
+                    if before_commit:
+                        # Keep the transaction open until the other one is waiting
+                        first_saved.set()
+                        before_commit.wait(5)
+                        time.sleep(0.5)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=approve, args=(self.supervises[0], second_started))
+        second = threading.Thread(target=approve, args=(self.supervises[1],))
+        first.start()
+        first_saved.wait(5)
+        second.start()
+        second_started.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(errors, [])
+        contract = Contract.objects.get(pk=self.contract.pk)
+        self.assertEqual(contract.supervise_approved_count, 2)
+        self.assertEqual(contract.state, Contract.STATE_SUPERVISOR_APPROVED)
+        self.assertEqual(check_contract_status(), [])
@@ -12,9 +12,12 @@ from typing import Dict
 from rest_framework.test import APIClient
 from rest_framework.response import Response
 from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
 from django.contrib.auth.models import Group
 
 from accounts.models import SrpmsUser
+from research_mgt.models import COURSES, TEMPLATES
 
 
 class ApiUrls(object):
@@ -250,6 +253,12 @@ class SrpmsTest(TestCase):
         your own test class's setUp() method (if you have one).
         """
 
+        # Reference data cached in process may contain rows rolled back after previous tests
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        COURSES.clear()
+        TEMPLATES.clear()
+
         # Users ------------------------------------------------------------------------------------
 
         self.user_01 = User('user_01', 'Basic_12345', '01', 'User', 'user.01@example.com')
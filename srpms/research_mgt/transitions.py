@@ -0,0 +1,128 @@
+"""
+Set-based workflow transitions for contracts, mainly the disapproval cascades.
+
+Disapproving used to reset approvals one row at a time through save(), and every save() runs
+full_clean(), which re-queries the contract's approval status for each row. Transitions here
+run the cascade as a few `QuerySet.update()` statements instead. Note that update() bypass
+model validation and post_save signals, so each transition checks the same constraints as the
+model clean() methods in one query, with the contract rows locked until the transaction ends.
+
+Clearing an approval only has one constraint in clean(), i.e. a convener approved contract is
+not allowed to be modified, which is checked by `lock_contracts()`. Since signals are bypassed,
+transitions also refresh the contract's approval counters and state (see workflow.py).
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from datetime import datetime
+from typing import Iterable
+
+from django.db import transaction
+from django.core.exceptions import ValidationError
+
+from accounts.models import SrpmsUser
+from .models import Contract, Supervise, Examine, AssessmentExamine
+from .workflow import refresh_contract_status
+
+
+def lock_contracts(contract_ids: Iterable[int], allow_approved: bool = False) -> None:
+    """
+    Lock contract rows until the end of the current transaction, so that their status won't
+    change in the middle of a transition, and check they are not approved by convener.
+
+    Args:
+        contract_ids: primary keys of the contracts
+        allow_approved: skip the convener approval check, for transitions that clear the
+                        convener approval itself
+    """
+    # Locked in a consistent order to avoid deadlocks between transitions of many contracts
+    approval_dates = Contract.objects.select_for_update().filter(pk__in=list(contract_ids)) \
+        .order_by('pk').values_list('convener_approval_date', flat=True)
+    if any(approval_dates) and not allow_approved:
+        raise ValidationError({
+            'convener_approve': 'convener approved contract is not allowed to modify.'})
+
+
+def approve_contracts(contract_ids: Iterable[int], convener: SrpmsUser,
+                      approve_date: datetime) -> None:
+    """
+    Convener final approval. Readiness should have been checked by the caller, e.g. through
+    `ContractQuerySet.with_approval_status()`.
+
+    Args:
+        contract_ids: primary keys of the contracts to approve
+        convener: the user who approve the contracts
+        approve_date: approval date to set
+    """
+    contract_ids = list(contract_ids)
+    with transaction.atomic():
+        lock_contracts(contract_ids)
+        Contract.objects.filter(pk__in=contract_ids).update(
+                convener=convener, convener_approval_date=approve_date)
+        # Same as Contract.save(), clean up examiners that does not examine anything
+        Examine.objects.filter(contract_id__in=contract_ids,
+                               assessment_examine__isnull=True).delete()
+        refresh_contract_status(contract_ids)
+
+
+def disapprove_contracts(contract_ids: Iterable[int]) -> None:
+    """
+    Convener disapproval, clear convener approval as well as all formal supervisor's approvals.
+
+    Args:
+        contract_ids: primary keys of the contracts to disapprove
+    """
+    contract_ids = list(contract_ids)
+    with transaction.atomic():
+        lock_contracts(contract_ids, allow_approved=True)
+        Contract.objects.filter(pk__in=contract_ids).update(
+                convener=None, convener_approval_date=None)
+        Supervise.objects.filter(contract_id__in=contract_ids, is_formal=True,
+                                 supervisor_approval_date__isnull=False) \
+            .update(supervisor_approval_date=None)
+        refresh_contract_status(contract_ids)
+
+
+def disapprove_supervise(supervise: Supervise) -> None:
+    """
+    Supervisor disapproval. All examiner's approvals of the contract are cleared as well, since
+    contract owner would be able to modify assessments after supervisor disapprove, and the
+    contract is set back to un-submitted.
+
+    The given instance (and its cached contract) is updated to reflect the change.
+
+    Args:
+        supervise: the supervise relation being disapproved
+    """
+    with transaction.atomic():
+        lock_contracts([supervise.contract_id])
+        AssessmentExamine.objects.filter(contract_id=supervise.contract_id,
+                                         examiner_approval_date__isnull=False) \
+            .update(examiner_approval_date=None)
+        Supervise.objects.filter(pk=supervise.pk).update(supervisor_approval_date=None)
+        Contract.objects.filter(pk=supervise.contract_id).update(submit_date=None)
+        refresh_contract_status([supervise.contract_id])
+
+    supervise.supervisor_approval_date = None
+    supervise.contract.submit_date = None
+
+
+def disapprove_assessment_examine(assessment_examine: AssessmentExamine) -> None:
+    """
+    Examiner disapproval, clear the examiner nominator's approval if the nominator is one of
+    the contract's supervisors.
+
+    Args:
+        assessment_examine: the assessment examine relation being disapproved
+    """
+    with transaction.atomic():
+        lock_contracts([assessment_examine.contract_id])
+        Supervise.objects.filter(supervisor_id=assessment_examine.examine.nominator_id,
+                                 contract_id=assessment_examine.contract_id,
+                                 supervisor_approval_date__isnull=False) \
+            .update(supervisor_approval_date=None)
+        refresh_contract_status([assessment_examine.contract_id])
@@ -11,12 +11,13 @@ __maintainer__ = 'Dajie (Cooper) Yang'
 __email__ = "dajie.yang@anu.edu.au"
 
 from io import BytesIO, StringIO
-from typing import List
+from collections import OrderedDict
+from typing import Iterator
 from django.http import HttpResponse
 from django.db import transaction
 from django.db.models import QuerySet
 from django_filters.rest_framework import DjangoFilterBackend
-from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
 from rest_framework.filters import SearchFilter
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from rest_framework.mixins import (CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
@@ -29,12 +30,13 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
 from accounts.models import SrpmsUser
-from .mixins import NestedGenericViewSet
+from .mixins import NestedGenericViewSet, EagerLoadingViewSetMixin, ReferenceCacheViewSetMixin
 from .serializers import (CourseSerializer, AssessmentTemplateSerializer, UserContractSerializer,
-                          ContractSerializer, SuperviseSerializer,
+                          UserSummarySerializer,
+                          ContractSerializer, ContractSummarySerializer, SuperviseSerializer,
                           AssessmentSerializer, AssessmentExamineSerializer)
 from .models import (Course, AssessmentTemplate, Contract, Supervise, Assessment,
-                     AssessmentExamine, ActivityLog)
+                     AssessmentExamine, ActivityLog, COURSES, TEMPLATES)
 from .permissions import (AllowSafeMethods, AllowPOST,
                           IsConvener, IsSuperuser, IsContractOwner,
                           IsContractFormalSupervisor,
@@ -44,9 +46,20 @@ from .permissions import (AllowSafeMethods, AllowPOST,
                           ContractSubmitted, ContractNotSubmitted,
                           ContractApprovedBySupervisor,
                           ContractNotFinalApproved, ContractFinalApproved)
+from .roles import get_role_facts
+from .transitions import (approve_contracts, disapprove_contracts, disapprove_supervise,
+                          disapprove_assessment_examine, lock_contracts)
 from .print import print_individual_project_contract
 from .csv_export import contract_csv_export
-from .serializer_utils import SubmitSerializer, ApproveSerializer
+from .pagination import ContractCursorPagination, iterate_by_keyset
+from .access import get_visible_contracts
+from .list_cache import SCOPE_ALL, SCOPE_SUBMITTED, SCOPE_USER, get_cached_list
+from .notifications import dispatch_notifications
+from .registry import get_group_id, get_action
+from .conditional import (ContractConditionalListMixin, ContractConditionalUpdateMixin,
+                          get_contract_etag, is_not_modified, get_not_modified_response,
+                          check_contract_if_match, set_contract_etag)
+from .serializer_utils import SubmitSerializer, ApproveSerializer, BulkApproveSerializer
 from .filters import UserFilter
 from .signals import (CONTRACT_SUBMIT, CONTRACT_APPROVE, SUPERVISE_APPROVE, EXAMINER_APPROVE,
                       ACTION_CONTRACT_SUBMIT, ACTION_CONTRACT_UN_SUBMIT,
@@ -58,7 +71,7 @@ from .signals import (CONTRACT_SUBMIT, CONTRACT_APPROVE, SUPERVISE_APPROVE, EXAM
 default_perms: list = api_settings.DEFAULT_PERMISSION_CLASSES
 
 
-class UserViewSet(ReadOnlyModelViewSet):
+class UserViewSet(EagerLoadingViewSetMixin, ReadOnlyModelViewSet):
     """
     Provides read-only user information, as well as the contract they
     involves (own, supervise, examine, convene).
@@ -90,9 +103,9 @@ class UserViewSet(ReadOnlyModelViewSet):
             user: SrpmsUser = self.get_object()
 
             if serializer.validated_data['submit']:
-                user.groups.add(Group.objects.get(name='approved_supervisors'))
+                user.groups.add(get_group_id('approved_supervisors'))
             else:
-                user.groups.remove(Group.objects.get(name='approved_supervisors'))
+                user.groups.remove(get_group_id('approved_supervisors'))
 
             return Response(status=HTTP_200_OK)
         else:
@@ -109,36 +122,38 @@ class UserViewSet(ReadOnlyModelViewSet):
             user: SrpmsUser = self.get_object()
 
             if serializer.validated_data['submit']:
-                user.groups.add(Group.objects.get(name='course_convener'))
+                user.groups.add(get_group_id('course_convener'))
             else:
-                user.groups.remove(Group.objects.get(name='course_convener'))
+                user.groups.remove(get_group_id('course_convener'))
 
             return Response(status=HTTP_200_OK)
         else:
             raise ValidationError(serializer.errors)
 
 
-class CourseViewSet(ModelViewSet):
+class CourseViewSet(ReferenceCacheViewSetMixin, EagerLoadingViewSetMixin, ModelViewSet):
     """
     A view the allow users to Create, Retrieve, Update, Delete courses.
     """
 
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    reference_cache = COURSES
     permission_classes = default_perms + [AllowSafeMethods | IsSuperuser | IsConvener, ]
 
 
-class AssessmentTemplateViewSet(ModelViewSet):
+class AssessmentTemplateViewSet(ReferenceCacheViewSetMixin, ModelViewSet):
     """
     A view the allow users to Create, Retrieve, Update, Delete assessment templates.
     """
 
     queryset = AssessmentTemplate.objects.all()
     serializer_class = AssessmentTemplateSerializer
+    reference_cache = TEMPLATES
     permission_classes = default_perms + [AllowSafeMethods | IsSuperuser | IsConvener, ]
 
 
-class ContractViewSet(ModelViewSet):
+class ContractViewSet(EagerLoadingViewSetMixin, ModelViewSet):
     """
     A view the allow users to Create, Retrieve, Update, Delete contracts. Also have submit and
     approve action to support contract administration.
@@ -158,46 +173,90 @@ class ContractViewSet(ModelViewSet):
 
     The ContractViewSet currently provide the following additional actions:
 
+    - `contracts/<id>/bundle/` would return the contract with all users it refers to
+    - `contracts/summary/` would return a compact list of contracts, with their workflow state
     - `contracts/export_csv/` would return a csv file containing all current finalized contract
     - `contracts/<id>/submit/` provide the contract submit/un-submit functionality
     - `contracts/<id>/approve/` provide the contract approve/disapprove functionality
+    - `contracts/bulk_approve/` approve/disapprove a list of contracts at once
     - `contracts/<id>/print/` would return a PDF contract (only if the contract finalized)
+
+    ----
+
+    The contract list supports cursor pagination, ordered by (year, semester, id). Specify the
+    `page_size` query parameter (max 100) to enable it, and follow the `next` link for the
+    following page, e.g. `contracts/?year=2019&page_size=50`. Contracts can also be filtered
+    by workflow state, e.g. `contracts/?state=examiner_approved`.
+
+    Contract detail, its nested lists and print support `If-None-Match`, while update and
+    approve support `If-Match`, with entity tags given in the `ETag` response header. See
+    conditional.py for details. The contract list is cached per user, see list_cache.py.
     """
     serializer_class = ContractSerializer
     permission_classes = default_perms + [AllowSafeMethods | AllowPOST | IsSuperuser |
                                           (IsContractOwner & ContractNotFinalApproved &
                                            ContractNotSubmitted), ]
-    filterset_fields = ('year', 'semester', 'course')
+    filterset_fields = ('year', 'semester', 'course', 'state')
+    pagination_class = ContractCursorPagination
 
     def get_queryset(self) -> QuerySet:
         """
         Override the default method to only allow user retrieve related contracts.
         """
 
+        self.queryset = self.get_visible_queryset()
+        return super(ContractViewSet, self).get_queryset()
+
+    def get_visible_scope(self) -> str:
+        """Which contracts the requester can see, one of the `SCOPE_*` in list_cache.py"""
+
         requester: SrpmsUser = self.request.user
 
         if IsSuperuser.check(requester):
-            # Superuser sees all contract
-            self.queryset = Contract.objects.all()
+            return SCOPE_ALL
         elif IsConvener.check(requester):
+            return SCOPE_SUBMITTED
+        else:
+            return SCOPE_USER
+
+    def get_visible_queryset(self) -> QuerySet:
+        """Contracts the requester can see, without eager loading"""
+
+        scope = self.get_visible_scope()
+
+        if scope == SCOPE_ALL:
+            # Superuser sees all contract
+            return Contract.objects.all()
+        elif scope == SCOPE_SUBMITTED:
             # Convener sees all contracts that has been submitted at least once.
-            self.queryset = Contract.objects.filter(was_submitted=True)
+            return Contract.objects.filter(was_submitted=True)
         else:
             # For other users, only display contract that they own, supervise, or examine, or other
-            # user's contracts that has passed convener approval.
-            # NOTE: supervise and examine would include contracts that have been submitted at least
-            #       once
-            contract_finalized = Contract.objects.filter(convener_approval_date__isnull=False)
-            contract_own = requester.own.all()
-            contract_supervise = Contract.objects.filter(
-                    supervise__in=requester.supervise.all(), was_submitted=True)
-            contract_examine = Contract.objects.filter(
-                    assessment_examine__examine__examiner=requester, was_submitted=True)
-
-            queryset = contract_finalized | contract_own | contract_supervise | contract_examine
-            self.queryset = queryset.distinct()
+            # user's contracts that has passed convener approval. See access.py for how the
+            # access table is maintained.
+            return get_visible_contracts(self.request.user)
 
-        return super(ContractViewSet, self).get_queryset()
+    def list(self, request, *args, **kwargs) -> HttpResponse:
+        """Responses are cached per user and query parameters, see list_cache.py"""
+        return get_cached_list(request, self.get_visible_scope(),
+                               lambda: super(ContractViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs) -> HttpResponse:
+        """
+        Support `If-None-Match`, see conditional.py. The version is checked with a query of
+        its own, so that a not modified contract is never loaded (and prefetched).
+        """
+        try:
+            current = self.get_visible_queryset().only('pk', 'version').get(pk=kwargs['pk'])
+        except (Contract.DoesNotExist, ValueError):
+            current = None  # Let get_object() respond as usual
+        if current and is_not_modified(request, get_contract_etag(current)):
+            return get_not_modified_response(get_contract_etag(current))
+
+        instance = self.get_object()
+        response = Response(self.get_serializer(instance).data)
+        response['ETag'] = get_contract_etag(instance)
+        return response
 
     def perform_create(self, serializer: ContractSerializer):
         """Override the default method to automatically attach request user as contract owner"""
@@ -207,6 +266,16 @@ class ContractViewSet(ModelViewSet):
 
         return super(ContractViewSet, self).perform_create(serializer)
 
+    def update(self, request, *args, **kwargs) -> HttpResponse:
+        """
+        Reject update based on an outdated copy through `If-Match`, and respond with the new
+        tag, see conditional.py
+        """
+        with transaction.atomic():
+            check_contract_if_match(request, kwargs['pk'])
+            response = super(ContractViewSet, self).update(request, *args, **kwargs)
+        return set_contract_etag(response, kwargs['pk'])
+
     # noinspection PyUnusedLocal
     @action(methods=['PUT', 'PATCH'], detail=True, serializer_class=SubmitSerializer,
             permission_classes=default_perms + [IsSuperuser | (IsContractOwner &
@@ -217,19 +286,22 @@ class ContractViewSet(ModelViewSet):
         serializer: SubmitSerializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             contract = self.get_object()
-            contract.submit_date = serializer.validated_data['submit']
-            contract.was_submitted = True
-            contract.save()
-
-            # Log activity, and send signal to trigger notifications
-            activity_log = ActivityLog.objects.create(actor=self.request.user,
-                                                      action=ACTION_CONTRACT_SUBMIT
-                                                      if serializer.validated_data['submit']
-                                                      else ACTION_CONTRACT_UN_SUBMIT,
-                                                      content_object=contract)
-            CONTRACT_SUBMIT.send(sender=self.__class__,
-                                 contract=contract,
-                                 activity_log=activity_log)
+
+            # Submit, log activity, and send signal to queue notifications in one transaction
+            with dispatch_notifications():
+                contract.submit_date = serializer.validated_data['submit']
+                contract.was_submitted = True
+                contract.save()
+
+                activity_log = ActivityLog.objects.create(
+                        actor=self.request.user,
+                        action=get_action(ACTION_CONTRACT_SUBMIT
+                                          if serializer.validated_data['submit']
+                                          else ACTION_CONTRACT_UN_SUBMIT),
+                        content_object=contract)
+                CONTRACT_SUBMIT.send(sender=self.__class__,
+                                     contract=contract,
+                                     activity_log=activity_log)
 
             return Response(status=HTTP_200_OK)
         else:
@@ -250,54 +322,151 @@ class ContractViewSet(ModelViewSet):
         """
         serializer: ApproveSerializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            contract: Contract = self.get_object()
             approve_date = serializer.validated_data['approve']
 
-            if approve_date:
-                # On approval, set the approval date, and set the convener to the user who
-                # is doing the approval action to this contract.
-                contract.convener = self.request.user
-                contract.convener_approval_date = approve_date
-                contract.save()
-            else:
-                # On disapproval, clear all formal supervisor's approvals. Use atomic as we need to
-                # save multiple objects
-                with transaction.atomic():
+            # Approve, log activity, and send signal to queue notifications in one transaction,
+            # the contract is locked for `If-Match` before it's loaded, see conditional.py
+            with dispatch_notifications():
+                check_contract_if_match(request, pk)
+                contract: Contract = self.get_object()
+
+                if approve_date:
+                    # On approval, set the approval date, and set the convener to the user who
+                    # is doing the approval action to this contract.
+                    contract.convener = self.request.user
+                    contract.convener_approval_date = approve_date
+                    contract.save()
+                else:
+                    # On disapproval, clear all formal supervisor's approvals
+                    disapprove_contracts([contract.pk])
                     contract.convener = None
                     contract.convener_approval_date = None
-                    contract.save()
-                    for supervise in contract.supervise.filter(is_formal=True):
-                        supervise.supervisor_approval_date = None
-                        supervise.save()
-
-            # Log activity, and send signal to trigger notifications
-            activity_log = ActivityLog.objects.create(actor=self.request.user,
-                                                      action=ACTION_CONTRACT_APPROVE
-                                                      if serializer.validated_data['approve']
-                                                      else ACTION_CONTRACT_DISAPPROVE,
-                                                      message=serializer.validated_data['message'],
-                                                      content_object=contract)
-            CONTRACT_APPROVE.send(sender=self.__class__,
-                                  contract=contract,
-                                  activity_log=activity_log)
 
-            return Response(status=HTTP_200_OK)
+                activity_log = ActivityLog.objects.create(
+                        actor=self.request.user,
+                        action=get_action(ACTION_CONTRACT_APPROVE
+                                          if serializer.validated_data['approve']
+                                          else ACTION_CONTRACT_DISAPPROVE),
+                        message=serializer.validated_data['message'],
+                        content_object=contract)
+                CONTRACT_APPROVE.send(sender=self.__class__,
+                                      contract=contract,
+                                      activity_log=activity_log)
+
+            return set_contract_etag(Response(status=HTTP_200_OK), contract.pk)
         else:
             raise ValidationError(serializer.errors)
 
+    # noinspection PyUnusedLocal
+    @action(methods=['POST'], detail=False, serializer_class=BulkApproveSerializer,
+            permission_classes=default_perms + [IsSuperuser | IsConvener, ])
+    def bulk_approve(self, request) -> HttpResponse:
+        """
+        Approve or disapprove a list of contracts for course convener, e.g.
+        `{"ids": [1, 2, 3], "approve": true, "message": ""}`.
+
+        Readiness of all contracts is checked in one query, with the contracts locked, eligible
+        contracts are then approved/disapproved together in the same transaction, while the rest
+        are left untouched.
+        A result is reported for every given contract id, with errors if it's not eligible.
+        """
+        serializer: BulkApproveSerializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+
+        requester: SrpmsUser = request.user
+        contract_ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        approve_date = serializer.validated_data['approve']
+        message = serializer.validated_data['message']
+
+        with transaction.atomic():
+            # Lock the contracts first, so that their readiness can't change between the check
+            # and the approval, e.g. by a supervisor disapproving at the same time
+            lock_contracts(contract_ids, allow_approved=True)
+
+            # Check readiness of all contracts at once, the criteria are the same as
+            # Contract.clean()
+            status_list = self.get_queryset().filter(pk__in=contract_ids).with_approval_status(
+                    ['is_submitted', 'is_convener_approved', 'is_all_supervisors_approved',
+                     'is_all_assessments_approved']
+            ).values('pk', 'annotated_is_submitted', 'annotated_is_convener_approved',
+                     'annotated_is_all_supervisors_approved',
+                     'annotated_is_all_assessments_approved')
+            status_map = {row['pk']: row for row in status_list}
+
+            results = OrderedDict()
+            for contract_id in contract_ids:
+                row = status_map.get(contract_id, None)
+                errors = []
+                if row is None:
+                    errors.append('Contract not found.')
+                elif row['annotated_is_convener_approved'] and \
+                        (approve_date or not IsSuperuser.check(requester)):
+                    errors.append('Contract has already been approved.')
+                elif approve_date:
+                    if not row['annotated_is_submitted']:
+                        errors.append('Un-submitted contract cannot be approved')
+                    if not row['annotated_is_all_assessments_approved']:
+                        errors.append('All assessments must be approved before final approval')
+                    if not row['annotated_is_all_supervisors_approved']:
+                        errors.append('All supervisors must approve this contract before '
+                                      'final approval')
+                results[contract_id] = {'id': contract_id, 'errors': errors}
+
+            eligible = [contract_id for contract_id, result in results.items()
+                        if not result['errors']]
+            if eligible:
+                if approve_date:
+                    approve_contracts(eligible, requester, approve_date)
+                else:
+                    disapprove_contracts(eligible)
+
+                content_type = ContentType.objects.get_for_model(Contract)
+                log_action = get_action(ACTION_CONTRACT_APPROVE if approve_date
+                                        else ACTION_CONTRACT_DISAPPROVE)
+                activity_logs = ActivityLog.objects.bulk_create([
+                    ActivityLog(actor=requester,
+                                action=log_action,
+                                message=message,
+                                content_type=content_type,
+                                object_id=contract_id)
+                    for contract_id in eligible
+                ])
+
+                # Send signal to queue notifications in the same transaction
+                contracts = Contract.objects.select_related('owner', 'convener').in_bulk(eligible)
+                with dispatch_notifications():
+                    for activity_log in activity_logs:
+                        CONTRACT_APPROVE.send(sender=self.__class__,
+                                              contract=contracts[activity_log.object_id],
+                                              activity_log=activity_log)
+
+        for contract_id, result in results.items():
+            if result['errors']:
+                result['status'] = 'rejected'
+            else:
+                result['status'] = 'approved' if approve_date else 'disapproved'
+
+        return Response({'results': list(results.values())}, status=HTTP_200_OK)
+
     # noinspection PyUnusedLocal
     @action(methods=['GET'], detail=True,
             permission_classes=default_perms + [ContractFinalApproved, ])
     def print(self, request, pk=None) -> HttpResponse:
         """
-        Return PDF version of given contract, generate one if does not exist.
+        Return PDF version of given contract, generate one if does not exist. Support
+        `If-None-Match`, see conditional.py.
 
         TODO: Ideally the file should be upload to somewhere else after generation, rather than
               save to the server's file system. Though be sure to consider concurrent problem in
               that case.
         """
         contract = self.get_object()
-        if hasattr(contract, 'individual_project'):
+        etag = get_contract_etag(contract, 'print')
+        if is_not_modified(request, etag):
+            return get_not_modified_response(etag)
+
+        if contract.is_individual_project():
             file_object = None
             try:
                 file_object = BytesIO()
@@ -306,6 +475,7 @@ class ContractViewSet(ModelViewSet):
                 response = HttpResponse(file_object.getvalue(),
                                         content_type='application/pdf')
                 response['Content-Disposition'] = 'inline; filename=contract.pdf'
+                response['ETag'] = etag
                 return response
             except Exception as exc:
                 raise exc
@@ -315,15 +485,60 @@ class ContractViewSet(ModelViewSet):
             return Response('This contract type does not support printing service',
                             status=HTTP_400_BAD_REQUEST)
 
+    # noinspection PyUnusedLocal
+    @action(methods=['GET'], detail=True)
+    def bundle(self, request, pk=None) -> HttpResponse:
+        """
+        Return the contract (including its supervise, assessments and assessment examines), and
+        all users it refers to as a map keyed by user id, so that clients can render a contract
+        in one round trip, rather than resolving each user separately.
+        """
+        contract_data = self.get_serializer(self.get_object()).data
+
+        user_ids = {contract_data.get('owner'), contract_data.get('convener')}
+        for supervise in contract_data.get('supervise', []):
+            user_ids.update((supervise['supervisor'], supervise['nominator']))
+        for assessment in contract_data.get('assessment', []):
+            for assessment_examine in assessment['assessment_examine']:
+                user_ids.update((assessment_examine['examiner'], assessment_examine['nominator']))
+        user_ids.discard(None)
+
+        users = SrpmsUser.objects.filter(pk__in=user_ids)
+        return Response({
+            'contract': contract_data,
+            'users': {user.pk: UserSummarySerializer(user).data for user in users},
+        })
+
+    # noinspection PyUnusedLocal
+    @action(methods=['GET'], detail=False, serializer_class=ContractSummarySerializer)
+    def summary(self, request) -> HttpResponse:
+        """
+        Return compact summary of visible contracts, i.e. id, type, title, course number,
+        year, semester, owner name and workflow state. Rows are built from `.values()` rather
+        than model instances, and support the same filters and pagination as the list.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).summary_values()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     # noinspection PyUnusedLocal
     @action(methods=['GET'], detail=False,
             permission_classes=default_perms + [IsSuperuser | IsConvener, ],
             filterset_fields=('year', 'semester', 'course'))
     def export_csv(self, request) -> HttpResponse:
         """
-        Return csv export for selected contracts.
+        Return csv export for selected contracts. Contracts are retrieved in batches with the
+        same ordering as the paginated list, so that the export does not load every contract
+        into memory at once.
         """
-        contract_list: List[Contract] = self.get_queryset()
+        contract_list: Iterator[Contract] = iterate_by_keyset(
+                self.filter_queryset(self.get_queryset()), self.paginator.ordering)
 
         file_object = None
         try:
@@ -338,8 +553,10 @@ class ContractViewSet(ModelViewSet):
             file_object.close() if file_object else None
 
 
-class AssessmentExamineViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
-                               DestroyModelMixin, ListModelMixin, NestedGenericViewSet):
+class AssessmentExamineViewSet(ContractConditionalListMixin, ContractConditionalUpdateMixin,
+                               EagerLoadingViewSetMixin, CreateModelMixin, RetrieveModelMixin,
+                               UpdateModelMixin, DestroyModelMixin, ListModelMixin,
+                               NestedGenericViewSet):
     """
     A view the allow users to Create, Retrieve, Update, Delete contract's assessments examiner.
     Also have approval action for examiner to approve assessments.
@@ -390,43 +607,44 @@ class AssessmentExamineViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModel
 
         serializer: ApproveSerializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            assessment_examine: AssessmentExamine = self.get_object()
-
-            # Examiner cannot undo their approval
-            if not IsSuperuser.check(request.user) and \
-                    not IsConvener.check(request.user) and \
-                    assessment_examine.examiner_approval_date:
-                raise PermissionDenied('Action on approved item is not allowed, please contact '
-                                       'course convener if you need to disapprove.')
-
+            contract_id = self.resolved_parents['contract'].pk
             approval_date = serializer.validated_data['approve']
-            if approval_date:
-                assessment_examine.examiner_approval_date = approval_date
-                assessment_examine.save()
-            else:
-                # Examiner disapprove would clear it's nominator's approval status. However, in the
-                # case that the nominator is not one of the contract supervisor, e.g. the supervisor
-                # changed, or the examiner was assigned directly by superuser or convener, no
-                # approval would be reset, and the convener should be contacted to handle this.
-                with transaction.atomic():
-                    for supervise in Supervise.objects.filter(
-                            supervisor=assessment_examine.examine.nominator,
-                            contract=assessment_examine.contract):
-                        supervise.supervisor_approval_date = None
-                        supervise.save()
-
-            # Log activity, and send signal to trigger notifications
-            activity_log = ActivityLog.objects.create(
-                    actor=self.request.user,
-                    action=ACTION_EXAMINER_APPROVE
-                    if serializer.validated_data['approve']
-                    else ACTION_EXAMINER_DISAPPROVE,
-                    content_object=assessment_examine)
-            EXAMINER_APPROVE.send(sender=self.__class__,
-                                  assessment_examine=assessment_examine,
-                                  activity_log=activity_log)
 
-            return Response(status=HTTP_200_OK)
+            # Approve, log activity, and send signal to queue notifications in one transaction,
+            # the contract is locked for `If-Match` before anything is loaded, see conditional.py
+            with dispatch_notifications():
+                check_contract_if_match(request, contract_id, self.basename)
+                assessment_examine: AssessmentExamine = self.get_object()
+
+                # Examiner cannot undo their approval
+                if not IsSuperuser.check(request.user) and \
+                        not IsConvener.check(request.user) and \
+                        assessment_examine.examiner_approval_date:
+                    raise PermissionDenied('Action on approved item is not allowed, please '
+                                           'contact course convener if you need to disapprove.')
+
+                if approval_date:
+                    assessment_examine.examiner_approval_date = approval_date
+                    assessment_examine.save()
+                else:
+                    # Examiner disapprove would clear it's nominator's approval status. However,
+                    # in the case that the nominator is not one of the contract supervisor, e.g.
+                    # the supervisor changed, or the examiner was assigned directly by superuser
+                    # or convener, no approval would be reset, and the convener should be
+                    # contacted to handle this.
+                    disapprove_assessment_examine(assessment_examine)
+
+                activity_log = ActivityLog.objects.create(
+                        actor=self.request.user,
+                        action=get_action(ACTION_EXAMINER_APPROVE
+                                          if serializer.validated_data['approve']
+                                          else ACTION_EXAMINER_DISAPPROVE),
+                        content_object=assessment_examine)
+                EXAMINER_APPROVE.send(sender=self.__class__,
+                                      assessment_examine=assessment_examine,
+                                      activity_log=activity_log)
+
+            return set_contract_etag(Response(status=HTTP_200_OK), contract_id, self.basename)
         else:
             raise ValidationError(serializer.errors)
 
@@ -437,8 +655,9 @@ class AssessmentExamineViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModel
         serializer.validated_data['nominator'] = self.request.user
 
 
-class AssessmentViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
-                        DestroyModelMixin, ListModelMixin, NestedGenericViewSet):
+class AssessmentViewSet(ContractConditionalListMixin, ContractConditionalUpdateMixin,
+                        EagerLoadingViewSetMixin, CreateModelMixin, RetrieveModelMixin,
+                        UpdateModelMixin, DestroyModelMixin, ListModelMixin, NestedGenericViewSet):
     """
     A view the allow users to Create, Retrieve, Update, Delete contract's assessments.
 
@@ -472,15 +691,16 @@ class AssessmentViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
         # Forbid editing assessment template for individual project
         if not IsSuperuser.check(self.request.user):
             contract = serializer.validated_data['contract']
-            if hasattr(contract, 'individual_project') and \
+            if contract.is_individual_project() and \
                     serializer.validated_data.get('template', False):
                 raise PermissionDenied('Cannot edit template for individual project ')
 
         return super(AssessmentViewSet, self).perform_update(serializer)
 
 
-class SuperviseViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
-                       DestroyModelMixin, ListModelMixin, NestedGenericViewSet):
+class SuperviseViewSet(ContractConditionalListMixin, ContractConditionalUpdateMixin,
+                       EagerLoadingViewSetMixin, CreateModelMixin, RetrieveModelMixin,
+                       UpdateModelMixin, DestroyModelMixin, ListModelMixin, NestedGenericViewSet):
     """
     A view the allow users to Create, Retrieve, Update, Delete contract's assessments.
 
@@ -533,58 +753,50 @@ class SuperviseViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
         """Allow supervisor to approve supervise relation"""
         serializer: ApproveSerializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            supervise: Supervise = self.get_object()
-
-            # Supervisor cannot undo their approval
-            if not IsSuperuser.check(request.user) and not IsConvener.check(request.user) and \
-                    supervise.supervisor_approval_date:
-                raise PermissionDenied('Action on approved item is not allowed, please contact '
-                                       'convener if you need to disapprove.')
+            contract: Contract = self.resolved_parents['contract']
 
             # Wrap with transaction since we may need to modify related objects, this would
             # let all related database commits rollback to previous state if any commit fail.
-            with transaction.atomic():
-                contract: Contract = self.resolved_parents['contract']
+            # Activity is logged, and notifications are queued in the same transaction. The
+            # contract is locked for `If-Match` before anything is loaded, see conditional.py
+            with dispatch_notifications():
+                check_contract_if_match(request, contract.pk, self.basename)
+                supervise: Supervise = self.get_object()
+
+                # Supervisor cannot undo their approval
+                if not IsSuperuser.check(request.user) and \
+                        not IsConvener.check(request.user) and supervise.supervisor_approval_date:
+                    raise PermissionDenied('Action on approved item is not allowed, please '
+                                           'contact convener if you need to disapprove.')
+
                 if serializer.validated_data['approve']:
 
-                    # Formal supervisor approve check
-                    if IsContractFormalSupervisor.check(contract, request.user):
-                        # All assessment must have at least on examiner
-                        for assessment in contract.assessment.all():
-                            if len(assessment.assessment_examine.all()) < 1:
-                                raise ValidationError('Please make sure you\'ve assigned at least '
-                                                      'one examiner for each assessment.')
+                    # Formal supervisor approve check, all assessment must have at least
+                    # one examiner
+                    facts = get_role_facts(request, contract.pk)
+                    if facts.is_formal_supervisor and not facts.is_examiner_nominated:
+                        raise ValidationError('Please make sure you\'ve assigned at least '
+                                              'one examiner for each assessment.')
 
                     supervise.supervisor_approval_date = serializer.validated_data['approve']
                     supervise.save()
                 else:
-                    # On disapprove, first clear all contract's assessment's approval.
-                    # This is because contract owner would be able to modify assessments after
-                    # supervisor disapprove, as such examiners should approve again.
-                    for assessment_examine in AssessmentExamine.objects.filter(
-                            contract=supervise.contract):
-                        assessment_examine.examiner_approval_date = None
-                        assessment_examine.save()
-
-                    # Clear supervisor's approval
-                    supervise.supervisor_approval_date = None
-                    supervise.save()
-
-                    # Clear contract's submit status
-                    supervise.contract.submit_date = None
-                    supervise.contract.save()
-
-            # Log activity, and send signal to trigger notifications
-            activity_log = ActivityLog.objects.create(actor=self.request.user,
-                                                      action=ACTION_SUPERVISE_APPROVE
-                                                      if serializer.validated_data['approve']
-                                                      else ACTION_SUPERVISE_DISAPPROVE,
-                                                      content_object=supervise)
-            SUPERVISE_APPROVE.send(sender=self.__class__,
-                                   supervise=supervise,
-                                   activity_log=activity_log)
-
-            return Response(status=HTTP_200_OK)
+                    # On disapprove, clear all contract's assessment's approval, as contract owner
+                    # would be able to modify assessments after supervisor disapprove. Then clear
+                    # supervisor's approval and contract's submit status.
+                    disapprove_supervise(supervise)
+
+                activity_log = ActivityLog.objects.create(
+                        actor=self.request.user,
+                        action=get_action(ACTION_SUPERVISE_APPROVE
+                                          if serializer.validated_data['approve']
+                                          else ACTION_SUPERVISE_DISAPPROVE),
+                        content_object=supervise)
+                SUPERVISE_APPROVE.send(sender=self.__class__,
+                                       supervise=supervise,
+                                       activity_log=activity_log)
+
+            return set_contract_etag(Response(status=HTTP_200_OK), contract.pk, self.basename)
         else:
             raise ValidationError(serializer.errors)
 
@@ -608,18 +820,13 @@ class SuperviseViewSet(CreateModelMixin, RetrieveModelMixin, UpdateModelMixin,
         """
 
         requester: SrpmsUser = self.request.user
+        facts = get_role_facts(self.request, self.resolved_parents['contract'].pk)
         if IsSuperuser.check(requester) or IsConvener.check(requester):
             pass  # Superuser and convener can nominate whoever they want as supervisor
-        elif IsContractFormalSupervisor.check(self.resolved_parents['contract'],
-                                              requester):
+        elif facts.is_formal_supervisor:
             # Forbid supervisor if he/she already approved
-            try:
-                supervise = Supervise.objects.get(contract=self.resolved_parents['contract'],
-                                                  supervisor=requester)
-                if supervise.supervisor_approval_date:
-                    raise PermissionDenied('Further modification is forbidden after you approved')
-            except Supervise.DoesNotExist:
-                pass
+            if facts.is_supervisor_approved:
+                raise PermissionDenied('Further modification is forbidden after you approved')
 
             pass  # User with 'can_supervise' permission can nominate whoever they want
         elif serializer.validated_data['is_formal']:
@@ -0,0 +1,123 @@
+"""
+Maintain the denormalized approval counters and workflow state of contracts.
+
+Counters (supervise_count, supervise_approved_count, assessment_count,
+assessment_without_examiner_count, assessment_examine_count and
+assessment_examine_approved_count) and `state` are persisted on the contract, so that the
+approval status can be read from the contract row alone, and filtering by state is an indexed
+equality rather than joins across supervise and assessment examine.
+
+Counters are re-counted from related tables on every change rather than incremented. The
+refresh usually runs inside the transaction of the change, so the contract rows are locked
+before counting. Otherwise two concurrent changes (e.g. two supervisors approving the same
+contract) would each count with a snapshot missing the other, and the last one would win. The
+refresh is triggered by signals defined in signals.py, and explicitly by transitions that bypass
+signals through `QuerySet.update()`. Use the `verify_contract_status` management command to
+check for drift and repair it.
+
+Every refresh also draws a new `version` for the contract from a database sequence, which is
+used as entity tag for conditional requests (see conditional.py). A sequence rather than an
+increment of the current value, since saving a contract loaded earlier writes back its stale
+version, and an increment would then repeat a version seen before. The refresh also
+invalidates cached contract lists containing the contracts (see list_cache.py).
+"""
+
+__author__ = "Dajie (Cooper) Yang"
+__credits__ = ["Dajie Yang"]
+
+__maintainer__ = "Dajie (Cooper) Yang"
+__email__ = "dajie.yang@anu.edu.au"
+
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import (QuerySet, Subquery, OuterRef, Count, IntegerField,
+                              BigIntegerField, Expression, F, Q)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .models import (Contract, Supervise, Assessment, AssessmentExamine,
+                     get_workflow_state_expression)
+from .list_cache import invalidate_contracts
+
+COUNTER_FIELDS = ['supervise_count', 'supervise_approved_count', 'assessment_count',
+                  'assessment_without_examiner_count', 'assessment_examine_count',
+                  'assessment_examine_approved_count']
+
+# Created by migration 0010_contract_version
+VERSION_SEQUENCE = 'research_mgt_contract_version_seq'
+
+
+def count_per_contract(queryset: QuerySet) -> Expression:
+    """
+    Sub-query that count rows of the queryset belong to the outer contract, zero if none.
+
+    Args:
+        queryset: queryset of a model with a `contract` foreign key
+    """
+    counts = queryset.filter(contract=OuterRef('pk')).order_by().values('contract') \
+        .annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def get_counter_expressions() -> Dict[str, Expression]:
+    """Expressions that count the current value of every counter from related tables"""
+    return {
+        'supervise_count': count_per_contract(Supervise.objects.all()),
+        'supervise_approved_count': count_per_contract(
+                Supervise.objects.filter(supervisor_approval_date__isnull=False)),
+        'assessment_count': count_per_contract(Assessment.objects.all()),
+        'assessment_without_examiner_count': count_per_contract(
+                Assessment.objects.filter(assessment_examine__isnull=True)),
+        'assessment_examine_count': count_per_contract(AssessmentExamine.objects.all()),
+        'assessment_examine_approved_count': count_per_contract(
+                AssessmentExamine.objects.filter(examiner_approval_date__isnull=False)),
+    }
+
+
+def get_next_version_expression() -> Expression:
+    """Expression that draw a new contract version, evaluated for each row"""
+    return RawSQL("nextval('{}')".format(VERSION_SEQUENCE), [], output_field=BigIntegerField())
+
+
+def refresh_contract_status(contract_ids: Iterable[int] = None) -> None:
+    """
+    Re-count approval counters, re-derive workflow state from them, and draw a new version.
+
+    Args:
+        contract_ids: primary keys of contracts to refresh, all contracts if None
+    """
+    contracts = Contract.objects.all()
+    if contract_ids is not None:
+        contract_ids = list(contract_ids)
+        contracts = contracts.filter(pk__in=contract_ids)
+
+    with transaction.atomic():
+        # Wait for concurrent refreshes to commit, so that statements below see their changes.
+        # Locked in a consistent order to avoid deadlocks between refreshes of many contracts.
+        list(contracts.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+        # Persisted state tells whether the contracts were finalized before the change
+        invalidate_contracts(contract_ids)
+        # State depends on the counters, which can only be referenced after they're updated
+        contracts.update(version=get_next_version_expression(), **get_counter_expressions())
+        contracts.update(state=get_workflow_state_expression())
+
+
+def check_contract_status() -> List[int]:
+    """
+    Compare persisted counters and state against related tables.
+
+    Returns:
+        primary keys of contracts that have drifted
+    """
+    computed = {'computed_' + name: expression
+                for name, expression in get_counter_expressions().items()}
+    mismatch = Q()
+    for name in COUNTER_FIELDS:
+        mismatch |= ~Q(**{name: F('computed_' + name)})
+
+    # State is checked against the persisted counters, drifted counters are reported anyway
+    drifted = Contract.objects.annotate(**computed).with_workflow_state().filter(
+            mismatch | ~Q(state=F('workflow_state')))
+    return list(drifted.order_by('pk').values_list('pk', flat=True))
@@ -0,0 +1,150 @@
+"""
+Cache backends used by the named caches configured in settings.py, i.e. Django's own backends
+that also count hits and misses, so that the hit rate of every cache can be reported through
+the `cache_stats` management command.
+
+Counts are kept by each cache instance (one per thread), and are added to counters stored in
+the cache itself once every `stats_flush_interval` lookups, so that counting doesn't double the
+cache traffic. Counts not yet flushed are lost when the process exits, the hit rate is only
+meant to be an estimate.
+"""
+
+__author__ = 'Dajie (Cooper) Yang'
+__credits__ = ['Dajie Yang']
+
+__maintainer__ = 'Dajie (Cooper) Yang'
+__email__ = 'dajie.yang@anu.edu.au'
+
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends import locmem, filebased, db, memcached
+
+STATS = ('hits', 'misses')
+
+# Stands for a missing value, since None can be cached
+MISSING = object()
+
+
+class CacheProxy(object):
+    """
+    Same as `django.core.cache.cache`, but for any named cache, e.g. `CacheProxy('responses')`.
+    Each thread gets its own cache instance, same as `caches[alias]`.
+    """
+
+    def __init__(self, alias: str):
+        self._alias = alias
+
+    def __getattr__(self, name: str):
+        return getattr(caches[self._alias], name)
+
+
+class StatsCacheMixin(object):
+    """Count hits and misses of `get()` and `get_many()`, mix in before a cache backend"""
+
+    stats_flush_interval = 100
+
+    def __init__(self, *args, **kwargs):
+        super(StatsCacheMixin, self).__init__(*args, **kwargs)
+        self._pending = dict.fromkeys(STATS, 0)
+        self._nested = False
+
+    @contextmanager
+    def nested(self):
+        """
+        Lookups made by other cache methods are not counted, e.g. `incr()` of some backends
+        calls `get()`. Yields whether this is the outermost call.
+        """
+        outermost = not self._nested
+        self._nested = True
+        try:
+            yield outermost
+        finally:
+            if outermost:
+                self._nested = False
+
+    def record(self, hits: int, misses: int) -> None:
+        self._pending['hits'] += hits
+        self._pending['misses'] += misses
+        if sum(self._pending.values()) >= self.stats_flush_interval:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """Add counts of this instance to the counters in cache"""
+        pending, self._pending = self._pending, dict.fromkeys(STATS, 0)
+        with self.nested():
+            for name, count in pending.items():
+                if not count:
+                    continue
+                try:
+                    self.incr('stats:' + name, count)
+                except ValueError:  # Missing key
+                    if not self.add('stats:' + name, count, timeout=None):
+                        self.incr('stats:' + name, count)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Hit and miss counts since last reset, including counts of this instance"""
+        self.flush_stats()
+        with self.nested():
+            counters = super(StatsCacheMixin, self).get_many(['stats:' + name for name in STATS])
+        return {name: counters.get('stats:' + name, 0) for name in STATS}
+
+    def reset_stats(self) -> None:
+        self._pending = dict.fromkeys(STATS, 0)
+        with self.nested():
+            self.delete_many(['stats:' + name for name in STATS])
+
+    def get_server_stats(self) -> Optional[Dict[str, int]]:
+        """Hit and miss counts reported by the cache server, if the backend has one"""
+        return None
+
+    def get(self, key, default=None, version=None):
+        with self.nested() as outermost:
+            value = super(StatsCacheMixin, self).get(key, MISSING, version=version)
+        if outermost:
+            self.record(hits=int(value is not MISSING), misses=int(value is MISSING))
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with self.nested() as outermost:
+            values = super(StatsCacheMixin, self).get_many(keys, version=version)
+        if outermost:
+            self.record(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def has_key(self, key, version=None):
+        with self.nested():
+            return super(StatsCacheMixin, self).has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        with self.nested():
+            return super(StatsCacheMixin, self).incr(key, delta=delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        with self.nested():
+            return super(StatsCacheMixin, self).decr(key, delta=delta, version=version)
+
+
+class LocMemCache(StatsCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(StatsCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+class DatabaseCache(StatsCacheMixin, db.DatabaseCache):
+    pass
+
+
+class MemcachedCache(StatsCacheMixin, memcached.MemcachedCache):
+
+    def get_server_stats(self) -> Optional[Dict[str, int]]:
+        """Sum of `get_hits` and `get_misses` of all servers, since they were started"""
+        totals = dict.fromkeys(STATS, 0)
+        for _, server_stats in self._cache.get_stats():
+            totals['hits'] += int(server_stats.get('get_hits', 0))
+            totals['misses'] += int(server_stats.get('get_misses', 0))
+        return totals
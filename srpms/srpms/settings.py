@@ -19,6 +19,8 @@ __email__ = 'dajie.yang@anu.edu.au'
 import os
 from datetime import timedelta
 import ldap
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 
 def get_env(env_name: str, env_file: str = None) -> str:
@@ -138,6 +140,67 @@ else:
         }
     }
 
+# Caches
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+#
+# Backend is selected by CACHE_BACKEND, one of:
+# - 'locmem': per-process memory, the default, only suitable for development and test
+# - 'file': files under the CACHE_LOCATION directory, shared by workers on the same host
+# - 'db': Postgres tables prefixed with CACHE_LOCATION, created by `manage.py createcachetable`
+# - 'memcached': comma separated memcached servers in CACHE_LOCATION
+# Every named cache lives in its own directory, table, or key prefix. Run `manage.py cache_stats`
+# for the hit rate of each cache.
+CACHE_BACKENDS = {
+    'locmem': 'srpms.caches.LocMemCache',
+    'file': 'srpms.caches.FileBasedCache',
+    'db': 'srpms.caches.DatabaseCache',
+    'memcached': 'srpms.caches.MemcachedCache',
+}
+CACHE_BACKEND = get_env('CACHE_BACKEND') or 'locmem'
+CACHE_LOCATION = get_env('CACHE_LOCATION')
+
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured('Unknown CACHE_BACKEND "{}", should be one of {}'.format(
+            CACHE_BACKEND, ', '.join(CACHE_BACKENDS)))
+
+
+def get_cache(alias: str, timeout: int) -> dict:
+    """Configuration of one named cache, using the backend selected above"""
+
+    if CACHE_BACKEND == 'file':
+        location = os.path.join(CACHE_LOCATION or '/var/tmp/srpms_cache', alias)
+    elif CACHE_BACKEND == 'db':
+        location = '{}_{}'.format(CACHE_LOCATION or 'srpms_cache', alias)
+    elif CACHE_BACKEND == 'memcached':
+        location = (CACHE_LOCATION or '127.0.0.1:11211').split(',')
+    else:
+        location = alias
+
+    return {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': location,
+        'KEY_PREFIX': alias,
+        'TIMEOUT': timeout,
+    }
+
+
+CACHES = {
+    # Reference data versions, see research_mgt/reference.py
+    'default': get_cache('default', 300),
+    # Distinguished names and group memberships, see accounts/authentication.py
+    'ldap': get_cache('ldap', 3600),
+    # API responses, see research_mgt/list_cache.py
+    'responses': get_cache('responses', 300),
+    # Sessions, see SESSION_ENGINE below
+    'sessions': get_cache('sessions', 1209600),
+}
+
+# Cache sessions in front of the database, only with a shared cache, since a per-process cache
+# would keep serving a session that has been logged out in another process
+if CACHE_BACKEND != 'locmem':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -266,7 +329,8 @@ AUTH_LDAP_USER_DN_TEMPLATE = 'uid=%(user)s,' + AUTH_ANU_LDAP_BASE_DN
 # Explicitly specify that SRPMS should update user information on every login
 AUTH_LDAP_ALWAYS_UPDATE_USER = True
 
-# Cache distinguished names and group memberships for an hour to minimize LDAP traffic.
+# Cache distinguished names and group memberships for an hour to minimize LDAP traffic, in the
+# 'ldap' cache (see CACHES and accounts/authentication.py).
 AUTH_LDAP_CACHE_TIMEOUT = 3600
 
 # Retrieve attributes from LDAP information
@@ -302,6 +366,10 @@ if not DEBUG:
 if DEBUG:
     CORS_ORIGIN_ALLOW_ALL = True
 
+    # Client is served from another origin during debug, allow it to do conditional requests
+    CORS_EXPOSE_HEADERS = ['ETag']
+    CORS_ALLOW_HEADERS = list(default_headers) + ['if-match', 'if-none-match']
+
     # Disable SSL
     SECURE_SSL_REDIRECT = False
     SESSION_COOKIE_SECURE = False
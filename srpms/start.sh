@@ -34,7 +34,15 @@ if [ "$DEBUG" == "False" ]; then
     echo "### Perform database migraitons ..."
     python manage.py migrate
 
-    exec gunicorn --bind :8000 srpms.wsgi:application
+    # Only creates tables for database caches (CACHE_BACKEND=db), does nothing otherwise
+    echo "### Create cache tables ..."
+    python manage.py createcachetable
+
+    # Threaded workers, nested viewsets resolve their parents per request so it's safe to
+    # serve multiple requests in one process. Worker and thread count can be tuned from env.
+    exec gunicorn --bind :8000 --worker-class gthread \
+        --workers "${GUNICORN_WORKERS:-3}" --threads "${GUNICORN_THREADS:-4}" \
+        srpms.wsgi:application
 elif [ "$DEBUG" == "True" ]; then
     IP_PREFIX=$(awk -v addr="$(wget -qO - ipinfo.io/ip)" 'BEGIN{split(addr,ip,"."); print ip[1] "." ip[2]}')
 